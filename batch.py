@@ -0,0 +1,156 @@
+import numpy as np
+from instance import CoverageInstance, as_instance
+
+GREEDY_STRATEGIES = ('degree', 'cost', 'ratio')
+
+
+class InstanceBatch:
+    """
+    Many small instances stacked into one padded boolean coverage tensor.
+
+    coverage[b, s, t] is True if plan s of instance b covers feasible tuple t of
+    instance b. Instances with fewer plans / tuples are padded with plans that
+    cover nothing and tuples that are never required, so padding is never selected.
+    """
+
+    def __init__(self, coverage, required, costs, degrees, satellite_labels):
+        self.coverage = coverage
+        self.required = required
+        self.costs = costs
+        self.degrees = degrees
+        self.satellite_labels = satellite_labels
+
+    def __len__(self):
+        return self.coverage.shape[0]
+
+
+def stack_instances(instances):
+    """
+    Stacks (G, feasible_tuple_nodes, satellites) instances into one InstanceBatch.
+    Entries can also be CoverageInstances (all their coverable tuples are used).
+
+    Only the feasible tuples of each instance get a column, since the greedies only
+    ever look at coverage of tuples in feasible_tuple_nodes. Plan degrees count every
+    tuple a plan covers, so the sort orders match the ones in util_v2.
+
+    Returns:
+        InstanceBatch
+    """
+    converted = []
+    for entry in instances:
+        if isinstance(entry, CoverageInstance):
+            converted.append((entry, entry.coverable))
+        else:
+            converted.append(as_instance(*entry))
+    num_instances = len(converted)
+    max_sats = max(instance.num_plans for instance, _ in converted)
+    max_tuples = max(len(tuple_ids) for _, tuple_ids in converted)
+
+    coverage = np.zeros((num_instances, max_sats, max_tuples), dtype=bool)
+    required = np.zeros((num_instances, max_tuples), dtype=bool)
+    costs = np.full((num_instances, max_sats), np.inf)
+    degrees = np.zeros((num_instances, max_sats), dtype=np.int64)
+    satellite_labels = []
+
+    for b, (instance, tuple_ids) in enumerate(converted):
+        num_sats = instance.num_plans
+        required[b, :len(tuple_ids)] = True
+        satellite_labels.append(instance.satellite_labels)
+        costs[b, :num_sats] = instance.costs
+        degrees[b, :num_sats] = instance.degrees
+        # column of each tuple in this instance's block, -1 for tuples that are not required
+        column = np.full(instance.num_tuples, -1, dtype=np.int64)
+        column[np.frombuffer(tuple_ids, dtype=np.int32)] = np.arange(len(tuple_ids))
+        plan_of_edge = np.repeat(np.arange(num_sats), np.diff(np.frombuffer(instance.plan_indptr, dtype=np.int64)))
+        edge_columns = column[np.frombuffer(instance.plan_indices, dtype=np.int32)]
+        keep = edge_columns >= 0
+        coverage[b, plan_of_edge[keep], edge_columns[keep]] = True
+
+    return InstanceBatch(coverage, required, costs, degrees, satellite_labels)
+
+
+def _plan_order(batch, strategy):
+    """
+    Per-instance plan order used by each static greedy, shape (B, S_max).
+    Stable sorts keep ties in insertion order, exactly like sorted() on the dicts in util_v2.
+    """
+    if strategy == 'degree':
+        key = -batch.degrees
+    elif strategy == 'cost':
+        key = batch.costs
+    elif strategy == 'ratio':
+        with np.errstate(divide='ignore', invalid='ignore'):
+            key = np.where(batch.degrees > 0, batch.costs / np.maximum(batch.degrees, 1), np.inf)
+    else:
+        raise ValueError(f"Unknown greedy strategy: {strategy}")
+    return np.argsort(key, axis=1, kind='stable')
+
+
+def _run_static_greedy(batch, orders):
+    """
+    Runs the 'take the next plan in order if it covers anything new' loop for every row
+    of orders at once. Row r of orders belongs to instance r % len(batch).
+    The python loop is over plan positions, never over instances.
+
+    Returns:
+        tuple: (selected, total_costs) with shapes (R, S_max) and (R,)
+    """
+    num_rows, max_sats = orders.shape
+    instance_idx = np.arange(num_rows) % len(batch)
+    uncovered = batch.required[instance_idx].copy()
+    selected = np.zeros((num_rows, max_sats), dtype=bool)
+    rows = np.arange(num_rows)
+
+    for j in range(max_sats):
+        if not uncovered.any():
+            break
+        plans = orders[:, j]
+        plan_coverage = batch.coverage[instance_idx, plans]
+        takes = (plan_coverage & uncovered).any(axis=1)
+        selected[rows[takes], plans[takes]] = True
+        uncovered &= ~(plan_coverage & takes[:, None])
+
+    total_costs = np.where(selected, batch.costs[instance_idx], 0).sum(axis=1)
+    return selected, total_costs
+
+
+def batched_greedy(batch, strategy='ratio'):
+    """
+    Runs one of the util_v2 static greedies ('degree', 'cost' or 'ratio') on every
+    instance of the batch in a single vectorized pass.
+
+    Returns:
+        tuple: (selected, total_costs)
+            selected: bool array (B, S_max) of chosen plans per instance
+            total_costs: array (B,) of the cost of each selection
+    """
+    return _run_static_greedy(batch, _plan_order(batch, strategy))
+
+
+def batched_greedy_all(batch, strategies=GREEDY_STRATEGIES):
+    """
+    Runs several greedies on every instance at once by stacking their plan orders
+    along the batch axis, so degree, cost and ratio greedy share one loop.
+
+    Returns:
+        dict: strategy -> (selected, total_costs), same shapes as batched_greedy
+    """
+    orders = np.concatenate([_plan_order(batch, strategy) for strategy in strategies], axis=0)
+    selected, total_costs = _run_static_greedy(batch, orders)
+    num_instances = len(batch)
+    results = {}
+    for i, strategy in enumerate(strategies):
+        rows = slice(i * num_instances, (i + 1) * num_instances)
+        results[strategy] = (selected[rows], total_costs[rows])
+    return results
+
+
+def selections_to_sets(batch, selected):
+    """
+    Maps a (B, S_max) selection matrix back to satellite label sets, one per instance.
+
+    Returns:
+        list: List of satellite_set per instance
+    """
+    return [set(labels[s] for s in np.flatnonzero(selected[b, :len(labels)]))
+            for b, labels in enumerate(batch.satellite_labels)]
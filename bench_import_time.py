@@ -0,0 +1,77 @@
+import argparse
+import os
+import subprocess
+import sys
+
+# Import-time regression guard: imports each module in a fresh interpreter with
+# `python -X importtime` and fails if it takes longer than its budget or pulls in one
+# of the heavy packages that should only load when their feature is used.
+
+HEAVY_PACKAGES = ['matplotlib', 'networkx', 'scipy', 'numpy', 'gurobipy']
+
+# module -> (budget in ms, heavy packages it is still allowed to import)
+IMPORT_BUDGETS = {
+    'util': (50, []),
+    'util_v2': (50, []),
+    'solver': (50, []),
+    'portfolio': (50, []),
+    'instance': (50, []),
+    'batch': (400, ['numpy']),
+    'kernels': (400, ['numpy']),
+    'evaluate': (600, ['numpy', 'scipy']),
+}
+
+def measure_import(module):
+    """
+    Imports module in a fresh interpreter under -X importtime.
+
+    Returns:
+        tuple: (total_ms, imported) where imported maps each imported module name to its cumulative ms
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+
+    imported = {}
+    for line in result.stderr.splitlines():
+        # import time:   self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        imported[name.strip()] = int(cumulative) / 1000
+    return imported.get(module, 0.0), imported
+
+def check_imports(budgets=IMPORT_BUDGETS, repeat=3):
+    """
+    Checks every module against its budget (best of repeat runs, to smooth out disk cache noise).
+
+    Returns:
+        list: List of failure messages, empty if every module is within budget
+    """
+    failures = []
+    for module, (budget_ms, allowed) in budgets.items():
+        runs = [measure_import(module) for _ in range(repeat)]
+        total_ms, imported = min(runs, key=lambda run: run[0])
+        heavy = sorted(package for package in HEAVY_PACKAGES
+                       if package in imported and package not in allowed)
+        print(f"{module:<12} {total_ms:8.1f} ms (budget {budget_ms} ms)"
+              + (f"  heavy imports: {', '.join(heavy)}" if heavy else ""))
+        if total_ms > budget_ms:
+            failures.append(f"{module} takes {total_ms:.1f} ms to import (budget {budget_ms} ms)")
+        if heavy:
+            failures.append(f"{module} imports {', '.join(heavy)} at module load")
+    return failures
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='Import Time Benchmark',
+        description='Fail if importing the modules got slower or started loading heavy packages eagerly'
+    )
+    parser.add_argument('--repeat', type=int, help='Number of fresh interpreters per module', default=3)
+    args = parser.parse_args()
+
+    failures = check_imports(repeat=args.repeat)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
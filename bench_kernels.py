@@ -0,0 +1,136 @@
+import argparse
+import time
+import numpy as np
+import kernels
+import util_v2
+from evaluate import evaluate_selections
+from instance import CoverageInstance
+
+# Benchmarks the compiled kernels against the pure Python algorithms in util_v2 (and
+# evaluate_selections) on large random instances, checking that every version returns
+# the same selections. Run with --plans 10000 (the default) for the 10k-plan numbers.
+
+
+def random_instance(num_plans, num_tuples, density, seed=0, class_ratios=[0.2, 0.3, 0.5], class_coverages=[0.8, 0.4, 0.1]):
+    """
+    Draws a CoverageInstance directly as CSR arrays (building a networkx graph of this
+    size would dominate the benchmark). Plans come in provider classes like in
+    util_v2.create_satellite_bipartite_graph, with costs growing with coverage.
+
+    Returns:
+        CoverageInstance
+    """
+    rng = np.random.default_rng(seed)
+    classes = rng.choice(len(class_ratios), size=num_plans, p=class_ratios)
+    base_coverage = np.asarray(class_coverages)[classes]
+    coverage = np.clip(base_coverage + rng.normal(0, 0.1, num_plans), 0, 1) * density
+    degrees = rng.binomial(num_tuples, coverage)
+    indptr = np.concatenate([[0], np.cumsum(degrees)])
+    indices = np.concatenate([np.sort(rng.choice(num_tuples, degree, replace=False)) for degree in degrees])
+    costs = (1 + degrees / num_tuples * (1 + base_coverage) * 9).astype(int).tolist()
+    return CoverageInstance([f'S{s}' for s in range(num_plans)], [f'T{t}' for t in range(num_tuples)],
+                            costs, indptr.tolist(), indices.tolist())
+
+
+def best_time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def python_coverage_counts(instance, selected):
+    counts = [0] * instance.num_tuples
+    for s in np.flatnonzero(selected).tolist():
+        for t in instance.plan_tuples(s):
+            counts[t] += 1
+    return np.asarray(counts)
+
+
+def run_benchmarks(instance, num_selections=32, repeat=3, seed=0):
+    """
+    Times every operation with the Python baseline, the NumPy fallback and numba (if
+    installed). The first numba call of each kernel is timed separately as compile time.
+
+    Returns:
+        list: List of (operation, backend, seconds) rows
+    """
+    rng = np.random.default_rng(seed)
+    X = rng.random((num_selections, instance.num_plans)) < 0.05
+    selected = X[0]
+
+    def baselines():
+        yield 'greedy_degree', lambda: util_v2.greedy_degree_based_algorithm(instance)
+        yield 'greedy_cost', lambda: util_v2.greedy_cost_based_algorithm(instance)
+        yield 'greedy_ratio', lambda: util_v2.greedy_ratio_based_algorithm(instance)
+        yield 'lazy_greedy', lambda: util_v2.repair_coverage(instance, None, None, set())
+        yield 'coverage_counts', lambda: python_coverage_counts(instance, selected)
+        yield 'evaluate', lambda: evaluate_selections(instance.incidence_matrix(), np.asarray(instance.costs, dtype=float), X)
+
+    def kernel_calls(use_numba):
+        yield 'greedy_degree', lambda: kernels.greedy(instance, strategy='degree', use_numba=use_numba)
+        yield 'greedy_cost', lambda: kernels.greedy(instance, strategy='cost', use_numba=use_numba)
+        yield 'greedy_ratio', lambda: kernels.greedy(instance, strategy='ratio', use_numba=use_numba)
+        yield 'lazy_greedy', lambda: kernels.lazy_greedy(instance, use_numba=use_numba)
+        yield 'coverage_counts', lambda: kernels.coverage_counts(instance, selected, use_numba=use_numba)
+        yield 'evaluate', lambda: kernels.evaluate(instance, X, use_numba=use_numba)
+
+    # warm the instance caches (orders, incidence matrix) so every backend sees the same state
+    for strategy in ('degree', 'cost', 'ratio'):
+        instance.order(strategy)
+    instance.incidence_matrix()
+
+    rows = []
+    expected = {}
+    for operation, call in baselines():
+        seconds, expected[operation] = best_time(call, repeat)
+        rows.append((operation, 'python', seconds))
+
+    backends = [('numpy', False)] + ([('numba', True)] if kernels.have_numba() else [])
+    for backend, use_numba in backends:
+        for operation, call in kernel_calls(use_numba):
+            if use_numba:
+                compile_seconds, _ = best_time(call, 1)
+                rows.append((operation, 'numba (first call)', compile_seconds))
+            seconds, result = best_time(call, repeat)
+            rows.append((operation, backend, seconds))
+            _check_same(operation, expected[operation], result)
+    return rows
+
+
+def _check_same(operation, expected, result):
+    if operation == 'evaluate':
+        same = all(np.allclose(expected[key], result[key]) for key in ('cost', 'covered', 'redundancy'))
+    elif operation == 'coverage_counts':
+        same = np.array_equal(expected, result)
+    else:
+        same = expected == result
+    assert same, f"{operation}: kernel result differs from the Python version"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='Kernel Benchmark',
+        description='Compare the numba / NumPy kernels with the pure Python greedies and evaluation'
+    )
+    parser.add_argument('--plans', type=int, help='Number of plans (satellites)', default=10000)
+    parser.add_argument('--tuples', type=int, help='Number of (location, time) tuples', default=5000)
+    parser.add_argument('--density', type=float, help='Overall coverage probability', default=0.05)
+    parser.add_argument('--selections', type=int, help='Number of selections to evaluate at once', default=32)
+    parser.add_argument('--repeat', type=int, help='Timed runs per operation (best is reported)', default=3)
+    parser.add_argument('--seed', type=int, help='Random seed', default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    instance = random_instance(args.plans, args.tuples, args.density, seed=args.seed)
+    print(f"{instance.num_plans} plans, {instance.num_tuples} tuples, {len(instance.plan_indices)} edges "
+          f"(generated in {time.perf_counter() - start:.1f} s), numba: {kernels.have_numba()}")
+
+    rows = run_benchmarks(instance, num_selections=args.selections, repeat=args.repeat, seed=args.seed)
+    python_times = {operation: seconds for operation, backend, seconds in rows if backend == 'python'}
+    print(f"{'operation':<16} {'backend':<20} {'ms':>10} {'speedup':>8}")
+    for operation, backend, seconds in rows:
+        speedup = python_times[operation] / seconds if seconds > 0 else float('inf')
+        print(f"{operation:<16} {backend:<20} {1000 * seconds:10.2f} {speedup:7.1f}x")
@@ -0,0 +1,330 @@
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+# Memory and scalability suite: every (algorithm, instance size) point runs in a fresh
+# interpreter so its peak RSS is its own. The suite grows locations, timesteps and plans
+# geometrically one dimension at a time from a base size, per algorithm, until a run
+# exceeds the time or memory budget, then fits the scaling exponents (slope of log time
+# and log memory against log size; memory is the RSS growth of the algorithm itself and
+# its tracemalloc peak) and writes everything to a JSON file that can be
+# compared across releases.
+
+DIMENSIONS = ('locations', 'timesteps', 'satellites')
+
+# untimed first run of every point: imports, numba compilation and gurobi's start-up
+WARMUP_SIZE = {'locations': 2, 'timesteps': 5, 'satellites': 5}
+
+
+def _generate(size, coverage_prob, seed):
+    import numpy as np
+    from util_v2 import create_satellite_bipartite_graph
+    random.seed(seed)
+    np.random.seed(seed)
+    G, tuple_nodes, satellite_nodes = create_satellite_bipartite_graph(size['locations'], size['timesteps'],
+                                                                       size['satellites'], coverage_prob)
+    feasible_tuple_nodes = [node for node in tuple_nodes if G.degree(node) > 0]
+    return G, tuple_nodes, feasible_tuple_nodes, satellite_nodes
+
+
+def _coverage_map(G, tuple_nodes, feasible_tuple_nodes, satellite_nodes, time_limit):
+    from util_v2 import get_coverage_map
+    return get_coverage_map(G, feasible_tuple_nodes, satellite_nodes)
+
+
+def _instance(G, tuple_nodes, feasible_tuple_nodes, satellite_nodes, time_limit):
+    from instance import CoverageInstance
+    return CoverageInstance.from_graph(G, tuple_nodes, satellite_nodes)
+
+
+def _greedy_ratio(G, tuple_nodes, feasible_tuple_nodes, satellite_nodes, time_limit):
+    from util_v2 import greedy_ratio_based_algorithm
+    return greedy_ratio_based_algorithm(G, feasible_tuple_nodes, satellite_nodes)
+
+
+def _lazy_greedy(G, tuple_nodes, feasible_tuple_nodes, satellite_nodes, time_limit):
+    from kernels import lazy_greedy
+    return lazy_greedy(G, feasible_tuple_nodes, satellite_nodes)
+
+
+def _find_all_valid_coverages(G, tuple_nodes, feasible_tuple_nodes, satellite_nodes, time_limit):
+    from util_v2 import find_all_valid_coverages
+    return find_all_valid_coverages(G, feasible_tuple_nodes, satellite_nodes, k=10)
+
+
+def _ilp_model(G, tuple_nodes, feasible_tuple_nodes, satellite_nodes, time_limit):
+    from solver import build_weighted_set_cover_model
+    m, x = build_weighted_set_cover_model(G, feasible_tuple_nodes, satellite_nodes)
+    m.update()
+    return m, x
+
+
+def _ilp(G, tuple_nodes, feasible_tuple_nodes, satellite_nodes, time_limit):
+    from solver import weighted_set_cover_ilp
+    return weighted_set_cover_ilp(G, feasible_tuple_nodes, satellite_nodes, time_limit=time_limit, log_to_console=False)
+
+
+# algorithm -> function of (G, tuple_nodes, feasible_tuple_nodes, satellite_nodes, time_limit);
+# 'generate' measures the instance generator itself
+ALGORITHMS = {
+    'generate': None,
+    'coverage_map': _coverage_map,
+    'instance': _instance,
+    'greedy_ratio': _greedy_ratio,
+    'lazy_greedy': _lazy_greedy,
+    'find_all_valid_coverages': _find_all_valid_coverages,
+    'ilp_model': _ilp_model,
+    'ilp': _ilp,
+}
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _rss_mb():
+    # current resident set size: /proc on Linux, psutil elsewhere (None without either)
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except OSError:
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def _measure(call, trace, sample_rss=False, interval=0.001):
+    # sample_rss polls the current RSS from a thread while call runs; the process-wide
+    # ru_maxrss cannot be used, it keeps the peak of everything before the call
+    samples = []
+    done = threading.Event()
+    sampler = None
+    if sample_rss:
+        samples.append(_rss_mb())
+
+        def sample():
+            while not done.wait(interval):
+                samples.append(_rss_mb())
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = call()
+    seconds = time.perf_counter() - start
+    peak = None
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+    rss_peak = None
+    if sampler is not None:
+        done.set()
+        sampler.join()
+        # the result is still alive here, so what it holds counts too
+        samples.append(_rss_mb())
+        if samples[0] is not None:
+            rss_peak = max(samples)
+    del result
+    return seconds, peak, (samples[0] if sample_rss else None), rss_peak
+
+
+def run_point(algorithm, size, coverage_prob=0.1, seed=0, time_limit=60, trace=True):
+    """
+    Measures one algorithm on one generated instance, in this process. The algorithm first
+    runs untimed on a WARMUP_SIZE instance (its time is warmup_seconds), so that imports
+    and numba compilation stay out of the measurement. The instance is generated next
+    (except for 'generate' itself). rss_before_mb is the current RSS right before the timed
+    run and rss_delta_mb how far the RSS sampled during the run rose above it, the memory
+    the algorithm itself adds (None where the current RSS cannot be read); peak_rss_mb is
+    the process peak after the run. Wall time comes from the untraced run; the tracemalloc
+    peak (Python allocations only, gurobi's native memory is not included) from a second,
+    traced run if trace is set.
+
+    Returns:
+        dict: 'seconds', 'warmup_seconds', 'tracemalloc_peak_mb', 'rss_before_mb',
+        'peak_rss_mb' and 'rss_delta_mb'
+    """
+    def make_call(size):
+        if algorithm == 'generate':
+            return lambda: _generate(size, coverage_prob, seed)
+        G, tuple_nodes, feasible_tuple_nodes, satellite_nodes = _generate(size, coverage_prob, seed)
+        return lambda: ALGORITHMS[algorithm](G, tuple_nodes, feasible_tuple_nodes, satellite_nodes, time_limit)
+
+    warmup_seconds = _measure(make_call(WARMUP_SIZE), trace=False)[0]
+    call = make_call(size)
+    seconds, _, rss_before, rss_peak = _measure(call, trace=False, sample_rss=True)
+    peak_rss = _peak_rss_mb()
+    tracemalloc_peak = _measure(call, trace=True)[1] if trace else None
+    return {'seconds': seconds, 'warmup_seconds': warmup_seconds, 'tracemalloc_peak_mb': tracemalloc_peak,
+            'rss_before_mb': rss_before, 'peak_rss_mb': peak_rss,
+            'rss_delta_mb': None if rss_peak is None else rss_peak - rss_before}
+
+
+def run_point_subprocess(algorithm, size, coverage_prob=0.1, seed=0, time_limit=60, trace=True):
+    """
+    run_point in a fresh interpreter, killed after four times the time budget plus a
+    minute (room for the generation and the untraced and traced runs).
+
+    Returns:
+        dict: the run_point result plus 'status' ('ok', 'timeout' or 'error')
+    """
+    command = [sys.executable, os.path.abspath(__file__), '--child', algorithm,
+               '--coverage-prob', str(coverage_prob), '--seed', str(seed), '--time-limit', str(time_limit),
+               '--size', str(size['locations']), str(size['timesteps']), str(size['satellites'])]
+    if not trace:
+        command.append('--no-trace')
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=4 * time_limit + 60,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+    except subprocess.TimeoutExpired:
+        return {'status': 'timeout'}
+    if result.returncode != 0:
+        return {'status': 'error', 'error': result.stderr.strip().splitlines()[-1] if result.stderr.strip() else ''}
+    measurement = json.loads(result.stdout.strip().splitlines()[-1])
+    measurement['status'] = 'ok'
+    return measurement
+
+
+def fit_exponent(sizes, values):
+    """
+    Least-squares slope of log(value) against log(size): value grows like size^exponent.
+
+    Returns:
+        float: the exponent, or None with fewer than two usable points
+    """
+    import numpy as np
+    points = [(size, value) for size, value in zip(sizes, values) if value is not None and value > 0]
+    if len(points) < 2:
+        return None
+    x = np.log([size for size, _ in points])
+    y = np.log([value for _, value in points])
+    return float(np.polyfit(x, y, 1)[0])
+
+
+def sweep(algorithms, base, dimensions=DIMENSIONS, factor=2, max_steps=6, time_budget=60, memory_budget_mb=4096,
+          coverage_prob=0.1, seed=0, trace=True, log=print):
+    """
+    For every algorithm and dimension, grows that dimension by factor per step (up to
+    max_steps steps, the others stay at base) until a run takes longer than time_budget
+    seconds, adds more than memory_budget_mb of RSS (rss_delta_mb, the generator's own
+    memory is not counted except for 'generate'; the process peak where the current RSS
+    cannot be read), or fails.
+
+    Returns:
+        dict: 'runs' (every measurement), 'exponents' (algorithm -> dimension -> time, RSS
+              growth and tracemalloc exponents) and 'largest' (algorithm -> dimension -> largest size within budget)
+    """
+    runs = []
+    exponents = {}
+    largest = {}
+    for algorithm in algorithms:
+        exponents[algorithm] = {}
+        largest[algorithm] = {}
+        for dimension in dimensions:
+            points = []
+            for step in range(max_steps):
+                size = dict(base)
+                size[dimension] = int(round(base[dimension] * factor ** step))
+                measurement = run_point_subprocess(algorithm, size, coverage_prob=coverage_prob, seed=seed,
+                                                   time_limit=time_budget, trace=trace)
+                ok = measurement['status'] == 'ok'
+                if ok:
+                    memory = measurement['rss_delta_mb']
+                    if memory is None:
+                        memory = measurement['peak_rss_mb']
+                within = ok and measurement['seconds'] <= time_budget and memory <= memory_budget_mb
+                runs.append({'algorithm': algorithm, 'dimension': dimension, 'size': size,
+                             'within_budget': within, **measurement})
+                log(f"{algorithm:<26} {dimension:<10} {size[dimension]:>7}: {measurement['status']}"
+                    + (f" {measurement['seconds']:.3f} s, +{memory:.1f} MB RSS" if ok else ''))
+                if not within:
+                    break
+                points.append((size[dimension], measurement))
+            largest[algorithm][dimension] = points[-1][0] if points else None
+            exponents[algorithm][dimension] = {
+                'time': fit_exponent([size for size, _ in points], [m['seconds'] for _, m in points]),
+                'rss': fit_exponent([size for size, _ in points], [m['rss_delta_mb'] for _, m in points]),
+                'tracemalloc': fit_exponent([size for size, _ in points], [m['tracemalloc_peak_mb'] for _, m in points]),
+            }
+    return {'runs': runs, 'exponents': exponents, 'largest': largest}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='Scalability Benchmark',
+        description='Sweep instance sizes per algorithm, recording wall time, peak RSS and tracemalloc peaks'
+    )
+    parser.add_argument('--algorithms', nargs='+', choices=list(ALGORITHMS), default=list(ALGORITHMS))
+    parser.add_argument('--dimensions', nargs='+', choices=DIMENSIONS, default=list(DIMENSIONS))
+    parser.add_argument('--base', type=int, nargs=3, metavar=('LOCATIONS', 'TIMESTEPS', 'SATELLITES'),
+                        help='Base instance size', default=[5, 50, 50])
+    parser.add_argument('--factor', type=float, help='Growth factor per step', default=2)
+    parser.add_argument('--max-steps', type=int, help='Steps per dimension', default=6)
+    parser.add_argument('--time-budget', type=float, help='Seconds per run (also the ILP time limit)', default=60)
+    parser.add_argument('--memory-budget', type=float, help='RSS growth per run in MB', default=4096)
+    parser.add_argument('--coverage-prob', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-trace', action='store_true', help='Skip the tracemalloc runs')
+    parser.add_argument('--output', help='JSON results file', default='scalability.json')
+    # internal: measure a single point in this process
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--size', type=int, nargs=3, help=argparse.SUPPRESS)
+    parser.add_argument('--time-limit', type=float, help=argparse.SUPPRESS, default=60)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        size = dict(zip(DIMENSIONS, args.size))
+        print(json.dumps(run_point(args.child, size, coverage_prob=args.coverage_prob, seed=args.seed,
+                                   time_limit=args.time_limit, trace=not args.no_trace)))
+        sys.exit(0)
+
+    base = dict(zip(DIMENSIONS, args.base))
+    results = sweep(args.algorithms, base, dimensions=args.dimensions, factor=args.factor, max_steps=args.max_steps,
+                    time_budget=args.time_budget, memory_budget_mb=args.memory_budget,
+                    coverage_prob=args.coverage_prob, seed=args.seed, trace=not args.no_trace)
+    results['meta'] = {
+        'date': datetime.now(timezone.utc).isoformat(),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'base': base,
+        'factor': args.factor,
+        'time_budget': args.time_budget,
+        'memory_budget_mb': args.memory_budget,
+        'coverage_prob': args.coverage_prob,
+        'seed': args.seed,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=1)
+
+    print(f"{'algorithm':<26} {'dimension':<10} {'largest':>8} {'time exp':>9} {'rss exp':>8} {'mem exp':>8}")
+    for algorithm, dimensions in results['largest'].items():
+        for dimension, size in dimensions.items():
+            fit = results['exponents'][algorithm][dimension]
+            print(f"{algorithm:<26} {dimension:<10} {str(size):>8} "
+                  f"{'-' if fit['time'] is None else format(fit['time'], '.2f'):>9} "
+                  f"{'-' if fit['rss'] is None else format(fit['rss'], '.2f'):>8} "
+                  f"{'-' if fit['tracemalloc'] is None else format(fit['tracemalloc'], '.2f'):>8}")
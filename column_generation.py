@@ -0,0 +1,257 @@
+import argparse
+import time
+from collections import deque
+
+# Column generation for plan catalogs that are only defined implicitly, e.g. "any
+# contiguous timestep window of this provider's footprint at base + rate * length".
+# The set cover LP is solved over a small restricted set of plans; a pricing oracle
+# then returns the plans whose reduced cost at the current dual prices is negative
+# (the only ones that can improve the LP), they are added and the LP is re-solved
+# until none are left. The final integer solve runs on the generated plans only.
+#
+# A catalog is any object with a price(duals, tol) method returning a list of
+# (label, cost, covered_tuples) columns, duals being a dict of tuple -> dual price.
+# columns() should enumerate the whole catalog, used to materialize small catalogs
+# as a regular coverage graph.
+
+
+class WindowCatalog:
+    """
+    Every provider sells any contiguous window of timesteps over its footprint of
+    locations, at base_price + price_per_timestep * window length. providers maps the
+    provider name to (locations, base_price, price_per_timestep); windows are between
+    min_length and max_length timesteps (None: no limit).
+    """
+
+    def __init__(self, providers, timesteps, min_length=1, max_length=None):
+        self.providers = providers
+        self.timesteps = timesteps
+        self.min_length = min_length
+        self.max_length = max_length or timesteps
+
+    def _column(self, provider, start, end):
+        locations, base_price, price_per_timestep = self.providers[provider]
+        covered = [(location, f'T{t}') for t in range(start, end) for location in locations]
+        return f'{provider}[T{start}-T{end - 1}]', base_price + price_per_timestep * (end - start), covered
+
+    def columns(self):
+        for provider in self.providers:
+            for start in range(self.timesteps):
+                for end in range(start + self.min_length, min(start + self.max_length, self.timesteps) + 1):
+                    yield self._column(provider, start, end)
+
+    def price(self, duals, tol=1e-9):
+        """
+        Best window of every provider: with v[t] the dual value of timestep t over the
+        footprint minus the per-timestep price, the window maximizing sum(v) is a maximum
+        subarray of bounded length (prefix sums and a sliding-window minimum). The column
+        is returned if that sum exceeds the base price, i.e. its reduced cost is negative.
+
+        Returns:
+            list: List of (label, cost, covered_tuples) columns
+        """
+        columns = []
+        for provider, (locations, base_price, price_per_timestep) in self.providers.items():
+            prefix = [0.0]
+            for t in range(self.timesteps):
+                value = sum(duals.get((location, f'T{t}'), 0) for location in locations)
+                prefix.append(prefix[-1] + value - price_per_timestep)
+            best, best_window = -float('inf'), None
+            # candidate window starts a in [end - max_length, end - min_length], kept by increasing prefix
+            starts = deque()
+            for end in range(self.min_length, self.timesteps + 1):
+                a = end - self.min_length
+                while starts and prefix[starts[-1]] >= prefix[a]:
+                    starts.pop()
+                starts.append(a)
+                while starts[0] < end - self.max_length:
+                    starts.popleft()
+                if prefix[end] - prefix[starts[0]] > best:
+                    best, best_window = prefix[end] - prefix[starts[0]], (starts[0], end)
+            if best_window is not None and best - base_price > tol:
+                columns.append(self._column(provider, *best_window))
+        return columns
+
+
+class LocationSubsetCatalog:
+    """
+    Every provider sells any subset of at most max_locations locations over its fixed
+    timesteps, at base_price + price_per_location * number of locations. providers maps
+    the provider name to (timesteps, base_price, price_per_location, max_locations).
+    """
+
+    def __init__(self, providers, locations):
+        self.providers = providers
+        self.locations = locations
+
+    def _column(self, provider, chosen):
+        timesteps, base_price, price_per_location, max_locations = self.providers[provider]
+        chosen = sorted(chosen, key=self.locations.index)
+        covered = [(location, f'T{t}') for location in chosen for t in timesteps]
+        return f'{provider}{{{",".join(chosen)}}}', base_price + price_per_location * len(chosen), covered
+
+    def columns(self):
+        from itertools import combinations
+        for provider, (timesteps, base_price, price_per_location, max_locations) in self.providers.items():
+            for size in range(1, max_locations + 1):
+                for chosen in combinations(self.locations, size):
+                    yield self._column(provider, chosen)
+
+    def price(self, duals, tol=1e-9):
+        """
+        With a linear price the best subset of every provider is simply its (at most
+        max_locations) locations with the largest positive dual value minus the
+        per-location price.
+
+        Returns:
+            list: List of (label, cost, covered_tuples) columns
+        """
+        columns = []
+        for provider, (timesteps, base_price, price_per_location, max_locations) in self.providers.items():
+            values = {location: sum(duals.get((location, f'T{t}'), 0) for t in timesteps) - price_per_location
+                      for location in self.locations}
+            chosen = sorted((location for location in self.locations if values[location] > tol),
+                            key=lambda location: values[location], reverse=True)[:max_locations]
+            if chosen and sum(values[location] for location in chosen) - base_price > tol:
+                columns.append(self._column(provider, chosen))
+        return columns
+
+
+def materialize(catalogs, tuple_nodes):
+    """
+    Enumerates the whole catalogs as a regular coverage graph, for comparing with the
+    explicit algorithms on small catalogs.
+
+    Returns:
+        tuple: (G, tuple_nodes, satellite_nodes)
+    """
+    import networkx as nx
+    G = nx.Graph()
+    G.add_nodes_from(tuple_nodes, bipartite=0)
+    required = set(tuple_nodes)
+    satellite_nodes = {}
+    for catalog in catalogs:
+        for label, cost, covered in catalog.columns():
+            satellite_nodes[label] = cost
+            G.add_node(label, bipartite=1, cost=cost)
+            G.add_edges_from((tuple_node, label) for tuple_node in covered if tuple_node in required)
+    return G, tuple_nodes, satellite_nodes
+
+
+def column_generation(catalogs, tuple_nodes, max_iterations=1000, time_limit=None, artificial_cost=1e6, log_to_console=False, return_info=False):
+    """
+    Solves the set cover over the plans of one or more implicit catalogs. Every tuple
+    starts with an artificial column of cost artificial_cost so the first restricted LP
+    is feasible; each iteration adds every catalog's negative reduced cost columns. Once
+    no catalog prices out (or after max_iterations), the restricted master is solved as
+    a binary program over the generated columns (time_limit applies to that solve).
+    Tuples no catalog plan covers keep their artificial column and are left uncovered.
+    With return_info=True a third value holds 'lp_bound' (a lower bound on the optimum
+    over the full catalogs if the pricing converged), 'converged', 'iterations',
+    'generated' (number of columns), 'columns' (label -> (cost, covered tuples) of the
+    selected plans) and 'uncovered'.
+
+    Returns:
+        tuple: (satellite_set, total_cost) or (satellite_set, total_cost, info)
+    """
+    from gurobipy import Model, GRB, Column
+    m = Model("column_generation_master")
+    m.Params.LogToConsole = int(log_to_console)
+    required = set(tuple_nodes)
+    constraints = {}
+    artificials = {}
+    for tuple_node in tuple_nodes:
+        artificials[tuple_node] = m.addVar(lb=0, obj=artificial_cost, name=f"a_{tuple_node}")
+    m.update()
+    for tuple_node in tuple_nodes:
+        constraints[tuple_node] = m.addConstr(artificials[tuple_node] >= 1)
+
+    columns = {}
+    variables = {}
+    converged = False
+    iterations = 0
+    start = time.time()
+    while iterations < max_iterations:
+        m.optimize()
+        iterations += 1
+        duals = {tuple_node: constraint.Pi for tuple_node, constraint in constraints.items()}
+        added = 0
+        for catalog in catalogs:
+            for label, cost, covered in catalog.price(duals):
+                if label in columns:
+                    continue
+                covered = [tuple_node for tuple_node in covered if tuple_node in required]
+                columns[label] = (cost, covered)
+                variables[label] = m.addVar(lb=0, obj=cost, name=f"x_{label}",
+                                            column=Column([1] * len(covered), [constraints[node] for node in covered]))
+                added += 1
+        if added == 0:
+            converged = True
+            break
+    # artificial columns left in the LP belong to tuples no plan covers (for an artificial_cost
+    # above every plan price), so their cost is not part of the bound
+    lp_bound = m.ObjVal - artificial_cost * sum(var.X for var in artificials.values())
+    lp_time = time.time() - start
+
+    # restricted master as an integer program over the generated columns
+    for var in variables.values():
+        var.VType = GRB.BINARY
+    for var in artificials.values():
+        var.VType = GRB.BINARY
+    if time_limit is not None:
+        m.Params.TimeLimit = time_limit
+    m.optimize()
+
+    satellite_set, total_cost = None, None
+    uncovered = []
+    if m.SolCount > 0:
+        satellite_set = set(label for label, var in variables.items() if var.X > 0.5)
+        total_cost = sum(columns[label][0] for label in satellite_set)
+        uncovered = [tuple_node for tuple_node, var in artificials.items() if var.X > 0.5]
+
+    if return_info:
+        info = {'lp_bound': lp_bound, 'converged': converged, 'iterations': iterations, 'generated': len(columns),
+                'columns': {label: columns[label] for label in satellite_set or ()}, 'uncovered': uncovered,
+                'lp_time': lp_time, 'ip_time': m.Runtime}
+        return satellite_set, total_cost, info
+    return satellite_set, total_cost
+
+
+if __name__ == '__main__':
+    import random
+
+    parser = argparse.ArgumentParser(
+        prog='Column Generation',
+        description='Solve set cover over implicit window / location-subset plan catalogs'
+    )
+    parser.add_argument('--locations', type=int, default=10)
+    parser.add_argument('--timesteps', type=int, default=80)
+    parser.add_argument('--providers', type=int, default=8)
+    parser.add_argument('--max-locations', type=int, default=4)
+    parser.add_argument('--compare', action='store_true', help='Also run the ILP on the materialized catalogs')
+    parser.add_argument('--time-limit', type=float, default=60)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    locations = [f'L{l}' for l in range(args.locations)]
+    tuple_nodes = [(location, f'T{t}') for location in locations for t in range(args.timesteps)]
+    windows = WindowCatalog({f'W{p}': (random.sample(locations, random.randint(1, args.locations)),
+                                       random.randint(5, 20), random.randint(1, 4))
+                             for p in range(args.providers)}, args.timesteps)
+    subsets = LocationSubsetCatalog({f'P{p}': (list(range(args.timesteps)), random.randint(50, 200), random.randint(20, 80),
+                                               args.max_locations)
+                                     for p in range(args.providers)}, locations)
+
+    start = time.time()
+    satellite_set, total_cost, info = column_generation([windows, subsets], tuple_nodes,
+                                                        time_limit=args.time_limit, return_info=True)
+    print(f"column generation: cost {total_cost}, LP bound {info['lp_bound']:.2f}, {info['generated']} columns "
+          f"in {info['iterations']} iterations ({time.time() - start:.2f} s)")
+    if args.compare:
+        from solver import weighted_set_cover_ilp
+        start = time.time()
+        G, tuple_nodes, satellite_nodes = materialize([windows, subsets], tuple_nodes)
+        _, full_cost = weighted_set_cover_ilp(G, tuple_nodes, satellite_nodes, time_limit=args.time_limit,
+                                              log_to_console=False)
+        print(f"full catalog ILP: cost {full_cost} over {len(satellite_nodes)} plans ({time.time() - start:.2f} s)")
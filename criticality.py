@@ -0,0 +1,261 @@
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from array import array
+from instance import as_instance
+from kernels import csr_arrays, _demand_vector, _kernel
+
+# Plan criticality: how much the optimum goes up if one plan of the optimal selection
+# becomes unavailable. Instead of one cold ILP per plan, everything starts from a single
+# solve whose solution pool is kept:
+# - a plan outside the optimal selection costs nothing to lose
+# - a plan that some tuple needs (it has no more plans than its demand) cannot be lost at
+#   all (infeasible)
+# - a pool solution without the plan, or the optimal selection without it repaired by the
+#   multicover greedy, is an upper bound; the LP relaxation with the plan fixed to 0,
+#   re-solved on one warm LP model, is a lower bound. When they meet (after rounding the bound up for
+#   integer costs) the what-if is answered without a MIP.
+# The remaining what-ifs are solved on a few warm MIP models in parallel, one model and
+# gurobi environment per worker thread (splitting the cores between them), each starting
+# from the best known upper bound and stopping once it meets the lower bound. Solutions
+# found by any what-if are shared and answer later what-ifs they already meet the bound of.
+
+METHODS = ('not selected', 'infeasible', 'bounds', 'solve')
+
+
+def _solve_what_ifs(instance, tuple_ids, what_ifs, time_limit, threads, found):
+    # what_ifs: list of (plan, incumbent plans, lower bound); one warm model for all of them,
+    # only the bound of the lost plan and the start change between solves. Every solution
+    # found on the way goes to found (a list shared by the workers): it is an upper bound
+    # for all the plans it does without, and often already meets the lower bound of a
+    # later what-if, which then needs no solve.
+    from gurobipy import GRB
+    from portfolio import _quiet_env
+    from solver import _build_model
+    costs = np.asarray(instance.costs, dtype=float)
+    results = {}
+    with _quiet_env() as env:
+        m, x = _build_model(instance, tuple_ids, vtype=GRB.BINARY, name="plan_criticality", env=env)
+        variables = [x[sat] for sat in instance.satellite_labels]
+        m.Params.Threads = threads
+        if time_limit is not None:
+            m.Params.TimeLimit = time_limit
+        for s, incumbent, lower in what_ifs:
+            others = [solution for solution in list(found) if not solution[s]]
+            if others:
+                best = min(others, key=lambda solution: solution @ costs)
+                if not incumbent or best @ costs < instance.total_cost(incumbent):
+                    incumbent = np.flatnonzero(best).tolist()
+            if incumbent and instance.total_cost(incumbent) <= lower + 1e-9:
+                results[s] = (incumbent, True, 0.0, 'bounds')
+                continue
+
+            variables[s].UB = 0
+            chosen = set(incumbent)
+            for other, var in enumerate(variables):
+                var.Start = 1 if other in chosen else 0
+            # nothing beats the lower bound, stop as soon as a solution reaches it
+            m.Params.BestObjStop = lower
+            m.optimize()
+            if m.SolCount > 0:
+                for k in range(m.SolCount):
+                    m.Params.SolutionNumber = k
+                    found.append(np.array(m.getAttr('Xn', variables)) > 0.5)
+                plans = [other for other, var in enumerate(variables) if var.X > 0.5]
+                optimal = m.Status == GRB.OPTIMAL or instance.total_cost(plans) <= lower + 1e-9
+                results[s] = (plans, optimal, m.Runtime, 'solve')
+            else:
+                # no solution even with the incumbent as a start: nothing covers without s
+                results[s] = (None, m.Status == GRB.INFEASIBLE, m.Runtime, 'solve')
+            variables[s].UB = 1
+    return results
+
+
+def plan_criticality(G, tuple_nodes=None, satellites=None, workers=1, time_limit=None, pool_solutions=100, return_info=False):
+    """
+    Marginal cost of losing each satellite: the optimal cost without it minus the optimum.
+    Every satellite gets an entry; those outside the optimal selection have marginal 0 and
+    those some tuple cannot do without (its demand, 1 without demands, equals its number of
+    satellites) an infinite one. The rest come from bounds where the bounds meet and from
+    warm re-solves on workers threads otherwise (time_limit applies to the first solve and
+    to each re-solve).
+
+    Returns:
+        dict: satellite -> {'marginal', 'cost_without', 'satellite_set' (the cheapest set
+        found without it, None if there is none), 'method' (one of METHODS), 'optimal'
+        (False if a time limit cut the solve short)}, or (table, info) with return_info=True,
+        info holding the 'base_cost', the 'selected' satellites, the number of what-ifs
+        answered by each method and the 'base_time', 'bound_time' and 'solve_time'
+    """
+    from gurobipy import GRB
+    from solver import _build_model, _model_rows
+    from portfolio import _quiet_env
+    instance, tuple_ids = as_instance(G, tuple_nodes, satellites)
+    tuple_ids = _model_rows(instance, tuple_ids)
+    demands = _demand_vector(instance, array('i', tuple_ids))
+    costs = np.asarray(instance.costs, dtype=float)
+    integral = np.asarray(instance.costs).dtype.kind in 'iu'
+
+    # base solve, keeping the solution pool
+    start = time.time()
+    with _quiet_env() as env:
+        m, x = _build_model(instance, tuple_ids, vtype=GRB.BINARY, name="plan_criticality", env=env)
+        variables = [x[sat] for sat in instance.satellite_labels]
+        m.Params.PoolSolutions = pool_solutions
+        if time_limit is not None:
+            m.Params.TimeLimit = time_limit
+        m.optimize()
+        assert m.SolCount > 0, f"No solution for the full problem (status {m.Status})"
+        base_optimal = m.Status == GRB.OPTIMAL
+        pool = np.zeros((m.SolCount, instance.num_plans), dtype=bool)
+        for i in range(m.SolCount):
+            m.Params.SolutionNumber = i
+            pool[i] = np.array(m.getAttr('Xn', variables)) > 0.5
+    pool_costs = pool @ costs
+    selected = np.flatnonzero(pool[0]).tolist()
+    base_cost = instance.total_cost(selected)
+    base_time = time.time() - start
+
+    table = {}
+
+    def record(s, plans, method, optimal):
+        if plans is None:
+            marginal, cost_without = math.inf, math.inf
+        else:
+            cost_without = instance.total_cost(plans)
+            marginal = cost_without - base_cost
+        table[instance.satellite_labels[s]] = {'marginal': marginal, 'cost_without': cost_without,
+                                               'satellite_set': None if plans is None else instance.labels(plans),
+                                               'method': method, 'optimal': optimal and base_optimal}
+
+    for s in range(instance.num_plans):
+        if not pool[0, s]:
+            record(s, selected, 'not selected', True)
+    sole_cover = set(s for t in tuple_ids if instance.tuple_degrees[t] <= demands[t] for s in instance.tuple_plans(t))
+    for s in selected:
+        if s in sole_cover:
+            record(s, None, 'infeasible', True)
+
+    # upper bounds from the pool and the greedy repair, lower bounds from one warm LP
+    start = time.time()
+    indptr, indices = csr_arrays(instance)
+    multicover_greedy = _kernel('multicover_greedy', None)
+    what_ifs = []
+    with _quiet_env() as env:
+        lp, lp_x = _build_model(instance, tuple_ids, vtype=GRB.CONTINUOUS, name="plan_criticality_lp", env=env)
+        lp_variables = [lp_x[sat] for sat in instance.satellite_labels]
+        lp.optimize()
+        for s in selected:
+            if s in sole_cover:
+                continue
+            without = ~pool[:, s]
+            if without.any():
+                i = np.flatnonzero(without)[np.argmin(pool_costs[without])]
+                incumbent = np.flatnonzero(pool[i]).tolist()
+            else:
+                incumbent = None
+            start_set = pool[0].copy()
+            start_set[s] = False
+            excluded_costs = costs.copy()
+            excluded_costs[s] = math.inf
+            repaired = multicover_greedy(indptr, indices, excluded_costs, demands, start_set)
+            # the greedy only falls back on s when nothing else meets some demand
+            if not repaired[s]:
+                repaired = np.flatnonzero(repaired).tolist()
+                if incumbent is None or instance.total_cost(repaired) < instance.total_cost(incumbent):
+                    incumbent = repaired
+            if incumbent is None:
+                what_ifs.append((s, [], base_cost))
+                continue
+
+            upper = instance.total_cost(incumbent)
+            if upper <= base_cost:
+                record(s, incumbent, 'bounds', True)
+                continue
+            lp_variables[s].UB = 0
+            lp.optimize()
+            # losing a plan never makes the optimum cheaper
+            lower = max(lp.ObjVal, base_cost) if lp.Status == GRB.OPTIMAL else base_cost
+            lp_variables[s].UB = 1
+            if integral:
+                lower = math.ceil(lower - 1e-6)
+            if lower >= upper - 1e-9:
+                record(s, incumbent, 'bounds', True)
+            else:
+                what_ifs.append((s, incumbent, lower))
+    bound_time = time.time() - start
+
+    # the rest on warm models, one per worker
+    start = time.time()
+    if what_ifs:
+        chunks = [what_ifs[i::workers] for i in range(min(workers, len(what_ifs)))]
+        # the workers share the cores instead of each gurobi using all of them
+        threads = max(1, (os.cpu_count() or 1) // len(chunks))
+        found = []
+        with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+            results = list(executor.map(
+                lambda chunk: _solve_what_ifs(instance, tuple_ids, chunk, time_limit, threads, found), chunks))
+        for chunk_results in results:
+            for s, (plans, optimal, runtime, method) in chunk_results.items():
+                record(s, plans, method, optimal)
+    solve_time = time.time() - start
+
+    if return_info:
+        counts = {method: 0 for method in METHODS}
+        for entry in table.values():
+            counts[entry['method']] += 1
+        info = {'base_cost': base_cost, 'selected': instance.labels(selected), 'methods': counts,
+                'base_time': base_time, 'bound_time': bound_time, 'solve_time': solve_time}
+        return table, info
+    return table
+
+
+if __name__ == '__main__':
+    import random
+    from kernels import multicover_greedy
+    from util_v2 import create_satellite_bipartite_graph
+
+    parser = argparse.ArgumentParser(
+        prog='Plan Criticality',
+        description='Marginal cost of losing each selected plan, batched vs one cold ILP per plan'
+    )
+    parser.add_argument('--locations', type=int, default=5)
+    parser.add_argument('--timesteps', type=int, default=50)
+    parser.add_argument('--satellites', type=int, default=50)
+    parser.add_argument('--coverage-prob', type=float, default=0.1)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--compare', action='store_true', help='Also run one cold ILP per selected plan')
+    parser.add_argument('--time-limit', type=float, default=60)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    G, tuple_nodes, satellite_nodes = create_satellite_bipartite_graph(args.locations, args.timesteps, args.satellites,
+                                                                       args.coverage_prob)
+    feasible_tuple_nodes = [node for node in tuple_nodes if G.degree(node) > 0]
+    # numba (if installed) compiles the repair greedy on first use, keep that out of the timings
+    multicover_greedy(G, feasible_tuple_nodes, satellite_nodes)
+    start = time.time()
+    table, info = plan_criticality(G, feasible_tuple_nodes, satellite_nodes, workers=args.workers,
+                                   time_limit=args.time_limit, return_info=True)
+    print(f"batched: {time.time() - start:.2f} s, optimum {info['base_cost']}, {info['methods']}")
+    for sat in sorted(info['selected'], key=lambda sat: -table[sat]['marginal']):
+        print(f"  {sat}: +{table[sat]['marginal']} ({table[sat]['method']})")
+
+    if args.compare:
+        from solver import weighted_set_cover_ilp
+        start = time.time()
+        for sat in info['selected']:
+            if table[sat]['method'] == 'infeasible':
+                # the cold model would just drop the tuples nobody else covers
+                continue
+            others = {other: cost for other, cost in satellite_nodes.items() if other != sat}
+            _, cost_without = weighted_set_cover_ilp(G, feasible_tuple_nodes, others, time_limit=args.time_limit,
+                                                     log_to_console=False)
+            marginal = math.inf if cost_without is None else cost_without - info['base_cost']
+            assert marginal == table[sat]['marginal'], f"{sat}: {marginal} != {table[sat]['marginal']}"
+        print(f"cold ILP per plan: {time.time() - start:.2f} s, same marginals")
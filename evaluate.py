@@ -0,0 +1,142 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from instance import as_instance
+
+
+def selection_matrix(selections, satellite_list):
+    """
+    Stacks satellite sets into a boolean selection matrix.
+
+    Returns:
+        np.ndarray: bool array (K, S), X[k, s] is True if satellite_list[s] is in selections[k]
+    """
+    satellite_index = {sat: s for s, sat in enumerate(satellite_list)}
+    X = np.zeros((len(selections), len(satellite_list)), dtype=bool)
+    for k, satellite_set in enumerate(selections):
+        X[k, [satellite_index[sat] for sat in satellite_set]] = True
+    return X
+
+
+def evaluate_selections(A, costs, X, required=None, tuple_locations=None, reference_cost=None, verify=False, strict=False,
+                        tol=1e-6):
+    """
+    Evaluates K candidate selections at once with one sparse product X @ A.
+
+    A is the (S, T) incidence matrix, costs the (S,) plan costs and X a (K, S) boolean
+    selection matrix. required marks the tuples a selection has to cover (defaults to
+    every tuple some plan can cover, i.e. all_coverable_tuple_nodes in the scripts).
+    tuple_locations gives an integer location id per tuple for the per-location breakdown.
+    With verify=True selections that miss a required tuple or are cheaper than
+    reference_cost (the "SOMETHING WENT WRONG!" cases) are flagged in 'suspect' and
+    reported with a warning; verify may also be a boolean mask over the K selections to
+    only check some of them. A reference that is not optimal (e.g. a time-limited ILP) can
+    legitimately be beaten, so only strict=True turns the warning into an AssertionError.
+
+    Returns:
+        dict: arrays keyed by 'cost', 'covered', 'coverage_percent', 'redundancy',
+              'feasible', 'gap', 'below_reference', 'suspect' and 'location_coverage' (K, L)
+    """
+    A = csr_matrix(A)
+    X = np.asarray(X, dtype=bool)
+    costs = np.asarray(costs, dtype=float)
+    if required is None:
+        required = np.asarray(A.sum(axis=0)).ravel() > 0
+    required = np.asarray(required, dtype=bool)
+    num_required = int(required.sum())
+
+    # counts[k, t] = number of selected plans covering tuple t
+    counts = (csr_matrix(X, dtype=np.int32) @ A)[:, np.flatnonzero(required)].tocsr()
+    covered_tuples = counts > 0
+    covered = np.asarray(covered_tuples.sum(axis=1)).ravel()
+    incidences = np.asarray(counts.sum(axis=1)).ravel()
+
+    results = {
+        'cost': X @ costs,
+        'covered': covered,
+        'coverage_percent': 100 * covered / max(num_required, 1),
+        'redundancy': np.divide(incidences, covered, out=np.zeros(len(X)), where=covered > 0),
+        'feasible': covered == num_required,
+    }
+
+    if tuple_locations is not None:
+        locations = np.asarray(tuple_locations)[required]
+        num_locations = int(locations.max()) + 1 if len(locations) else 0
+        L = csr_matrix((np.ones(len(locations)), (np.arange(len(locations)), locations)),
+                       shape=(len(locations), num_locations))
+        per_location = np.asarray((covered_tuples.astype(np.int32) @ L).todense())
+        tuples_per_location = np.bincount(locations, minlength=num_locations)
+        results['location_coverage'] = 100 * per_location / np.maximum(tuples_per_location, 1)
+
+    if reference_cost is not None:
+        results['gap'] = results['cost'] - reference_cost
+        results['below_reference'] = results['feasible'] & (results['gap'] < -tol)
+
+    if verify is not False:
+        check = np.ones(len(X), dtype=bool) if verify is True else np.asarray(verify, dtype=bool)
+        bad = check & ~results['feasible']
+        if reference_cost is not None:
+            bad |= check & results['below_reference']
+        results['suspect'] = bad
+        if bad.any():
+            message = (f"SOMETHING WENT WRONG! selections {np.flatnonzero(bad).tolist()} are infeasible "
+                       f"or cheaper than the reference cost")
+            assert not strict, message
+            print(message)
+
+    return results
+
+
+def evaluate_solutions(G, tuple_nodes, satellites, solutions, reference=None, verify=False, strict=False):
+    """
+    Evaluates named satellite sets on a coverage graph, e.g.
+    evaluate_solutions(G, tuple_nodes, satellite_nodes, {'ilp': ilp_set, 'ratio': ratio_set}, reference='ilp').
+
+    Coverage is measured over the coverable tuples (degree > 0). If reference names one
+    of the solutions its cost is used for the gaps. verify is passed on to
+    evaluate_selections, either as a bool or as a collection of solution names to check,
+    and so is strict.
+    G can also be a CoverageInstance, then its cached incidence matrix is reused.
+
+    Returns:
+        dict: name -> dict of 'cost', 'covered', 'coverage_percent', 'redundancy', 'feasible',
+              'location_coverage' (location label -> percent), with a reference 'gap' and
+              with verify 'suspect' (the selection failed the check)
+    """
+    instance, tuple_ids = as_instance(G, tuple_nodes, satellites)
+    A = instance.incidence_matrix()
+    tuple_ids = np.frombuffer(tuple_ids, dtype=np.int32)
+    if not np.array_equal(tuple_ids, np.arange(instance.num_tuples)):
+        A = A[:, tuple_ids]
+    tuple_nodes = [instance.tuple_labels[t] for t in tuple_ids]
+    names = list(solutions)
+    X = selection_matrix([solutions[name] for name in names], instance.satellite_labels)
+    costs = np.array(instance.costs, dtype=float)
+
+    location_labels = list(dict.fromkeys(node[0] for node in tuple_nodes))
+    location_index = {label: i for i, label in enumerate(location_labels)}
+    tuple_locations = np.array([location_index[node[0]] for node in tuple_nodes], dtype=np.int64)
+
+    reference_cost = None
+    if reference is not None:
+        reference_cost = X[names.index(reference)] @ costs
+    if verify is not True and verify is not False:
+        verify = np.array([name in verify for name in names], dtype=bool)
+
+    results = evaluate_selections(A, costs, X, tuple_locations=tuple_locations,
+                                  reference_cost=reference_cost, verify=verify, strict=strict)
+
+    evaluation = {}
+    for k, name in enumerate(names):
+        evaluation[name] = {
+            'cost': results['cost'][k],
+            'covered': int(results['covered'][k]),
+            'coverage_percent': results['coverage_percent'][k],
+            'redundancy': results['redundancy'][k],
+            'feasible': bool(results['feasible'][k]),
+            'location_coverage': dict(zip(location_labels, results['location_coverage'][k])),
+        }
+        if reference_cost is not None:
+            evaluation[name]['gap'] = results['gap'][k]
+        if 'suspect' in results:
+            evaluation[name]['suspect'] = bool(results['suspect'][k])
+    return evaluation
@@ -0,0 +1,52 @@
+from util_v2 import *
+from solver import *
+import matplotlib
+matplotlib.use('Agg')  # for Linux (not needed for Mac I believe)
+import matplotlib.pyplot as plt
+
+def get_covered_tuple_nodes(G, tuple_nodes):
+    covered_tuple_nodes = []
+    for tuple_node in tuple_nodes:
+        if G.degree(tuple_node) > 0:
+            covered_tuple_nodes.append(tuple_node)
+    
+    return covered_tuple_nodes
+
+# time-to-quality curves of the exact ILP: how far the incumbent is from the final bound over time
+num_satellites_list = [50, 100, 150]
+NUM_TIMESTEPS = 100
+NUM_LOCATIONS = 5
+COVERAGE_PROB = 0.5
+TIME_LIMIT = 60
+# incumbents found at time 0 (e.g. by presolve) are drawn here on the log time axis
+MIN_TIME = 1e-3
+
+plt.style.use('classic')
+plt.rcParams.update({'font.size': 14})
+
+for num_satellites in num_satellites_list:
+    print(f"num_satellites: {num_satellites}")
+    # the generator makes enough tuples coverable by construction, no regeneration loop
+    G, tuple_nodes, satellite_nodes = create_satellite_bipartite_graph(NUM_LOCATIONS, NUM_TIMESTEPS, num_satellites, COVERAGE_PROB, min_coverable_fraction=COVERAGE_PROB)
+    feasible_tuple_nodes = get_covered_tuple_nodes(G, tuple_nodes)
+
+    ilp_satellite_set, ilp_cost, info = weighted_set_cover_ilp(G, feasible_tuple_nodes, satellite_nodes,
+                                                               time_limit=TIME_LIMIT, log_to_console=False, return_info=True)
+    print(f"status: {info['status']}, runtime: {info['runtime']:.2f}s, cost: {ilp_cost}, bound: {info['obj_bound']}")
+
+    if info['obj_bound'] is None:
+        # the solve stopped before there was any bound, nothing to plot
+        continue
+
+    # relative gap of each incumbent to the best bound known at the end of the solve (a zero
+    # cost incumbent is optimal, costs are not negative)
+    points = [point for point in info['trajectory'] if point[1] is not None]
+    times = [max(point[0], MIN_TIME) for point in points]
+    gaps = [100 * (point[1] - info['obj_bound']) / point[1] if point[1] != 0 else 0 for point in points]
+    plt.step(times, gaps, where='post', lw=3, label=f"{num_satellites} Satellites")
+
+plt.xscale('log')
+plt.xlabel("Time (s)", fontsize=18)
+plt.ylabel("Gap to Final Bound (%)", fontsize=18)
+plt.legend(loc='upper right', frameon=False, fontsize=14)
+plt.savefig('ilp_time_to_quality.png', bbox_inches='tight')
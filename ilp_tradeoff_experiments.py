@@ -29,10 +29,9 @@ LAMBDA = 0.5
 
 for coverage_prob in coverage_probs:
     x_vals.append(coverage_prob)
-    feasible_tuple_nodes = []
-    while len(feasible_tuple_nodes) < coverage_prob * NUM_TIMESTEPS * NUM_LOCATIONS:
-        G, tuple_nodes, satellite_nodes = create_satellite_bipartite_graph(NUM_LOCATIONS, NUM_TIMESTEPS, NUM_SATELLITES, coverage_prob)
-        feasible_tuple_nodes = get_covered_tuple_nodes(G, tuple_nodes)
+    # the generator makes enough tuples coverable by construction, no regeneration loop
+    G, tuple_nodes, satellite_nodes = create_satellite_bipartite_graph(NUM_LOCATIONS, NUM_TIMESTEPS, NUM_SATELLITES, coverage_prob, min_coverable_fraction=coverage_prob)
+    feasible_tuple_nodes = get_covered_tuple_nodes(G, tuple_nodes)
     
     all_coverable_tuple_nodes = set([tuple_node for tuple_node in tuple_nodes if G.degree(tuple_node) > 0])
     ilp_satellite_set, ilp_cost = weighted_set_cover_ilp_tradeoff(G, feasible_tuple_nodes, satellite_nodes, LAMBDA)
@@ -29,10 +29,9 @@ lambdas = [0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 1, 5, 10]
 
 for l in lambdas:
     x_vals.append(l)
-    feasible_tuple_nodes = []
-    while len(feasible_tuple_nodes) < COVERAGE_PROB * NUM_TIMESTEPS * NUM_LOCATIONS:
-        G, tuple_nodes, satellite_nodes = create_satellite_bipartite_graph(NUM_LOCATIONS, NUM_TIMESTEPS, NUM_SATELLITES, COVERAGE_PROB)
-        feasible_tuple_nodes = get_covered_tuple_nodes(G, tuple_nodes)
+    # the generator makes enough tuples coverable by construction, no regeneration loop
+    G, tuple_nodes, satellite_nodes = create_satellite_bipartite_graph(NUM_LOCATIONS, NUM_TIMESTEPS, NUM_SATELLITES, COVERAGE_PROB, min_coverable_fraction=COVERAGE_PROB)
+    feasible_tuple_nodes = get_covered_tuple_nodes(G, tuple_nodes)
     
     all_coverable_tuple_nodes = set([tuple_node for tuple_node in tuple_nodes if G.degree(tuple_node) > 0])
     ilp_satellite_set, ilp_cost = weighted_set_cover_ilp_tradeoff(G, feasible_tuple_nodes, satellite_nodes, l)
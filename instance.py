@@ -0,0 +1,217 @@
+from array import array
+from numbers import Integral
+
+# Stdlib arrays only at module level, so util_v2 can import this without pulling in numpy;
+# numpy / scipy are imported inside the methods that build matrices.
+
+COVERAGE_ORDERS = ('degree', 'cost', 'ratio')
+
+
+class CoverageInstance:
+    """
+    Compact, integer-indexed coverage instance shared by the greedies, solvers and evaluators.
+
+    Plans (satellites) are 0..S-1 and tuples 0..T-1. The labels ('S12', ('L3', 'T7'))
+    only live in the side tables satellite_labels / tuple_labels. Coverage is stored in
+    both directions as CSR arrays: plan_indptr / plan_indices (plan -> sorted tuple ids)
+    and tuple_indptr / tuple_indices (tuple -> sorted plan ids, built on first use since
+    the static greedies never need it). Everything else derived from the coverage
+    (degrees, sort orders, coverable tuples, label lookups, the scipy incidence matrix)
+    is computed on first use and cached as well.
+
+    demands optionally asks for multicover: tuple t then has to be covered by demands[t]
+    distinct plans. None (the default) is the plain set cover, every tuple once.
+    """
+
+    __slots__ = ('satellite_labels', 'tuple_labels', 'costs', 'plan_indptr', 'plan_indices', 'demands', '_cache')
+
+    def __init__(self, satellite_labels, tuple_labels, costs, plan_indptr, plan_indices, demands=None):
+        self.satellite_labels = list(satellite_labels)
+        self.tuple_labels = list(tuple_labels)
+        # integer costs stay integers so total costs match summing the satellites dict
+        costs = list(costs)
+        self.costs = array('q' if all(isinstance(cost, Integral) for cost in costs) else 'd', costs)
+        self.plan_indptr = array('q', plan_indptr)
+        self.plan_indices = array('i', plan_indices)
+        assert len(self.plan_indptr) == len(self.satellite_labels) + 1, "plan_indptr needs one entry per plan plus one"
+        assert len(self.costs) == len(self.satellite_labels), "costs needs one entry per plan"
+        self.demands = None if demands is None else array('i', demands)
+        assert self.demands is None or len(self.demands) == len(self.tuple_labels), "demands needs one entry per tuple"
+        self._cache = {}
+
+    @classmethod
+    def from_graph(cls, G, tuple_nodes, satellites):
+        """
+        Builds an instance from the networkx coverage graph, keeping only the tuples in
+        tuple_nodes and the plans in satellites (a dict of satellite -> cost). A 'demand'
+        attribute on tuple nodes becomes the instance's demands (1 where it is missing).
+
+        Returns:
+            CoverageInstance
+        """
+        tuple_index = {tuple_node: t for t, tuple_node in enumerate(tuple_nodes)}
+        plan_indptr = array('q', [0])
+        plan_indices = array('i')
+        for sat in satellites:
+            plan_indices.extend(sorted(tuple_index[node] for node in G.neighbors(sat) if node in tuple_index))
+            plan_indptr.append(len(plan_indices))
+        demands = [G.nodes[tuple_node].get('demand', 1) for tuple_node in tuple_index]
+        if all(demand == 1 for demand in demands):
+            demands = None
+        return cls(satellites, tuple_index, satellites.values(), plan_indptr, plan_indices, demands=demands)
+
+    @property
+    def num_plans(self):
+        return len(self.satellite_labels)
+
+    @property
+    def num_tuples(self):
+        return len(self.tuple_labels)
+
+    def plan_tuples(self, s):
+        return self.plan_indices[self.plan_indptr[s]:self.plan_indptr[s + 1]]
+
+    def tuple_plans(self, t):
+        tuple_indptr, tuple_indices = self._tuple_csr()
+        return tuple_indices[tuple_indptr[t]:tuple_indptr[t + 1]]
+
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    @property
+    def tuple_indptr(self):
+        return self._tuple_csr()[0]
+
+    @property
+    def tuple_indices(self):
+        return self._tuple_csr()[1]
+
+    def _tuple_csr(self):
+        return self._cached('tuple_csr', lambda: _transpose(self.plan_indptr, self.plan_indices, self.num_tuples))
+
+    @property
+    def degrees(self):
+        return self._cached('degrees', lambda: array('i', (self.plan_indptr[s + 1] - self.plan_indptr[s]
+                                                             for s in range(self.num_plans))))
+
+    @property
+    def tuple_degrees(self):
+        def compute():
+            degrees = array('i', bytes(4 * self.num_tuples))
+            for t in self.plan_indices:
+                degrees[t] += 1
+            return degrees
+
+        return self._cached('tuple_degrees', compute)
+
+    @property
+    def coverable(self):
+        # ids of the tuples some plan covers (the feasible_tuple_nodes of the scripts)
+        return self._cached('coverable', lambda: array('i', (t for t, degree in enumerate(self.tuple_degrees)
+                                                               if degree > 0)))
+
+    @property
+    def satellite_index(self):
+        return self._cached('satellite_index', lambda: {sat: s for s, sat in enumerate(self.satellite_labels)})
+
+    @property
+    def tuple_index(self):
+        return self._cached('tuple_index', lambda: {node: t for t, node in enumerate(self.tuple_labels)})
+
+    @property
+    def cost_map(self):
+        # satellite label -> cost, the satellites dict the graph-based code works with
+        return self._cached('cost_map', lambda: dict(zip(self.satellite_labels, self.costs)))
+
+    def order(self, strategy):
+        """
+        Plans that cover something, in the order the static greedies visit them: 'degree'
+        (most tuples first), 'cost' (cheapest first) or 'ratio' (cost per tuple). Ties keep
+        plan order, like sorted() over the satellites dict.
+
+        Returns:
+            array: plan ids
+        """
+        if strategy not in COVERAGE_ORDERS:
+            raise ValueError(f"Unknown greedy strategy: {strategy}")
+
+        def compute():
+            degrees = self.degrees
+            plans = [s for s in range(self.num_plans) if degrees[s] > 0]
+            if strategy == 'degree':
+                plans.sort(key=lambda s: degrees[s], reverse=True)
+            elif strategy == 'cost':
+                plans.sort(key=lambda s: self.costs[s])
+            else:
+                plans.sort(key=lambda s: self.costs[s] / degrees[s])
+            return array('i', plans)
+
+        return self._cached(('order', strategy), compute)
+
+    def tuple_ids(self, tuple_nodes):
+        tuple_index = self.tuple_index
+        return array('i', (tuple_index[node] for node in tuple_nodes if node in tuple_index))
+
+    def plan_ids(self, satellite_set):
+        satellite_index = self.satellite_index
+        return [satellite_index[sat] for sat in satellite_set]
+
+    def labels(self, plan_ids):
+        return set(self.satellite_labels[s] for s in plan_ids)
+
+    def total_cost(self, plan_ids):
+        return sum(self.costs[s] for s in plan_ids)
+
+    def incidence_matrix(self):
+        """
+        Sparse plan x tuple incidence matrix built directly on the CSR arrays (no copy).
+
+        Returns:
+            scipy.sparse.csr_matrix: A[s, t] = 1 if plan s covers tuple t
+        """
+        def compute():
+            import numpy as np
+            from scipy.sparse import csr_matrix
+            indices = np.frombuffer(self.plan_indices, dtype=np.int32)
+            indptr = np.frombuffer(self.plan_indptr, dtype=np.int64)
+            return csr_matrix((np.ones(len(indices), dtype=np.int8), indices, indptr),
+                              shape=(self.num_plans, self.num_tuples))
+
+        return self._cached('incidence_matrix', compute)
+
+
+def _transpose(indptr, indices, num_cols):
+    # counting sort of the (row, col) pairs by column, rows stay sorted within a column
+    counts = array('q', bytes(8 * (num_cols + 1)))
+    for col in indices:
+        counts[col + 1] += 1
+    for col in range(num_cols):
+        counts[col + 1] += counts[col]
+    transposed_indptr = array('q', counts)
+    transposed_indices = array('i', bytes(4 * len(indices)))
+    for row in range(len(indptr) - 1):
+        for k in range(indptr[row], indptr[row + 1]):
+            col = indices[k]
+            transposed_indices[counts[col]] = row
+            counts[col] += 1
+    return transposed_indptr, transposed_indices
+
+
+def as_instance(G, tuple_nodes=None, satellites=None):
+    """
+    Lets every algorithm take either the (G, tuple_nodes, satellites) graph triple or a
+    CoverageInstance in place of G. A graph is converted once for the call; an instance
+    is used as is (its own plans and costs, satellites is ignored) and tuple_nodes, if
+    given, picks the tuples by label.
+
+    Returns:
+        tuple: (instance, tuple_ids) with the ids of the requested tuples
+    """
+    if isinstance(G, CoverageInstance):
+        if tuple_nodes is None:
+            return G, array('i', range(G.num_tuples))
+        return G, G.tuple_ids(tuple_nodes)
+    instance = CoverageInstance.from_graph(G, tuple_nodes, satellites)
+    return instance, array('i', range(instance.num_tuples))
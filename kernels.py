@@ -0,0 +1,464 @@
+import heapq
+import numpy as np
+from instance import as_instance
+
+# Compiled inner loops for the greedies, coverage counting and evaluation on the CSR
+# arrays of a CoverageInstance. The *_loop kernels are compiled with numba when it is
+# installed (numba is imported on first use, not at module load); without it the same
+# functions fall back to the NumPy versions below, which give the same results.
+
+_NUMBA_KERNELS = None
+
+
+def _static_greedy_loop(indptr, indices, order, required):
+    # visit the plans in order and take every plan that covers a required tuple not covered yet
+    uncovered = required.copy()
+    remaining = 0
+    for t in range(len(uncovered)):
+        if uncovered[t]:
+            remaining += 1
+    selected = np.zeros(len(indptr) - 1, dtype=np.bool_)
+    for j in range(len(order)):
+        if remaining == 0:
+            break
+        s = order[j]
+        new = 0
+        for k in range(indptr[s], indptr[s + 1]):
+            t = indices[k]
+            if uncovered[t]:
+                uncovered[t] = False
+                new += 1
+        if new > 0:
+            selected[s] = True
+            remaining -= new
+    return selected
+
+
+def _plan_edges(indptr, plans):
+    # positions in indices of the edges of the given plans, plan by plan
+    starts = indptr[plans]
+    lengths = indptr[plans + 1] - starts
+    offsets = np.cumsum(lengths) - lengths
+    return np.arange(lengths.sum()) - np.repeat(offsets - starts, lengths)
+
+
+def _static_greedy_numpy(indptr, indices, order, required, first_chunk=64):
+    # within a chunk of the order a plan gets taken iff it is the first plan covering some
+    # tuple that was still uncovered before the chunk: every tuple of a skipped plan is
+    # covered by an earlier plan. Chunks double in size and stop once everything is covered.
+    uncovered = required.copy()
+    selected = np.zeros(len(indptr) - 1, dtype=bool)
+    start, chunk = 0, first_chunk
+    while start < len(order) and uncovered.any():
+        plans = order[start:start + chunk].astype(np.int64)
+        edges = _plan_edges(indptr, plans)
+        edge_rank = np.repeat(np.arange(len(plans)), indptr[plans + 1] - indptr[plans])
+        edge_tuples = indices[edges]
+        keep = uncovered[edge_tuples]
+        first = np.full(len(uncovered), len(plans), dtype=np.int64)
+        np.minimum.at(first, edge_tuples[keep], edge_rank[keep])
+        newly_covered = first < len(plans)
+        selected[plans[np.unique(first[newly_covered])]] = True
+        uncovered &= ~newly_covered
+        start += chunk
+        chunk *= 2
+    return selected
+
+
+def _lazy_greedy_loop(indptr, indices, costs, required, selected):
+    # classic cost per newly covered tuple greedy with lazy re-evaluation of stale heap entries,
+    # extending an initial selection (the same moves as util_v2.repair_coverage)
+    uncovered = required.copy()
+    selected = selected.copy()
+    num_plans = len(indptr) - 1
+    for s in range(num_plans):
+        if selected[s]:
+            for k in range(indptr[s], indptr[s + 1]):
+                uncovered[indices[k]] = False
+    remaining = 0
+    for t in range(len(uncovered)):
+        if uncovered[t]:
+            remaining += 1
+
+    heap = [(0.0, 0)]
+    heap.pop()
+    for s in range(num_plans):
+        if selected[s]:
+            continue
+        new = 0
+        for k in range(indptr[s], indptr[s + 1]):
+            if uncovered[indices[k]]:
+                new += 1
+        if new > 0:
+            heap.append((costs[s] / new, s))
+    heapq.heapify(heap)
+
+    while remaining > 0 and len(heap) > 0:
+        ratio, s = heapq.heappop(heap)
+        new = 0
+        for k in range(indptr[s], indptr[s + 1]):
+            if uncovered[indices[k]]:
+                new += 1
+        if new == 0:
+            continue
+        new_ratio = costs[s] / new
+        # stale entry: push it back with its current ratio unless it is still the best
+        if len(heap) > 0 and new_ratio > heap[0][0]:
+            heapq.heappush(heap, (new_ratio, s))
+            continue
+        selected[s] = True
+        for k in range(indptr[s], indptr[s + 1]):
+            uncovered[indices[k]] = False
+        remaining -= new
+    return selected
+
+
+def _lazy_greedy_numpy(indptr, indices, costs, required, selected):
+    uncovered = required.copy()
+    selected = selected.copy()
+    edge_plans = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    uncovered[indices[selected[edge_plans]]] = False
+    remaining = int(uncovered.sum())
+
+    # initial new coverage of every plan in one pass over the edges
+    new_coverage = np.bincount(edge_plans[uncovered[indices]], minlength=len(indptr) - 1)
+    candidates = np.flatnonzero(~selected & (new_coverage > 0))
+    heap = list(zip((costs[candidates] / new_coverage[candidates]).tolist(), candidates.tolist()))
+    heapq.heapify(heap)
+
+    while remaining > 0 and heap:
+        ratio, s = heapq.heappop(heap)
+        tuples = indices[indptr[s]:indptr[s + 1]]
+        covered = tuples[uncovered[tuples]]
+        if len(covered) == 0:
+            continue
+        new_ratio = costs[s] / len(covered)
+        if heap and new_ratio > heap[0][0]:
+            heapq.heappush(heap, (new_ratio, s))
+            continue
+        selected[s] = True
+        uncovered[covered] = False
+        remaining -= len(covered)
+    return selected
+
+
+def _multicover_greedy_loop(indptr, indices, costs, residual, selected):
+    # lazy greedy for multicover: residual[t] is how many more distinct plans tuple t needs,
+    # a plan's gain is the number of its tuples with residual demand left
+    residual = residual.copy()
+    selected = selected.copy()
+    num_plans = len(indptr) - 1
+    for s in range(num_plans):
+        if selected[s]:
+            for k in range(indptr[s], indptr[s + 1]):
+                if residual[indices[k]] > 0:
+                    residual[indices[k]] -= 1
+
+    heap = [(0.0, 0)]
+    heap.pop()
+    for s in range(num_plans):
+        if selected[s]:
+            continue
+        gain = 0
+        for k in range(indptr[s], indptr[s + 1]):
+            if residual[indices[k]] > 0:
+                gain += 1
+        if gain > 0:
+            heap.append((costs[s] / gain, s))
+    heapq.heapify(heap)
+
+    while len(heap) > 0:
+        ratio, s = heapq.heappop(heap)
+        gain = 0
+        for k in range(indptr[s], indptr[s + 1]):
+            if residual[indices[k]] > 0:
+                gain += 1
+        if gain == 0:
+            continue
+        new_ratio = costs[s] / gain
+        if len(heap) > 0 and new_ratio > heap[0][0]:
+            heapq.heappush(heap, (new_ratio, s))
+            continue
+        selected[s] = True
+        for k in range(indptr[s], indptr[s + 1]):
+            if residual[indices[k]] > 0:
+                residual[indices[k]] -= 1
+    return selected
+
+
+def _multicover_greedy_numpy(indptr, indices, costs, residual, selected):
+    residual = residual.copy()
+    selected = selected.copy()
+    edge_plans = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    # a plan is picked at most once, so every selected plan takes one unit off each of its tuples
+    residual -= np.bincount(indices[selected[edge_plans]], minlength=len(residual))
+    np.maximum(residual, 0, out=residual)
+
+    gain = np.bincount(edge_plans[residual[indices] > 0], minlength=len(indptr) - 1)
+    candidates = np.flatnonzero(~selected & (gain > 0))
+    heap = list(zip((costs[candidates] / gain[candidates]).tolist(), candidates.tolist()))
+    heapq.heapify(heap)
+
+    while heap:
+        ratio, s = heapq.heappop(heap)
+        tuples = indices[indptr[s]:indptr[s + 1]]
+        needed = tuples[residual[tuples] > 0]
+        if len(needed) == 0:
+            continue
+        new_ratio = costs[s] / len(needed)
+        if heap and new_ratio > heap[0][0]:
+            heapq.heappush(heap, (new_ratio, s))
+            continue
+        selected[s] = True
+        residual[needed] -= 1
+    return selected
+
+
+def _coverage_counts_loop(indptr, indices, selected, num_tuples):
+    counts = np.zeros(num_tuples, dtype=np.int64)
+    for s in range(len(indptr) - 1):
+        if selected[s]:
+            for k in range(indptr[s], indptr[s + 1]):
+                counts[indices[k]] += 1
+    return counts
+
+
+def _coverage_counts_numpy(indptr, indices, selected, num_tuples):
+    tuples = indices[_plan_edges(indptr, np.flatnonzero(selected))]
+    return np.bincount(tuples, minlength=num_tuples).astype(np.int64)
+
+
+def _update_counts_loop(counts, indptr, indices, s, delta):
+    # adds delta (+1 / -1) for plan s and returns how many tuples switched between covered and uncovered
+    switched = 0
+    for k in range(indptr[s], indptr[s + 1]):
+        t = indices[k]
+        before = counts[t]
+        counts[t] += delta
+        if (before == 0) != (counts[t] == 0):
+            switched += 1
+    return switched
+
+
+def _update_counts_numpy(counts, indptr, indices, s, delta):
+    tuples = indices[indptr[s]:indptr[s + 1]]
+    before = counts[tuples] == 0
+    counts[tuples] += delta
+    return int((before != (counts[tuples] == 0)).sum())
+
+
+def _evaluate_loop(indptr, indices, costs, X, required):
+    num_selections, num_plans = X.shape
+    total_costs = np.zeros(num_selections)
+    covered = np.zeros(num_selections, dtype=np.int64)
+    incidences = np.zeros(num_selections, dtype=np.int64)
+    counts = np.zeros(len(required), dtype=np.int64)
+    for r in range(num_selections):
+        counts[:] = 0
+        for s in range(num_plans):
+            if not X[r, s]:
+                continue
+            total_costs[r] += costs[s]
+            for k in range(indptr[s], indptr[s + 1]):
+                t = indices[k]
+                if required[t]:
+                    if counts[t] == 0:
+                        covered[r] += 1
+                    counts[t] += 1
+                    incidences[r] += 1
+    return total_costs, covered, incidences
+
+
+def _evaluate_numpy(indptr, indices, costs, X, required):
+    covered = np.zeros(len(X), dtype=np.int64)
+    incidences = np.zeros(len(X), dtype=np.int64)
+    for r in range(len(X)):
+        tuples = indices[_plan_edges(indptr, np.flatnonzero(X[r]))]
+        counts = np.bincount(tuples[required[tuples]], minlength=len(required))
+        covered[r] = int((counts > 0).sum())
+        incidences[r] = int(counts.sum())
+    return X @ costs, covered, incidences
+
+
+_LOOP_KERNELS = {
+    'static_greedy': _static_greedy_loop,
+    'lazy_greedy': _lazy_greedy_loop,
+    'multicover_greedy': _multicover_greedy_loop,
+    'coverage_counts': _coverage_counts_loop,
+    'update_counts': _update_counts_loop,
+    'evaluate': _evaluate_loop,
+}
+
+_NUMPY_KERNELS = {
+    'static_greedy': _static_greedy_numpy,
+    'lazy_greedy': _lazy_greedy_numpy,
+    'multicover_greedy': _multicover_greedy_numpy,
+    'coverage_counts': _coverage_counts_numpy,
+    'update_counts': _update_counts_numpy,
+    'evaluate': _evaluate_numpy,
+}
+
+
+def have_numba():
+    """
+    Compiles the loop kernels on first call (numba compiles each one lazily on its first use).
+
+    Returns:
+        bool: True if numba is installed and the compiled kernels are used
+    """
+    global _NUMBA_KERNELS
+    if _NUMBA_KERNELS is None:
+        try:
+            from numba import njit
+        except ImportError:
+            _NUMBA_KERNELS = {}
+        else:
+            _NUMBA_KERNELS = {name: njit(cache=True)(kernel) for name, kernel in _LOOP_KERNELS.items()}
+    return len(_NUMBA_KERNELS) > 0
+
+
+def _kernel(name, use_numba):
+    # use_numba=None picks numba when it is installed, False forces the NumPy fallback
+    if use_numba is None:
+        use_numba = have_numba()
+    if use_numba:
+        if not have_numba():
+            raise ImportError("numba is not installed")
+        return _NUMBA_KERNELS[name]
+    return _NUMPY_KERNELS[name]
+
+
+def csr_arrays(instance):
+    """
+    NumPy views (no copy) of the plan -> tuples CSR arrays of a CoverageInstance.
+
+    Returns:
+        tuple: (indptr, indices)
+    """
+    return np.frombuffer(instance.plan_indptr, dtype=np.int64), np.frombuffer(instance.plan_indices, dtype=np.int32)
+
+
+def _required_mask(instance, tuple_ids):
+    required = np.zeros(instance.num_tuples, dtype=bool)
+    required[np.frombuffer(tuple_ids, dtype=np.int32)] = True
+    return required
+
+
+def _demand_vector(instance, tuple_ids, demands=None):
+    # demand of every tuple (0 outside tuple_ids); demands is a dict keyed by tuple label,
+    # a sequence over the instance's tuples, or None for the instance's own (default 1)
+    if demands is None:
+        demands = instance.demands
+    if demands is None:
+        vector = np.ones(instance.num_tuples, dtype=np.int64)
+    elif isinstance(demands, dict):
+        vector = np.array([demands.get(label, 1) for label in instance.tuple_labels], dtype=np.int64)
+    else:
+        vector = np.array(demands, dtype=np.int64)
+        assert len(vector) == instance.num_tuples, "demands needs one entry per tuple"
+    return np.where(_required_mask(instance, tuple_ids), vector, 0)
+
+
+def _selected_labels(instance, selected):
+    plans = np.flatnonzero(selected).tolist()
+    return instance.labels(plans), instance.total_cost(plans)
+
+
+def greedy(G, feasible_tuple_nodes=None, satellites=None, strategy='ratio', use_numba=None):
+    """
+    Compiled version of the util_v2 static greedies ('degree', 'cost' or 'ratio') with
+    the same selections. G can be the coverage graph or a CoverageInstance.
+
+    Returns:
+        tuple: (satellite_set, total_cost)
+    """
+    instance, tuple_ids = as_instance(G, feasible_tuple_nodes, satellites)
+    indptr, indices = csr_arrays(instance)
+    order = np.frombuffer(instance.order(strategy), dtype=np.int32)
+    selected = _kernel('static_greedy', use_numba)(indptr, indices, order, _required_mask(instance, tuple_ids))
+    return _selected_labels(instance, selected)
+
+
+def lazy_greedy(G, feasible_tuple_nodes=None, satellites=None, satellite_set=(), use_numba=None):
+    """
+    Compiled lazy-heap greedy: repeatedly adds the satellite with the lowest cost per newly
+    covered tuple, starting from satellite_set. With an empty start this is the classic
+    set cover greedy, otherwise it makes the same moves as util_v2.repair_coverage.
+
+    Returns:
+        tuple: (satellite_set, total_cost)
+    """
+    instance, tuple_ids = as_instance(G, feasible_tuple_nodes, satellites)
+    indptr, indices = csr_arrays(instance)
+    start = np.zeros(instance.num_plans, dtype=bool)
+    start[instance.plan_ids(satellite_set)] = True
+    selected = _kernel('lazy_greedy', use_numba)(indptr, indices, np.asarray(instance.costs, dtype=float),
+                                                 _required_mask(instance, tuple_ids), start)
+    return _selected_labels(instance, selected)
+
+
+def multicover_greedy(G, feasible_tuple_nodes=None, satellites=None, demands=None, satellite_set=(), use_numba=None):
+    """
+    Lazy-heap greedy for multicover: every tuple needs demands distinct plans (a dict by
+    tuple label or a sequence over the tuples, default the instance's demands or 1). A
+    residual demand counter per tuple replaces the covered set: the gain of a plan is the
+    number of its tuples still short of their demand. Tuples with a demand above the
+    number of plans covering them end up with every one of those plans.
+
+    Returns:
+        tuple: (satellite_set, total_cost)
+    """
+    instance, tuple_ids = as_instance(G, feasible_tuple_nodes, satellites)
+    indptr, indices = csr_arrays(instance)
+    start = np.zeros(instance.num_plans, dtype=bool)
+    start[instance.plan_ids(satellite_set)] = True
+    selected = _kernel('multicover_greedy', use_numba)(indptr, indices, np.asarray(instance.costs, dtype=float),
+                                                       _demand_vector(instance, tuple_ids, demands), start)
+    return _selected_labels(instance, selected)
+
+
+def coverage_counts(instance, selected, use_numba=None):
+    """
+    Number of selected plans covering each tuple, for a boolean plan mask.
+
+    Returns:
+        np.ndarray: int64 counts per tuple
+    """
+    indptr, indices = csr_arrays(instance)
+    return _kernel('coverage_counts', use_numba)(indptr, indices, np.asarray(selected, dtype=bool), instance.num_tuples)
+
+
+def update_counts(counts, instance, s, delta=1, use_numba=None):
+    """
+    Incrementally adds (delta=1) or removes (delta=-1) plan s in counts, in place.
+
+    Returns:
+        int: number of tuples that became covered (adding) or uncovered (removing)
+    """
+    indptr, indices = csr_arrays(instance)
+    return _kernel('update_counts', use_numba)(counts, indptr, indices, s, delta)
+
+
+def evaluate(instance, X, required=None, use_numba=None):
+    """
+    Cost and coverage of K selections (boolean (K, S) matrix over the instance's plans).
+    required defaults to the coverable tuples.
+
+    Returns:
+        dict: arrays keyed by 'cost', 'covered', 'coverage_percent', 'redundancy' and 'feasible'
+    """
+    indptr, indices = csr_arrays(instance)
+    if required is None:
+        required = _required_mask(instance, instance.coverable)
+    required = np.asarray(required, dtype=bool)
+    X = np.atleast_2d(np.asarray(X, dtype=bool))
+    total_costs, covered, incidences = _kernel('evaluate', use_numba)(
+        indptr, indices, np.asarray(instance.costs, dtype=float), X, required)
+    num_required = int(required.sum())
+    return {
+        'cost': total_costs,
+        'covered': covered,
+        'coverage_percent': 100 * covered / max(num_required, 1),
+        'redundancy': np.divide(incidences, covered, out=np.zeros(len(X)), where=covered > 0),
+        'feasible': covered == num_required,
+    }
@@ -1,10 +1,15 @@
 from util_v2 import *
 from solver import *
+from evaluate import evaluate_solutions
+from instance import CoverageInstance
+from sweep import SweepCheckpoint
+import argparse
 import matplotlib
 matplotlib.use('Agg')  # for Linux (not needed for Mac I believe)
 import matplotlib.pyplot as plt
 import time
 import math
+import numpy as np
 
 def get_covered_tuple_nodes(G, tuple_nodes):
     covered_tuple_nodes = []
@@ -14,6 +19,18 @@ def get_covered_tuple_nodes(G, tuple_nodes):
     
     return covered_tuple_nodes
 
+parser = argparse.ArgumentParser(
+    prog='Coverage Probability Sweep',
+    description='Optimality gap of the greedies and the LP rounding against the ILP for increasing coverage probability'
+)
+parser.add_argument('--checkpoint-dir', type=str, help='Directory finished results are saved to (and resumed from)', default='checkpoints/microbenchmarking_v2')
+parser.add_argument('--fresh', action='store_true', help='Ignore results saved by an earlier run')
+args = parser.parse_args()
+
+# every finished (coverage probability, algorithm) result is saved right away, so a crashed
+# or preempted run picks up where it stopped when started again
+checkpoint = SweepCheckpoint(args.checkpoint_dir, fresh=args.fresh)
+
 NUM_SATELLITES = 50
 NUM_TIMESTEPS = 50
 NUM_LOCATIONS = 5
@@ -39,86 +56,51 @@ ratio_coverages = []
 lp_coverages = []
 ilp_coverages = []
 
+def generate_instance(coverage_prob):
+    # the generator makes enough tuples coverable by construction, no regeneration loop
+    return create_satellite_bipartite_graph(NUM_LOCATIONS, NUM_TIMESTEPS, NUM_SATELLITES, coverage_prob, min_coverable_fraction=coverage_prob)
+
 for coverage_prob in coverage_probs:
     x_vals.append(coverage_prob)
-    feasible_tuple_nodes = []
-    while len(feasible_tuple_nodes) < coverage_prob * NUM_TIMESTEPS * NUM_LOCATIONS:
-        G, tuple_nodes, satellite_nodes = create_satellite_bipartite_graph(NUM_LOCATIONS, NUM_TIMESTEPS, NUM_SATELLITES, coverage_prob)
-        feasible_tuple_nodes = get_covered_tuple_nodes(G, tuple_nodes)
+    point = f"coverage_prob={coverage_prob}"
+    G, tuple_nodes, satellite_nodes = checkpoint.instance(point, lambda: generate_instance(coverage_prob))
+    feasible_tuple_nodes = get_covered_tuple_nodes(G, tuple_nodes)
+    # built once per instance and shared by every algorithm below
+    instance = CoverageInstance.from_graph(G, tuple_nodes, satellite_nodes)
     
-    all_coverable_tuple_nodes = set([tuple_node for tuple_node in tuple_nodes if G.degree(tuple_node) > 0])
-    start = time.time()
-    ilp_satellite_set, ilp_cost = weighted_set_cover_ilp(G, feasible_tuple_nodes, satellite_nodes)
-    end = time.time()
-    ilp_times.append(end - start)
-    brute_force_cost = ilp_cost
-    brute_force_satellite_set = ilp_satellite_set
-    ilp_covered = set()
-    for satellite in ilp_satellite_set:
-        ilp_covered.update(set(G.neighbors(satellite)))
-    ilp_coverages.append(100 * len(ilp_covered) / len(all_coverable_tuple_nodes))
+    ilp_satellite_set, ilp_cost, ilp_time = checkpoint.run_timed(point, 'ilp', lambda: weighted_set_cover_ilp(instance, feasible_tuple_nodes, satellite_nodes))
+    ilp_times.append(ilp_time)
    
-    start = time.time()
-    greedy_degree_satellite_set, greedy_degree_cost = greedy_degree_based_algorithm(G, feasible_tuple_nodes, satellite_nodes)
-    end = time.time()
-    if greedy_degree_cost < brute_force_cost:
-        print("SOMETHING WENT WRONG!")
-        print(f"Brute force cost: {brute_force_cost}")
-        print(f"Greedy degree cost: {greedy_degree_cost}")
-        print(f"Satellite nodes: {satellite_nodes}")
-        print(f"Greedy degree satellite set: {greedy_degree_satellite_set}")
-        print(f"Brute force satellite set: {brute_force_satellite_set}")
-    deg_times.append(end - start)
-    deg_gaps.append(greedy_degree_cost - brute_force_cost)
-    deg_covered = set()
-    for satellite in greedy_degree_satellite_set:
-        deg_covered.update(set(G.neighbors(satellite)))
-    deg_coverages.append(100 * len(deg_covered) / len(all_coverable_tuple_nodes))
+    greedy_degree_satellite_set, greedy_degree_cost, deg_time = checkpoint.run_timed(point, 'deg', lambda: greedy_degree_based_algorithm(instance, feasible_tuple_nodes, satellite_nodes))
+    deg_times.append(deg_time)
 
-    start = time.time()
-    greedy_cost_satellite_set, greedy_cost_cost = greedy_cost_based_algorithm(G, feasible_tuple_nodes, satellite_nodes)
-    end = time.time()
-    if greedy_cost_cost < brute_force_cost:
-        print("SOMETHING WENT WRONG!")
-        print(f"Brute force cost: {brute_force_cost}")
-        print(f"Greedy cost cost: {greedy_cost_cost}")
-        print(f"Satellite nodes: {satellite_nodes}")
-        print(f"Greedy cost satellite set: {greedy_cost_satellite_set}")
-        print(f"Brute force satellite set: {brute_force_satellite_set}")
-    cost_times.append(end - start)
-    cost_gaps.append(greedy_cost_cost - brute_force_cost)
-    cost_covered = set()
-    for satellite in greedy_cost_satellite_set:
-        cost_covered.update(set(G.neighbors(satellite)))
-    cost_coverages.append(100 * len(cost_covered) / len(all_coverable_tuple_nodes))
+    greedy_cost_satellite_set, greedy_cost_cost, cost_time = checkpoint.run_timed(point, 'cost', lambda: greedy_cost_based_algorithm(instance, feasible_tuple_nodes, satellite_nodes))
+    cost_times.append(cost_time)
 
-    start = time.time()
-    greedy_ratio_satellite_set, greedy_ratio_cost = greedy_ratio_based_algorithm(G, feasible_tuple_nodes, satellite_nodes)
-    end = time.time()
-    if greedy_ratio_cost < brute_force_cost:
-        print("SOMETHING WENT WRONG!")
-        print(f"Brute force cost: {brute_force_cost}")
-        print(f"Greedy cost cost: {greedy_cost_cost}")
-        print(f"Satellite nodes: {satellite_nodes}")
-        print(f"Greedy cost satellite set: {greedy_cost_satellite_set}")
-        print(f"Brute force satellite set: {brute_force_satellite_set}")
-    ratio_times.append(end - start)
-    ratio_gaps.append(greedy_ratio_cost - brute_force_cost)
-    ratio_covered = set()
-    for satellite in greedy_ratio_satellite_set:
-        ratio_covered.update(set(G.neighbors(satellite)))
-    ratio_coverages.append(100 * len(ratio_covered) / len(all_coverable_tuple_nodes))
+    greedy_ratio_satellite_set, greedy_ratio_cost, ratio_time = checkpoint.run_timed(point, 'ratio', lambda: greedy_ratio_based_algorithm(instance, feasible_tuple_nodes, satellite_nodes))
+    ratio_times.append(ratio_time)
 
     k = 2 * math.ceil(np.log(NUM_TIMESTEPS * NUM_LOCATIONS))
-    start = time.time()
-    lp_satellite_set, lp_cost = weighted_set_cover_lp_relaxation(G, feasible_tuple_nodes, satellite_nodes, k)
-    end = time.time()   
-    lp_times.append(end - start)
-    lp_gaps.append(lp_cost - brute_force_cost)
-    lp_covered = set()
-    for satellite in lp_satellite_set:
-        lp_covered.update(set(G.neighbors(satellite)))
-    lp_coverages.append(100 * len(lp_covered) / len(all_coverable_tuple_nodes))
+    lp_satellite_set, lp_cost, lp_time = checkpoint.run_timed(point, 'lp', lambda: weighted_set_cover_lp_relaxation(instance, feasible_tuple_nodes, satellite_nodes, k))
+    lp_times.append(lp_time)
+
+    # cost, gap and coverage of every algorithm in one pass, flagging greedies that beat the ILP or miss tuples
+    evaluation = evaluate_solutions(instance, tuple_nodes, satellite_nodes, {
+        'ilp': ilp_satellite_set,
+        'deg': greedy_degree_satellite_set,
+        'cost': greedy_cost_satellite_set,
+        'ratio': greedy_ratio_satellite_set,
+        'lp': lp_satellite_set,
+    }, reference='ilp', verify=['deg', 'cost', 'ratio'])
+    ilp_coverages.append(evaluation['ilp']['coverage_percent'])
+    deg_gaps.append(evaluation['deg']['gap'])
+    deg_coverages.append(evaluation['deg']['coverage_percent'])
+    cost_gaps.append(evaluation['cost']['gap'])
+    cost_coverages.append(evaluation['cost']['coverage_percent'])
+    ratio_gaps.append(evaluation['ratio']['gap'])
+    ratio_coverages.append(evaluation['ratio']['coverage_percent'])
+    lp_gaps.append(evaluation['lp']['gap'])
+    lp_coverages.append(evaluation['lp']['coverage_percent'])
 
 plt.style.use('classic')
 plt.rcParams.update({'font.size': 14})
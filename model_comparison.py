@@ -8,27 +8,44 @@ import matplotlib.pyplot as plt
 from collections import Counter
 import seaborn as sns
 
+def coverage_degrees(coverage):
+    """
+    Number of tuples each satellite plan covers, as the row sums of the plans x tuples
+    coverage matrix. Takes a dense or sparse coverage matrix (e.g. from
+    util.sample_coverage_matrix), a CoverageInstance, or a coverage graph (its
+    satellites are the bipartite=1 nodes).
+
+    Returns:
+        numpy.ndarray: degree of every satellite plan
+    """
+    from instance import CoverageInstance
+    if isinstance(coverage, nx.Graph):
+        return np.fromiter((degree for n, degree in coverage.degree if coverage.nodes[n].get('bipartite') == 1),
+                           dtype=np.int64)
+    if isinstance(coverage, CoverageInstance):
+        return np.diff(np.frombuffer(coverage.plan_indptr, dtype=np.int64))
+    return np.asarray(coverage.sum(axis=1)).ravel()
+
 def analyze_coverage_distributions(G_dict):
     """
-    Analyzes coverage patterns for different distribution types
+    Analyzes coverage patterns for different distribution types. The values of G_dict
+    can be coverage graphs or anything coverage_degrees takes, so large comparisons can
+    skip building the graphs and pass the sampled coverage matrices directly.
     """
     results = {}
     
     for dist_name, G in G_dict.items():
-        # Get satellite nodes (bipartite=1)
-        satellite_nodes = [n for n, d in G.nodes(data=True) if d.get('bipartite') == 1]
-        
-        # Calculate degree (coverage) for each satellite
-        degrees = [G.degree(s) for s in satellite_nodes]
+        # degree (coverage) of each satellite, from the row sums of the coverage matrix
+        degrees = coverage_degrees(G)
         
         # Store statistics
         results[dist_name] = {
-            'degrees': sorted(degrees, reverse=True),
-            'mean': np.mean(degrees),
+            'degrees': np.sort(degrees)[::-1],
+            'mean': degrees.mean(),
             'median': np.median(degrees),
-            'std': np.std(degrees),
-            'max': max(degrees),
-            'min': min(degrees)
+            'std': degrees.std(),
+            'max': degrees.max(),
+            'min': degrees.min()
         }
     
     return results
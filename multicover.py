@@ -0,0 +1,243 @@
+import argparse
+import heapq
+import time
+import numpy as np
+from instance import as_instance
+from kernels import csr_arrays, _demand_vector
+
+# Multicover: tuple t has to be seen by demands[t] distinct plans, so that losing one
+# satellite does not leave it blind. Demands come from the instance (or a 'demand'
+# attribute on the graph's tuple nodes) or are passed per call. The greedy is
+# kernels.multicover_greedy (residual demand counters); this module adds the presolve
+# and the ILP on top of it, and the replicated-tuples greedy it is benchmarked against.
+#
+# Presolve rules with demands:
+# - a demand above the number of covering plans can never be met; it is capped, so the
+#   tuple gets every plan covering it (reported as short)
+# - a tuple needing as many plans as are left to cover it forces all of them; forced plans
+#   count towards the demand of every tuple they cover, which can force further plans
+# - a plan whose tuples still needing coverage all need just one more plan is dropped if
+#   another plan, at most as expensive, covers all of those tuples (swapping it in keeps
+#   every demand met). With higher demands both plans may be needed, so no other plan
+#   is dropped.
+
+
+def _presolve(instance, tuple_ids, demands):
+    indptr, indices = csr_arrays(instance)
+    tuple_indptr = np.frombuffer(instance.tuple_indptr, dtype=np.int64)
+    tuple_indices = np.frombuffer(instance.tuple_indices, dtype=np.int32)
+    costs = np.asarray(instance.costs, dtype=float)
+    residual = _demand_vector(instance, tuple_ids, demands)
+    # number of plans still available to every tuple
+    free = np.frombuffer(instance.tuple_degrees, dtype=np.int32).astype(np.int64)
+    short = np.flatnonzero(residual > free)
+    residual = np.minimum(residual, free)
+    available = np.ones(instance.num_plans, dtype=bool)
+    forced = []
+    removed = []
+
+    def take(s, force):
+        available[s] = False
+        tuples = indices[indptr[s]:indptr[s + 1]]
+        free[tuples] -= 1
+        if force:
+            forced.append(s)
+            residual[tuples] = np.maximum(residual[tuples] - 1, 0)
+        else:
+            removed.append(s)
+        return tuples[(residual[tuples] > 0) & (residual[tuples] >= free[tuples])]
+
+    queue = np.flatnonzero((residual > 0) & (residual >= free)).tolist()
+    changed = True
+    while changed:
+        while queue:
+            t = queue.pop()
+            if residual[t] == 0 or residual[t] < free[t]:
+                continue
+            for s in tuple_indices[tuple_indptr[t]:tuple_indptr[t + 1]].tolist():
+                if available[s]:
+                    queue.extend(take(s, True).tolist())
+
+        changed = False
+        for s in np.flatnonzero(available).tolist():
+            tuples = indices[indptr[s]:indptr[s + 1]]
+            active = tuples[residual[tuples] > 0]
+            if len(active) == 0:
+                take(s, False)
+                continue
+            if residual[active].max() > 1:
+                continue
+            # candidates cover the active tuple with the fewest plans left; ties in cost go to the lower id
+            t = active[np.argmin(free[active])]
+            for other in tuple_indices[tuple_indptr[t]:tuple_indptr[t + 1]].tolist():
+                if other == s or not available[other] or (costs[other], other) > (costs[s], s):
+                    continue
+                if np.isin(active, indices[indptr[other]:indptr[other + 1]], assume_unique=True).all():
+                    queue.extend(take(s, False).tolist())
+                    changed = True
+                    break
+    return {'forced': forced, 'removed': removed, 'residual': residual, 'short': short.tolist()}
+
+
+def presolve_multicover(G, tuple_nodes=None, satellites=None, demands=None):
+    """
+    Applies the multicover presolve rules (see the top of this module). demands is a dict
+    by tuple label or a sequence over the tuples (default the instance's demands or 1).
+
+    Returns:
+        dict: 'forced' (satellites every solution takes), 'removed' (satellites no longer
+        needed), 'residual' (tuple label -> demand left after the forced satellites, for
+        the tuples that still need some) and 'short' (tuples whose demand exceeds their
+        number of covering satellites)
+    """
+    instance, tuple_ids = as_instance(G, tuple_nodes, satellites)
+    reduced = _presolve(instance, tuple_ids, demands)
+    residual = reduced['residual']
+    return {
+        'forced': instance.labels(reduced['forced']),
+        'removed': instance.labels(reduced['removed']),
+        'residual': {instance.tuple_labels[t]: int(residual[t]) for t in np.flatnonzero(residual).tolist()},
+        'short': [instance.tuple_labels[t] for t in reduced['short']],
+    }
+
+
+def multicover_ilp(G, tuple_nodes=None, satellites=None, demands=None, presolve=True, time_limit=None, log_to_console=False, return_info=False):
+    """
+    Multicover ILP: every tuple needs demands distinct satellites (covering rows with
+    right-hand side equal to the demand; demands above the number of covering satellites
+    are capped). With presolve the model only holds the satellites and rows left by
+    presolve_multicover and the forced satellites are added to its solution. With
+    return_info=True a third value holds the solver 'status', the number of 'forced' and
+    'removed' satellites and of model 'rows', the 'short' tuples, 'presolve_time' and
+    'runtime'. If the solver stops without any solution, satellite_set and total_cost
+    are None.
+
+    Returns:
+        tuple: (satellite_set, total_cost) or (satellite_set, total_cost, info)
+    """
+    from gurobipy import GRB
+    from solver import _build_model, solve_with_trajectory
+    instance, tuple_ids = as_instance(G, tuple_nodes, satellites)
+    start = time.time()
+    if presolve:
+        reduced = _presolve(instance, tuple_ids, demands)
+    else:
+        residual = _demand_vector(instance, tuple_ids, demands)
+        degrees = np.frombuffer(instance.tuple_degrees, dtype=np.int32)
+        reduced = {'forced': [], 'removed': [], 'residual': np.minimum(residual, degrees),
+                   'short': np.flatnonzero(residual > degrees).tolist()}
+    residual = reduced['residual']
+    rows = np.flatnonzero(residual > 0).tolist()
+    excluded = set(reduced['forced']) | set(reduced['removed'])
+    plan_ids = [s for s in range(instance.num_plans) if s not in excluded]
+    presolve_time = time.time() - start
+
+    satellite_set, total_cost = None, None
+    if rows:
+        m, x = _build_model(instance, rows, vtype=GRB.BINARY, name="multicover_ilp", plan_ids=plan_ids,
+                            demands=residual)
+        solve_info = solve_with_trajectory(m, time_limit=time_limit, log_to_console=log_to_console)
+        if m.SolCount > 0:
+            plans = reduced['forced'] + [s for s in plan_ids if x[instance.satellite_labels[s]].X > 0.5]
+            satellite_set, total_cost = instance.labels(plans), instance.total_cost(plans)
+    else:
+        # presolve already met every demand
+        solve_info = {'status': 'OPTIMAL', 'runtime': 0.0}
+        satellite_set, total_cost = instance.labels(reduced['forced']), instance.total_cost(reduced['forced'])
+
+    if return_info:
+        info = {'status': solve_info['status'], 'forced': len(reduced['forced']), 'removed': len(reduced['removed']),
+                'rows': len(rows), 'short': [instance.tuple_labels[t] for t in reduced['short']],
+                'presolve_time': presolve_time, 'runtime': solve_info['runtime']}
+        return satellite_set, total_cost, info
+    return satellite_set, total_cost
+
+
+def replicated_greedy(G, tuple_nodes=None, satellites=None, demands=None):
+    """
+    Baseline multicover greedy by tuple replication: tuple t becomes demands[t] copies and
+    the classic set-difference greedy runs on them, a satellite covering one still
+    uncovered copy of each of its tuples. Same selections as kernels.multicover_greedy,
+    with a set of copies in place of the residual counters.
+
+    Returns:
+        tuple: (satellite_set, total_cost)
+    """
+    instance, tuple_ids = as_instance(G, tuple_nodes, satellites)
+    costs = instance.costs
+    residual = _demand_vector(instance, tuple_ids, demands)
+    uncovered = set((t, k) for t in np.flatnonzero(residual).tolist() for k in range(residual[t]))
+    copies = [set((t, k) for t in instance.plan_tuples(s) for k in range(residual[t]))
+              for s in range(instance.num_plans)]
+
+    def new_copies(s):
+        # one uncovered copy of every tuple of s that has one left
+        covered = {}
+        for t, k in copies[s] & uncovered:
+            covered[t] = min(k, covered.get(t, k))
+        return [(t, k) for t, k in covered.items()]
+
+    heap = []
+    for s in range(instance.num_plans):
+        new = len(new_copies(s))
+        if new > 0:
+            heap.append((costs[s] / new, s))
+    heapq.heapify(heap)
+    chosen = []
+    while uncovered and heap:
+        ratio, s = heapq.heappop(heap)
+        covered = new_copies(s)
+        if len(covered) == 0:
+            continue
+        new_ratio = costs[s] / len(covered)
+        if heap and new_ratio > heap[0][0]:
+            heapq.heappush(heap, (new_ratio, s))
+            continue
+        chosen.append(s)
+        uncovered.difference_update(covered)
+    return instance.labels(chosen), instance.total_cost(chosen)
+
+
+if __name__ == '__main__':
+    import random
+    from kernels import have_numba, multicover_greedy
+    from util_v2 import create_satellite_bipartite_graph
+
+    parser = argparse.ArgumentParser(
+        prog='Multicover',
+        description='Benchmark the multicover greedy and ILP against tuple replication'
+    )
+    parser.add_argument('--locations', type=int, default=5)
+    parser.add_argument('--timesteps', type=int, default=50)
+    parser.add_argument('--satellites', type=int, default=50)
+    parser.add_argument('--coverage-prob', type=float, default=0.2)
+    parser.add_argument('--redundancy', type=int, help='Demand of the critical tuples', default=2)
+    parser.add_argument('--critical-fraction', type=float, help='Fraction of tuples with that demand', default=0.3)
+    parser.add_argument('--no-ilp', action='store_true', help='Skip the ILP runs')
+    parser.add_argument('--time-limit', type=float, default=60)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    G, tuple_nodes, satellite_nodes = create_satellite_bipartite_graph(args.locations, args.timesteps, args.satellites,
+                                                                       args.coverage_prob)
+    feasible_tuple_nodes = [node for node in tuple_nodes if G.degree(node) > 0]
+    demands = {node: args.redundancy if random.random() < args.critical_fraction else 1 for node in feasible_tuple_nodes}
+    instance, _ = as_instance(G, feasible_tuple_nodes, satellite_nodes)
+    # numba (if installed) compiles on first use, keep that out of the timings
+    have_numba()
+    multicover_greedy(instance, demands=demands)
+
+    runs = [('counter greedy', lambda: multicover_greedy(instance, demands=demands)),
+            ('replicated greedy', lambda: replicated_greedy(instance, demands=demands))]
+    if not args.no_ilp:
+        runs += [('ILP', lambda: multicover_ilp(instance, demands=demands, presolve=False, time_limit=args.time_limit)),
+                 ('ILP + presolve', lambda: multicover_ilp(instance, demands=demands, time_limit=args.time_limit))]
+    for name, run in runs:
+        start = time.time()
+        _, total_cost = run()
+        print(f"{name}: cost {total_cost} ({time.time() - start:.3f} s)")
+    reduced = presolve_multicover(instance, demands=demands)
+    print(f"presolve: {len(reduced['forced'])} forced, {len(reduced['removed'])} removed, "
+          f"{len(reduced['residual'])} rows left, {len(reduced['short'])} short tuples")
@@ -0,0 +1,249 @@
+import argparse
+import time
+from array import array
+import numpy as np
+from instance import CoverageInstance, as_instance
+from kernels import csr_arrays
+
+# Multilevel (coarsen, solve, refine) set cover for many locations and long horizons.
+# Every level partitions the locations into groups and the timesteps into contiguous
+# blocks; a super-tuple is one (group, block) rectangle and counts as covered by every
+# plan covering any of its tuples. Coarsening merges neighbouring blocks and pairs of
+# location groups whose plan coverage is nearly identical (Jaccard similarity of the
+# (plan, other coordinate) incidences), halving them at most per level. A cover of a
+# finer level is always a cover of the coarser ones, so the coarse problem is a
+# relaxation: its optimum is a lower bound. The coarsest problem is solved with the
+# greedy or the ILP and the solution is carried back level by level, adding plans with
+# the lazy greedy where a finer level is not covered yet and improving it with the local
+# search at every level.
+
+COARSE_SOLVERS = ('greedy', 'ilp')
+
+
+def _aggregate(indptr, indices, instance, super_of, super_labels):
+    # instance with the same plans over the super-tuples (super_of[t] = -1 drops tuple t)
+    num_plans = len(indptr) - 1
+    num_super = len(super_labels)
+    plans = np.repeat(np.arange(num_plans, dtype=np.int64), np.diff(indptr))
+    supers = super_of[indices]
+    keep = supers >= 0
+    keys = np.unique(plans[keep] * num_super + supers[keep])
+    plan_of, super_ids = np.divmod(keys, num_super)
+    super_indptr = np.zeros(num_plans + 1, dtype=np.int64)
+    super_indptr[1:] = np.cumsum(np.bincount(plan_of, minlength=num_plans))
+    return CoverageInstance(instance.satellite_labels, super_labels, instance.costs,
+                            array('q', super_indptr.tobytes()), array('i', super_ids.astype(np.int32).tobytes()))
+
+
+def _jaccard(inter, sizes_a, sizes_b):
+    union = sizes_a + sizes_b - inter
+    return np.where(union > 0, inter / np.maximum(union, 1), 1.0)
+
+
+def _incidence(rows, cols, num_rows, num_cols):
+    from scipy.sparse import csr_matrix
+    return csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=(num_rows, num_cols))
+
+
+def _coarsen(level, min_similarity):
+    # one round of block and location group matching, None if nothing is similar enough
+    indptr, indices = csr_arrays(level['instance'])
+    num_plans = len(indptr) - 1
+    num_groups, num_blocks = level['num_groups'], level['num_blocks']
+    plans = np.repeat(np.arange(num_plans, dtype=np.int64), np.diff(indptr))
+    g, b = level['super_group'][indices], level['super_block'][indices]
+
+    # neighbouring blocks, compared over (location group, plan)
+    block_matrix = _incidence(b, g * num_plans + plans, num_blocks, num_groups * num_plans)
+    sizes = block_matrix.getnnz(axis=1)
+    inter = np.asarray(block_matrix[:-1].multiply(block_matrix[1:]).sum(axis=1)).ravel()
+    similarity = _jaccard(inter, sizes[:-1], sizes[1:])
+    starts_block = np.ones(num_blocks, dtype=bool)
+    i = 0
+    while i < num_blocks - 1:
+        if similarity[i] >= min_similarity:
+            starts_block[i + 1] = False
+            i += 2
+        else:
+            i += 1
+    new_block = np.cumsum(starts_block) - 1
+
+    # pairs of location groups, compared over (block, plan), most similar pairs first
+    group_matrix = _incidence(g, b * num_plans + plans, num_groups, num_blocks * num_plans)
+    sizes = group_matrix.getnnz(axis=1)
+    overlap = (group_matrix @ group_matrix.T).tocoo()
+    upper = overlap.row < overlap.col
+    rows, cols = overlap.row[upper], overlap.col[upper]
+    similarity = _jaccard(overlap.data[upper], sizes[rows], sizes[cols])
+    partner = np.arange(num_groups)
+    for k in np.argsort(-similarity, kind='stable'):
+        if similarity[k] < min_similarity:
+            break
+        if partner[rows[k]] == rows[k] and partner[cols[k]] == cols[k]:
+            partner[rows[k]], partner[cols[k]] = cols[k], rows[k]
+    representative = np.minimum(np.arange(num_groups), partner)
+    _, new_group = np.unique(representative, return_inverse=True)
+
+    if new_block[-1] + 1 == num_blocks and new_group.max() + 1 == num_groups:
+        return None
+    return new_group, new_block
+
+
+def _build_level(base, location, timestep, group, block, num_groups, num_blocks):
+    # super-tuple instance for location -> group and timestep index -> block
+    indptr, indices = csr_arrays(base)
+    keys = group[location] * num_blocks + block[timestep]
+    used, super_of = np.unique(keys, return_inverse=True)
+    super_group, super_block = np.divmod(used, num_blocks)
+    labels = list(zip(super_group.tolist(), super_block.tolist()))
+    return {
+        'instance': _aggregate(indptr, indices, base, super_of, labels),
+        'group': group, 'block': block, 'num_groups': num_groups, 'num_blocks': num_blocks,
+        'super_group': super_group, 'super_block': super_block,
+    }
+
+
+def build_hierarchy(G, tuple_nodes=None, satellites=None, min_similarity=0.5, coarse_size=1000, max_levels=20):
+    """
+    Coarsens the coverable tuples of G (coverage graph or CoverageInstance, tuples labelled
+    (location, 'T<timestep>')) until the coarsest level has at most coarse_size
+    super-tuples, max_levels levels exist or nothing is at least min_similarity similar
+    any more; min_similarity=0 always merges the most similar neighbours, which coarsens
+    unstructured instances as well. Level 0 is the original problem over the coverable
+    tuples.
+
+    Returns:
+        list: levels, finest first; level['instance'] is a CoverageInstance over the
+        super-tuples (group, block) with the plans of G
+    """
+    instance, tuple_ids = as_instance(G, tuple_nodes, satellites)
+    tuple_ids = [t for t in tuple_ids if instance.tuple_degrees[t] > 0]
+    labels = [instance.tuple_labels[t] for t in tuple_ids]
+    _, location = np.unique(np.array([label[0] for label in labels]), return_inverse=True)
+    _, timestep = np.unique(np.array([int(label[1][1:]) for label in labels], dtype=np.int64), return_inverse=True)
+    num_locations = int(location.max()) + 1 if len(labels) else 0
+    num_timesteps = int(timestep.max()) + 1 if len(labels) else 0
+
+    super_of = np.full(instance.num_tuples, -1, dtype=np.int64)
+    super_of[np.array(tuple_ids, dtype=np.int64)] = np.arange(len(tuple_ids))
+    indptr, indices = csr_arrays(instance)
+    base = _aggregate(indptr, indices, instance, super_of, labels)
+    levels = [{
+        'instance': base,
+        'group': np.arange(num_locations), 'block': np.arange(num_timesteps),
+        'num_groups': num_locations, 'num_blocks': num_timesteps,
+        'super_group': location, 'super_block': timestep,
+    }]
+    while len(levels) < max_levels and levels[-1]['instance'].num_tuples > coarse_size:
+        coarser = _coarsen(levels[-1], min_similarity)
+        if coarser is None:
+            break
+        new_group, new_block = coarser
+        group, block = new_group[levels[-1]['group']], new_block[levels[-1]['block']]
+        levels.append(_build_level(base, location, timestep, group, block,
+                                   int(new_group.max()) + 1, int(new_block.max()) + 1))
+    return levels
+
+
+def multilevel_set_cover(G, tuple_nodes=None, satellites=None, coarse_solver='ilp', min_similarity=0.5,
+                         coarse_size=1000, max_levels=20, refine=True, time_limit=None, refine_time_limit=None,
+                         return_info=False):
+    """
+    Coarsen, solve, refine: builds the hierarchy (see build_hierarchy), solves the coarsest
+    level with coarse_solver ('ilp' within time_limit, or 'greedy') and uncoarsens, repairing
+    the cover with the lazy greedy on every finer level and, if refine, improving it with
+    the local search (cut off after refine_time_limit seconds per level). The result covers
+    every coverable tuple. With return_info=True a third value holds the 'levels' sizes,
+    the 'coarse_cost', 'lower_bound' (the coarse optimum if the ILP proved it, else None),
+    the cost after every level ('costs', coarsest first) and the 'coarsen_time',
+    'solve_time' and 'refine_time'.
+
+    Returns:
+        tuple: (satellite_set, total_cost) or (satellite_set, total_cost, info)
+    """
+    from kernels import lazy_greedy
+    from util_v2 import local_search_algorithm
+    assert coarse_solver in COARSE_SOLVERS, f"coarse_solver must be one of {COARSE_SOLVERS}"
+    start = time.time()
+    levels = build_hierarchy(G, tuple_nodes, satellites, min_similarity=min_similarity, coarse_size=coarse_size,
+                             max_levels=max_levels)
+    coarsen_time = time.time() - start
+
+    start = time.time()
+    coarse = levels[-1]['instance']
+    lower_bound = None
+    satellite_set = None
+    if coarse_solver == 'ilp':
+        from solver import weighted_set_cover_ilp
+        satellite_set, coarse_cost, ilp_info = weighted_set_cover_ilp(coarse, None, None, time_limit=time_limit,
+                                                                      log_to_console=False, return_info=True)
+        if ilp_info['status'] == 'OPTIMAL':
+            lower_bound = coarse_cost
+    if satellite_set is None:
+        satellite_set, coarse_cost = lazy_greedy(coarse, None, None)
+    solve_time = time.time() - start
+
+    start = time.time()
+    costs = []
+    for k in range(len(levels) - 1, -1, -1):
+        instance = levels[k]['instance']
+        if k < len(levels) - 1:
+            satellite_set, _ = lazy_greedy(instance, None, None, satellite_set)
+        # the ILP solution of the coarsest level is already as good as it gets there
+        if refine and not (k == len(levels) - 1 and lower_bound is not None):
+            should_stop = None
+            if refine_time_limit is not None:
+                deadline = time.time() + refine_time_limit
+                should_stop = lambda: time.time() > deadline
+            satellite_set, _ = local_search_algorithm(instance, None, None, satellite_set, should_stop=should_stop)
+        costs.append(instance.total_cost(instance.plan_ids(satellite_set)))
+    refine_time = time.time() - start
+    total_cost = costs[-1]
+
+    if return_info:
+        info = {'levels': [level['instance'].num_tuples for level in levels], 'coarse_cost': coarse_cost,
+                'lower_bound': lower_bound, 'costs': costs, 'coarsen_time': coarsen_time,
+                'solve_time': solve_time, 'refine_time': refine_time}
+        return satellite_set, total_cost, info
+    return satellite_set, total_cost
+
+
+if __name__ == '__main__':
+    import random
+    from util_v2 import create_satellite_bipartite_graph
+
+    parser = argparse.ArgumentParser(
+        prog='Multilevel',
+        description='Compare the coarsen-solve-refine solver with the full ILP'
+    )
+    parser.add_argument('--locations', type=int, default=5)
+    parser.add_argument('--timesteps', type=int, default=50)
+    parser.add_argument('--satellites', type=int, default=50)
+    parser.add_argument('--coverage-prob', type=float, default=0.1)
+    parser.add_argument('--coarse-solver', choices=COARSE_SOLVERS, default='ilp')
+    parser.add_argument('--min-similarity', type=float, default=0.5)
+    parser.add_argument('--coarse-size', type=int, default=1000)
+    parser.add_argument('--compare', action='store_true', help='Also run the full ILP')
+    parser.add_argument('--time-limit', type=float, default=60)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    G, tuple_nodes, satellite_nodes = create_satellite_bipartite_graph(args.locations, args.timesteps, args.satellites,
+                                                                       args.coverage_prob)
+    feasible_tuple_nodes = [node for node in tuple_nodes if G.degree(node) > 0]
+    start = time.time()
+    satellite_set, total_cost, info = multilevel_set_cover(G, feasible_tuple_nodes, satellite_nodes,
+                                                           coarse_solver=args.coarse_solver,
+                                                           min_similarity=args.min_similarity,
+                                                           coarse_size=args.coarse_size, time_limit=args.time_limit,
+                                                           return_info=True)
+    print(f"multilevel: cost {total_cost} ({time.time() - start:.2f} s), levels {info['levels']}, "
+          f"coarse cost {info['coarse_cost']}, lower bound {info['lower_bound']}")
+    if args.compare:
+        from solver import weighted_set_cover_ilp
+        start = time.time()
+        _, full_cost = weighted_set_cover_ilp(G, feasible_tuple_nodes, satellite_nodes, time_limit=args.time_limit,
+                                              log_to_console=False)
+        print(f"full ILP: cost {full_cost} ({time.time() - start:.2f} s)")
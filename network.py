@@ -32,9 +32,9 @@ G, tuple_nodes, satellite_nodes = create_satellite_bipartite_graph(
     locations, timesteps, satellites, coverage_prob, min_cost, max_cost
 )
 
-# Find all valid coverages
+# Find the cheapest valid coverage (or all of them, in cost order, when printing all)
 start_time = time.time()
-valid_coverages = find_all_valid_coverages(G, tuple_nodes, satellite_nodes)
+valid_coverages = find_all_valid_coverages(G, tuple_nodes, satellite_nodes, k=None if print_all else 1)
 end_time = time.time()
 
 # Print results
@@ -63,7 +63,8 @@ for loc_time, satellites in coverage_details.items():
 
 naive_time = (end_time - start_time) * 1000
 print(f"\nSatellite costs: {satellite_nodes}")
-print(f"Total number of valid solutions: {len(valid_coverages)}")
+if print_all:
+    print(f"Total number of valid solutions: {len(valid_coverages)}")
 print(f"Time taken: {naive_time} ms")
 
 # Run greedy algorithm
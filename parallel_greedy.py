@@ -0,0 +1,235 @@
+import heapq
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from instance import as_instance
+from kernels import csr_arrays, _plan_edges, _required_mask
+
+# Parallel approximate greedy set cover in the style of Blelloch, Peng and Tangwongsan
+# ("Linear-work greedy parallel approximate set cover and variants", SPAA 2011).
+# Plans are bucketed by cost per newly covered tuple in powers of (1 + epsilon) and the
+# buckets are processed cheapest first. Within a bucket, rounds pick a nearly independent
+# set of plans at once: every plan gets a random rank, every uncovered tuple goes to the
+# lowest ranked plan covering it, and a plan is taken if it wins at least (1 - epsilon)
+# of its uncovered tuples. Plans that got too expensive move to a later bucket. Every
+# taken plan pays at most (1 + epsilon) times the best ratio left, which keeps the
+# guarantee within a (1 + epsilon) / (1 - epsilon) factor of the sequential greedy's H_n.
+#
+# The per-round work (counting new coverage, claiming tuples, counting wins) is split by
+# plans over worker processes. The instance is published once as a shared instance (see
+# shared_instance.py) that the workers attach to without copying; the state that changes
+# between rounds (uncovered tuples, current ranks, winning rank per tuple) lives in
+# shared memory as well, the parent updates it and the workers read it.
+
+_NO_RANK = np.iinfo(np.int64).max
+
+_worker = {}
+
+
+def _count_new(indptr, indices, uncovered, plans):
+    # number of uncovered tuples of every plan
+    lengths = indptr[plans + 1] - indptr[plans]
+    owner = np.repeat(np.arange(len(plans)), lengths)
+    hit = uncovered[indices[_plan_edges(indptr, plans)]]
+    return np.bincount(owner[hit], minlength=len(plans))
+
+
+def _claim(indptr, indices, uncovered, rank, plans):
+    # lowest rank among these plans for every uncovered tuple they cover
+    lengths = indptr[plans + 1] - indptr[plans]
+    tuples = indices[_plan_edges(indptr, plans)]
+    ranks = np.repeat(rank[plans], lengths)
+    keep = uncovered[tuples]
+    tuples, ranks = tuples[keep], ranks[keep]
+    order = np.lexsort((ranks, tuples))
+    tuples, ranks = tuples[order], ranks[order]
+    first = np.ones(len(tuples), dtype=bool)
+    first[1:] = tuples[1:] != tuples[:-1]
+    return tuples[first], ranks[first]
+
+
+def _count_wins(indptr, indices, uncovered, rank, best, plans):
+    # number of uncovered tuples every plan won (holds the lowest rank of)
+    lengths = indptr[plans + 1] - indptr[plans]
+    owner = np.repeat(np.arange(len(plans)), lengths)
+    tuples = indices[_plan_edges(indptr, plans)]
+    won = uncovered[tuples] & (best[tuples] == np.repeat(rank[plans], lengths))
+    return np.bincount(owner[won], minlength=len(plans))
+
+
+def _init_worker(handle, shared_specs):
+    from multiprocessing import shared_memory
+    from shared_instance import attach
+    _worker['indptr'], _worker['indices'] = csr_arrays(attach(handle))
+    for name, (shm_name, dtype, size) in shared_specs.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        # keep the segment open as long as the view is used
+        _worker[name + '_shm'] = shm
+        _worker[name] = np.ndarray(size, dtype=dtype, buffer=shm.buf)
+
+
+def _run_step(step, plans):
+    indptr, indices, uncovered = _worker['indptr'], _worker['indices'], _worker['uncovered']
+    if step == 'count':
+        return _count_new(indptr, indices, uncovered, plans)
+    if step == 'claim':
+        return _claim(indptr, indices, uncovered, _worker['rank'], plans)
+    return _count_wins(indptr, indices, uncovered, _worker['rank'], _worker['best'], plans)
+
+
+class _Rounds:
+    """
+    Runs the per-round steps either in this process or split over the worker pool
+    (only when there are at least min_parallel plans to spread).
+    """
+
+    def __init__(self, indptr, indices, state, pool, workers, min_parallel):
+        self.indptr = indptr
+        self.indices = indices
+        self.state = state
+        self.pool = pool
+        self.workers = workers
+        self.min_parallel = min_parallel
+
+    def _chunks(self, plans):
+        if self.pool is None or len(plans) < self.min_parallel:
+            return None
+        return np.array_split(plans, self.workers)
+
+    def count(self, plans):
+        chunks = self._chunks(plans)
+        if chunks is None:
+            return _count_new(self.indptr, self.indices, self.state['uncovered'], plans)
+        return np.concatenate(list(self.pool.map(_run_step, ['count'] * len(chunks), chunks)))
+
+    def claim(self, plans):
+        # writes the winning rank of every contested tuple into best and returns those tuples
+        chunks = self._chunks(plans)
+        if chunks is None:
+            claims = [_claim(self.indptr, self.indices, self.state['uncovered'], self.state['rank'], plans)]
+        else:
+            claims = list(self.pool.map(_run_step, ['claim'] * len(chunks), chunks))
+        best = self.state['best']
+        for tuples, ranks in claims:
+            np.minimum.at(best, tuples, ranks)
+        return np.concatenate([tuples for tuples, ranks in claims])
+
+    def wins(self, plans):
+        chunks = self._chunks(plans)
+        if chunks is None:
+            return _count_wins(self.indptr, self.indices, self.state['uncovered'], self.state['rank'],
+                               self.state['best'], plans)
+        return np.concatenate(list(self.pool.map(_run_step, ['wins'] * len(chunks), chunks)))
+
+
+def _bucket(costs, new, epsilon):
+    # bucket b holds ratios in [(1 + epsilon)^b, (1 + epsilon)^(b + 1)); free plans go first
+    ratios = np.maximum(costs / np.maximum(new, 1), 1e-12)
+    return np.floor(np.log(ratios) / math.log1p(epsilon)).astype(np.int64)
+
+
+def _bucketed_greedy(indptr, indices, costs, state, rounds, epsilon, rng):
+    uncovered, rank, best = state['uncovered'], state['rank'], state['best']
+    selected = np.zeros(len(costs), dtype=bool)
+    remaining = int(uncovered.sum())
+
+    plans = np.flatnonzero(np.diff(indptr) > 0)
+    new = rounds.count(plans)
+    plans, new = plans[new > 0], new[new > 0]
+    buckets = {}
+    for b, s in zip(_bucket(costs[plans], new, epsilon).tolist(), plans.tolist()):
+        buckets.setdefault(b, []).append(s)
+    heap = list(buckets)
+    heapq.heapify(heap)
+
+    while heap and remaining > 0:
+        b = heapq.heappop(heap)
+        plans = np.array(buckets.pop(b), dtype=np.int64)
+        while len(plans) > 0 and remaining > 0:
+            new = rounds.count(plans)
+            alive = new > 0
+            plan_buckets = _bucket(costs[plans], new, epsilon)
+            # ratios only grow, plans that left this bucket wait in a later one
+            for later, s in zip(plan_buckets[alive & (plan_buckets > b)].tolist(),
+                                plans[alive & (plan_buckets > b)].tolist()):
+                if later not in buckets:
+                    buckets[later] = []
+                    heapq.heappush(heap, later)
+                buckets[later].append(s)
+            stay = alive & (plan_buckets <= b)
+            plans, new = plans[stay], new[stay]
+            if len(plans) == 0:
+                break
+
+            rank[plans] = rng.permutation(len(plans))
+            contested = rounds.claim(plans)
+            wins = rounds.wins(plans)
+            taken = wins >= (1 - epsilon) * new
+            chosen = plans[taken]
+            selected[chosen] = True
+            covered = indices[_plan_edges(indptr, chosen)]
+            covered = np.unique(covered[uncovered[covered]])
+            remaining -= len(covered)
+            uncovered[covered] = False
+            best[contested] = _NO_RANK
+            plans = plans[~taken]
+    return selected
+
+
+def parallel_greedy(G, feasible_tuple_nodes=None, satellites=None, epsilon=0.1, workers=None, min_parallel=4096, seed=0):
+    """
+    Parallel bucketed greedy set cover. epsilon trades solution quality for fewer rounds:
+    the cover costs at most (1 + epsilon) / (1 - epsilon) times the sequential greedy's
+    H_n guarantee. workers is the number of worker processes (default: all cores,
+    1 runs everything in this process); rounds with fewer than min_parallel plans stay
+    in this process since they are not worth the round trip. G can be the coverage graph
+    or a CoverageInstance.
+
+    Returns:
+        tuple: (satellite_set, total_cost)
+    """
+    from multiprocessing import shared_memory
+    assert 0 < epsilon < 1, "epsilon must be between 0 and 1"
+    instance, tuple_ids = as_instance(G, feasible_tuple_nodes, satellites)
+    indptr, indices = csr_arrays(instance)
+    costs = np.asarray(instance.costs, dtype=float)
+    rng = np.random.default_rng(seed)
+    workers = workers or os.cpu_count() or 1
+
+    initial = {
+        'uncovered': _required_mask(instance, tuple_ids),
+        'rank': np.zeros(instance.num_plans, dtype=np.int64),
+        'best': np.full(instance.num_tuples, _NO_RANK, dtype=np.int64),
+    }
+    segments = []
+    try:
+        state = {}
+        shared_specs = {}
+        for name, array in initial.items():
+            if workers > 1:
+                shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                segments.append(shm)
+                state[name] = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+                state[name][:] = array
+                shared_specs[name] = (shm.name, array.dtype, array.shape)
+            else:
+                state[name] = array
+        if workers > 1:
+            from shared_instance import publish
+            with publish(instance) as shared, \
+                    ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                        initargs=(shared.handle, shared_specs)) as pool:
+                rounds = _Rounds(indptr, indices, state, pool, workers, min_parallel)
+                selected = _bucketed_greedy(indptr, indices, costs, state, rounds, epsilon, rng)
+        else:
+            rounds = _Rounds(indptr, indices, state, None, 1, min_parallel)
+            selected = _bucketed_greedy(indptr, indices, costs, state, rounds, epsilon, rng)
+        state.clear()
+    finally:
+        for shm in segments:
+            shm.close()
+            shm.unlink()
+
+    plans = np.flatnonzero(selected).tolist()
+    return instance.labels(plans), instance.total_cost(plans)
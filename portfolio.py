@@ -0,0 +1,242 @@
+import math
+import queue
+import random
+import threading
+import time
+from collections import namedtuple
+from instance import CoverageInstance, as_instance
+from util_v2 import greedy_ratio_based_algorithm, repair_coverage, local_search_algorithm
+
+# One update from the portfolio: a new incumbent (satellite_set is not None) and/or a new bound
+PortfolioEvent = namedtuple('PortfolioEvent', ['time', 'source', 'cost', 'bound', 'satellite_set'])
+
+PORTFOLIO_MEMBERS = ('greedy_ratio', 'lp_rounding', 'local_search', 'ilp')
+
+
+class _PortfolioState:
+    """
+    Incumbent and bound shared by the member threads. Every improvement is pushed
+    onto events so the caller can stream them; stop is set on deadline or closed gap.
+    """
+
+    def __init__(self, satellites, start):
+        self.satellites = satellites
+        self.start = start
+        self.lock = threading.Lock()
+        self.improved = threading.Condition(self.lock)
+        self.stop = threading.Event()
+        self.events = queue.Queue()
+        self.models = []
+        self.best_set = None
+        self.best_cost = math.inf
+        self.bound = 0
+        # with integer costs any bound can be rounded up
+        self.integer_costs = all(float(cost).is_integer() for cost in satellites.values())
+
+    def publish_solution(self, source, satellite_set):
+        cost = sum(self.satellites[sat] for sat in satellite_set)
+        with self.lock:
+            if cost >= self.best_cost:
+                return
+            self.best_set = set(satellite_set)
+            self.best_cost = cost
+            self.events.put(PortfolioEvent(time.time() - self.start, source, cost, self.bound, set(satellite_set)))
+            self.improved.notify_all()
+
+    def publish_bound(self, source, bound):
+        if self.integer_costs:
+            bound = math.ceil(bound - 1e-6)
+        with self.lock:
+            if bound <= self.bound:
+                return
+            self.bound = min(bound, self.best_cost)
+            self.events.put(PortfolioEvent(time.time() - self.start, source, self.best_cost, self.bound, None))
+
+    def register_model(self, m):
+        with self.lock:
+            self.models.append(m)
+            if self.stop.is_set():
+                m.terminate()
+
+    def unregister_model(self, m):
+        with self.lock:
+            self.models.remove(m)
+
+    def cancel(self):
+        with self.lock:
+            self.stop.set()
+            for m in self.models:
+                m.terminate()
+            self.improved.notify_all()
+
+
+def _run_greedy_ratio(state, G, feasible_tuple_nodes, satellites):
+    # a single greedy pass that does not check state.stop, so it is not joined on cancel
+    satellite_set, _ = greedy_ratio_based_algorithm(G, feasible_tuple_nodes, satellites)
+    state.publish_solution('greedy_ratio', satellite_set)
+
+
+def _run_local_search(state, G, feasible_tuple_nodes, satellites):
+    # improve every new incumbent found by the other members until told to stop
+    searched = None
+    while not state.stop.is_set():
+        with state.lock:
+            while not state.stop.is_set() and (state.best_set is None or state.best_set == searched):
+                state.improved.wait()
+            if state.stop.is_set():
+                return
+            searched = set(state.best_set)
+        satellite_set, _ = local_search_algorithm(G, feasible_tuple_nodes, satellites, searched,
+                                                  should_stop=state.stop.is_set)
+        state.publish_solution('local_search', satellite_set)
+
+
+def _quiet_env():
+    # gurobi environments must not be shared between threads, so every member gets its own
+    from gurobipy import Env
+    env = Env(empty=True)
+    env.setParam('OutputFlag', 0)
+    env.start()
+    return env
+
+
+def _run_lp_rounding(state, G, feasible_tuple_nodes, satellites, max_rounds=100):
+    from gurobipy import GRB
+    from solver import build_weighted_set_cover_model
+    with _quiet_env() as env:
+        m, x = build_weighted_set_cover_model(G, feasible_tuple_nodes, satellites, vtype=GRB.CONTINUOUS,
+                                              name="weighted_set_cover_lp", env=env)
+        state.register_model(m)
+        m.optimize()
+        state.unregister_model(m)
+        if m.Status != GRB.OPTIMAL:
+            return
+        state.publish_bound('lp_rounding', m.ObjVal)
+        fractional = {sat: min(max(x[sat].X, 0), 1) for sat in satellites}
+
+    # randomized rounding with k sampling iterations per round, repaired into a cover
+    num_tuples = G.num_tuples if feasible_tuple_nodes is None else len(feasible_tuple_nodes)
+    k = 2 * math.ceil(math.log(max(num_tuples, 2)))
+    for _ in range(max_rounds):
+        if state.stop.is_set():
+            return
+        satellite_set = set()
+        for _ in range(k):
+            satellite_set.update(sat for sat in satellites if random.random() < fractional[sat])
+        satellite_set, _ = repair_coverage(G, feasible_tuple_nodes, satellites, satellite_set)
+        state.publish_solution('lp_rounding', satellite_set)
+
+
+def _run_ilp(state, G, feasible_tuple_nodes, satellites):
+    from gurobipy import GRB
+    from solver import build_weighted_set_cover_model
+    with _quiet_env() as env:
+        m, x = build_weighted_set_cover_model(G, feasible_tuple_nodes, satellites, vtype=GRB.BINARY, env=env)
+        variables = list(x.values())
+        names = list(x.keys())
+
+        def callback(model, where):
+            if state.stop.is_set():
+                model.terminate()
+            elif where == GRB.Callback.MIPSOL:
+                values = model.cbGetSolution(variables)
+                state.publish_solution('ilp', {sat for sat, value in zip(names, values) if value > 0.5})
+            elif where == GRB.Callback.MIP:
+                state.publish_bound('ilp', model.cbGet(GRB.Callback.MIP_OBJBND))
+
+        state.register_model(m)
+        m.optimize(callback)
+        state.unregister_model(m)
+        if m.Status == GRB.OPTIMAL:
+            state.publish_bound('ilp', m.ObjBound)
+
+
+_MEMBER_FUNCTIONS = {
+    'greedy_ratio': _run_greedy_ratio,
+    'lp_rounding': _run_lp_rounding,
+    'local_search': _run_local_search,
+    'ilp': _run_ilp,
+}
+
+# members that return soon after state.cancel(); the others are left to finish on their own
+_COOPERATIVE_MEMBERS = ('lp_rounding', 'local_search', 'ilp')
+
+
+def _run_member(state, member, G, feasible_tuple_nodes, satellites):
+    try:
+        _MEMBER_FUNCTIONS[member](state, G, feasible_tuple_nodes, satellites)
+    except ImportError:
+        # gurobipy is not installed, the other members still run
+        pass
+
+
+def run_portfolio(G, feasible_tuple_nodes, satellites, deadline=0.2, members=PORTFOLIO_MEMBERS, gap_tol=1e-6):
+    """
+    Runs the ratio greedy, LP rounding, local search and the exact ILP in parallel threads
+    with one shared deadline (in seconds) and yields a PortfolioEvent for every new
+    incumbent or improved bound as soon as it is found. Remaining work is cancelled when
+    the deadline hits (events already queued by then are still yielded) or the incumbent
+    is proven optimal (gap below gap_tol).
+    Members that need gurobipy are skipped if it is not installed. G can be the coverage
+    graph or a CoverageInstance.
+
+    Returns:
+        generator: PortfolioEvent(time, source, cost, bound, satellite_set)
+    """
+    start = time.time()
+    if not isinstance(G, CoverageInstance):
+        # convert once so the members share one coverage index instead of rebuilding it on every call
+        G, _ = as_instance(G, feasible_tuple_nodes, satellites)
+        feasible_tuple_nodes = None
+    satellites = G.cost_map
+    state = _PortfolioState(satellites, start)
+    threads = [threading.Thread(target=_run_member, args=(state, member, G, feasible_tuple_nodes, satellites),
+                                name=f"portfolio-{member}", daemon=True)
+               for member in members]
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            remaining = start + deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                event = state.events.get(timeout=min(remaining, 0.01))
+            except queue.Empty:
+                if not any(thread.is_alive() for thread in threads) and state.events.empty():
+                    break
+                continue
+            yield event
+            with state.lock:
+                if state.best_cost - state.bound <= gap_tol:
+                    break
+        while True:
+            try:
+                event = state.events.get_nowait()
+            except queue.Empty:
+                break
+            yield event
+    finally:
+        state.cancel()
+        for member, thread in zip(members, threads):
+            if member in _COOPERATIVE_MEMBERS:
+                thread.join()
+
+
+def solve_with_deadline(G, feasible_tuple_nodes, satellites, deadline=0.2, members=PORTFOLIO_MEMBERS, on_event=None):
+    """
+    Blocking version of run_portfolio that returns the best incumbent found before the
+    deadline. on_event is called with every streamed PortfolioEvent.
+
+    Returns:
+        tuple: (satellite_set, total_cost, bound)
+    """
+    satellite_set, total_cost, bound = None, math.inf, 0
+    for event in run_portfolio(G, feasible_tuple_nodes, satellites, deadline=deadline, members=members):
+        if on_event is not None:
+            on_event(event)
+        if event.satellite_set is not None:
+            satellite_set, total_cost = event.satellite_set, event.cost
+        bound = event.bound
+    return satellite_set, total_cost, bound
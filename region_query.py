@@ -0,0 +1,156 @@
+import time
+from bisect import bisect_left
+from instance import as_instance
+
+# Query engine for "cheapest cover of these locations over these timesteps" questions on
+# one loaded instance. A sub-region is never copied out of the instance: it is just the
+# list of its tuple ids, found through a per-location index sorted by timestep, and the
+# ILP is built over the plans that cover it. Results are memoized by region (a result a
+# time limit cut short is only kept as an incumbent, the next query re-solves); a cached
+# result of an enclosing region, restricted to the plans that still cover something,
+# is a feasible incumbent, and the optimal cost of a cached region inside the query is a
+# lower bound (covering more tuples never gets cheaper). When the two meet, no solve is
+# needed at all.
+
+
+class RegionQueryEngine:
+    """
+    Answers cheapest-cover queries for sub-regions (a set of locations and a timestep
+    window) of G, which is a coverage graph (with tuple_nodes and satellites) or a
+    CoverageInstance. Tuples no plan covers are ignored, like feasible_tuple_nodes in
+    the experiment scripts.
+    """
+
+    def __init__(self, G, tuple_nodes=None, satellites=None, env=None):
+        self.instance, tuple_ids = as_instance(G, tuple_nodes, satellites)
+        self.env = env
+        # location -> (sorted timesteps, tuple ids in the same order)
+        index = {}
+        for t in tuple_ids:
+            if self.instance.tuple_degrees[t] == 0:
+                continue
+            location, timestep = self.instance.tuple_labels[t]
+            index.setdefault(location, []).append((int(timestep[1:]), t))
+        self.index = {}
+        for location, entries in index.items():
+            entries.sort()
+            self.index[location] = ([timestep for timestep, t in entries], [t for timestep, t in entries])
+        self.cache = {}
+        self.stats = {'cache': 0, 'bounds': 0, 'solve': 0}
+
+    def covering_plans(self, location, timestep):
+        """
+        Returns:
+            list: The satellites covering (location, timestep)
+        """
+        timesteps, tuple_ids = self.index.get(location, ([], []))
+        i = bisect_left(timesteps, timestep)
+        if i == len(timesteps) or timesteps[i] != timestep:
+            return []
+        return [self.instance.satellite_labels[s] for s in self.instance.tuple_plans(tuple_ids[i])]
+
+    def region_tuples(self, locations=None, start=None, end=None):
+        """
+        Tuple ids of the region: locations (None: all of them) over timesteps start <= t < end
+        (None: unbounded), sliced from the per-location index.
+
+        Returns:
+            list: tuple ids
+        """
+        if locations is None:
+            locations = self.index
+        tuple_ids = []
+        for location in locations:
+            if location not in self.index:
+                continue
+            timesteps, ids = self.index[location]
+            lo = 0 if start is None else bisect_left(timesteps, start)
+            hi = len(timesteps) if end is None else bisect_left(timesteps, end)
+            tuple_ids.extend(ids[lo:hi])
+        return tuple_ids
+
+    def _key(self, locations, start, end):
+        locations = frozenset(self.index if locations is None else locations)
+        return locations, -float('inf') if start is None else start, float('inf') if end is None else end
+
+    def _incumbent(self, key, tuple_ids):
+        # cheapest cached solution of an enclosing region, without plans that cover nothing here
+        locations, start, end = key
+        needed = set(tuple_ids)
+        best = None
+        for (cached_locations, cached_start, cached_end), result in self.cache.items():
+            if result['plans'] is not None and locations <= cached_locations and cached_start <= start and end <= cached_end:
+                plans = [s for s in result['plans'] if needed.intersection(self.instance.plan_tuples(s))]
+                cost = self.instance.total_cost(plans)
+                if best is None or cost < best[1]:
+                    best = (plans, cost)
+        return best
+
+    def _lower_bound(self, key):
+        # best optimal cost of a cached region inside this one
+        locations, start, end = key
+        bound = 0
+        for (cached_locations, cached_start, cached_end), result in self.cache.items():
+            if result['optimal'] and cached_locations <= locations and start <= cached_start and cached_end <= end:
+                bound = max(bound, result['cost'])
+        return bound
+
+    def _solve(self, tuple_ids, incumbent, lower_bound, time_limit):
+        from gurobipy import GRB
+        from solver import _build_model
+        plan_ids = sorted(set(s for t in tuple_ids for s in self.instance.tuple_plans(t)))
+        m, x = _build_model(self.instance, tuple_ids, vtype=GRB.BINARY, name="region_query", env=self.env,
+                            plan_ids=plan_ids)
+        m.Params.LogToConsole = 0
+        if time_limit is not None:
+            m.Params.TimeLimit = time_limit
+        if incumbent is not None:
+            chosen = set(incumbent[0])
+            for s in plan_ids:
+                x[self.instance.satellite_labels[s]].Start = 1 if s in chosen else 0
+        if lower_bound > 0:
+            # nothing can beat a cost that matches the bound, stop as soon as one is found
+            m.Params.BestObjStop = lower_bound
+        m.optimize()
+        if m.SolCount == 0:
+            return incumbent[0] if incumbent is not None else None, False
+        plans = [s for s in plan_ids if x[self.instance.satellite_labels[s]].X > 0.5]
+        optimal = m.Status == GRB.OPTIMAL or self.instance.total_cost(plans) <= lower_bound
+        return plans, optimal
+
+    def query(self, locations=None, start=None, end=None, time_limit=None, return_info=False):
+        """
+        Cheapest set of satellites covering every coverable tuple of the given locations
+        (None: all) over timesteps start <= t < end. Repeated regions come from the cache
+        once their answer is optimal; otherwise cached enclosing and enclosed regions give an incumbent and a lower bound,
+        and the ILP over the region's plans is only run if they do not meet. With
+        return_info=True a third value tells where the answer came from ('cache', 'bounds'
+        or 'solve'), whether it is optimal, and the query time.
+
+        Returns:
+            tuple: (satellite_set, total_cost) or (satellite_set, total_cost, info)
+        """
+        query_start = time.time()
+        key = self._key(locations, start, end)
+        if key in self.cache and self.cache[key]['optimal']:
+            source = 'cache'
+        else:
+            tuple_ids = self.region_tuples(locations, start, end)
+            incumbent = self._incumbent(key, tuple_ids)
+            lower_bound = self._lower_bound(key)
+            if not tuple_ids:
+                plans, optimal, source = [], True, 'bounds'
+            elif incumbent is not None and incumbent[1] <= lower_bound:
+                plans, optimal, source = incumbent[0], True, 'bounds'
+            else:
+                plans, optimal = self._solve(tuple_ids, incumbent, lower_bound, time_limit)
+                source = 'solve'
+            self.cache[key] = {'plans': plans, 'cost': self.instance.total_cost(plans or []), 'optimal': optimal}
+        self.stats[source] += 1
+        result = self.cache[key]
+        satellite_set = None if result['plans'] is None else self.instance.labels(result['plans'])
+        total_cost = None if result['plans'] is None else result['cost']
+        if return_info:
+            info = {'source': source, 'optimal': result['optimal'], 'time': time.time() - query_start}
+            return satellite_set, total_cost, info
+        return satellite_set, total_cost
@@ -0,0 +1,216 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from instance import as_instance
+from kernels import csr_arrays, _kernel
+
+# Rolling-horizon planning for long timestep ranges: instead of one ILP over every
+# (location, timestep) tuple, overlapping windows of timesteps are solved one after the
+# other. Of each window's solution only the plans needed in its first (window - overlap)
+# timesteps are committed; the rest of the window is look-ahead and is decided again by
+# the next window, which gets the committed plans for free. Windows that share no plan
+# do not interact and are solved in parallel. A window whose solve stops without any
+# solution (e.g. at its time limit) is covered by the greedy, extending the committed plans.
+
+CARRY_MODES = ('fixed', 'zero_cost')
+
+
+def timestep_of(tuple_node):
+    # ('L3', 'T17') -> 17
+    return int(tuple_node[1][1:])
+
+
+def make_windows(num_timesteps, window, overlap=0):
+    """
+    Splits timesteps 0..num_timesteps-1 into windows of window timesteps, consecutive
+    windows sharing overlap timesteps. commit_end is where the committed part of a window
+    ends (the last window commits everything).
+
+    Returns:
+        list: List of (start, end, commit_end) timestep index ranges
+    """
+    assert window > 0 and 0 <= overlap < window, "Need 0 <= overlap < window"
+    step = window - overlap
+    windows = []
+    start = 0
+    while start < num_timesteps:
+        end = min(start + window, num_timesteps)
+        commit_end = num_timesteps if end == num_timesteps else start + step
+        windows.append((start, end, commit_end))
+        if end == num_timesteps:
+            break
+        start += step
+    return windows
+
+
+def _components(instance, window_tuples):
+    # windows interact if some plan covers tuples in both; group them with union-find
+    parent = list(range(len(window_tuples)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    first_window = {}
+    for w, tuple_ids in enumerate(window_tuples):
+        for t in tuple_ids:
+            for s in instance.tuple_plans(t):
+                if s in first_window:
+                    parent[find(w)] = find(first_window[s])
+                else:
+                    first_window[s] = w
+    components = {}
+    for w in range(len(window_tuples)):
+        components.setdefault(find(w), []).append(w)
+    return sorted(components.values())
+
+
+def _greedy_window(instance, tuple_ids, committed):
+    # committed plans are already paid for, the greedy only adds what they leave uncovered
+    indptr, indices = csr_arrays(instance)
+    required = np.zeros(instance.num_tuples, dtype=bool)
+    required[tuple_ids] = True
+    start = np.zeros(instance.num_plans, dtype=bool)
+    start[list(committed)] = True
+    selected = _kernel('lazy_greedy', None)(indptr, indices, np.asarray(instance.costs, dtype=float), required, start)
+    return np.flatnonzero(selected).tolist()
+
+
+def _solve_window(instance, tuple_ids, committed, carry, time_limit, env):
+    from gurobipy import GRB
+    from solver import build_weighted_set_cover_model, _status_name
+    m, x = build_weighted_set_cover_model(instance, [instance.tuple_labels[t] for t in tuple_ids], None,
+                                          vtype=GRB.BINARY, name="rolling_horizon_window", env=env)
+    variables = [x[sat] for sat in instance.satellite_labels]
+    for s in committed:
+        if carry == 'fixed':
+            variables[s].LB = 1
+        else:
+            variables[s].Obj = 0
+    if time_limit is not None:
+        m.Params.TimeLimit = time_limit
+    m.optimize()
+    if m.SolCount == 0:
+        return _greedy_window(instance, tuple_ids, committed), m.Runtime, 'greedy'
+    return [s for s, var in enumerate(variables) if var.X > 0.5], m.Runtime, _status_name(m.Status)
+
+
+def _solve_component(instance, windows, window_tuples, commit_tuples, carry, time_limit):
+    from portfolio import _quiet_env
+    committed = set()
+    stats = []
+    with _quiet_env() as env:
+        for w in windows:
+            selected, runtime, status = _solve_window(instance, window_tuples[w], committed, carry, time_limit, env)
+            # keep the plans that cover something in the committed part, the rest is look-ahead
+            commit = set(commit_tuples[w])
+            new = [s for s in selected if s not in committed and commit.intersection(instance.plan_tuples(s))]
+            committed.update(new)
+            stats.append({'window': w, 'tuples': len(window_tuples[w]), 'committed': len(new),
+                          'cost': instance.total_cost(new), 'runtime': runtime, 'status': status})
+    return committed, stats
+
+
+def rolling_horizon_ilp(G, tuple_nodes, satellite_nodes, window, overlap=0, carry='zero_cost', time_limit=None, workers=1, return_info=False):
+    """
+    Solves the set cover over windows of window timesteps, consecutive windows overlapping
+    in overlap timesteps. Plans committed by earlier windows are carried into the later
+    ones either fixed to 1 (carry='fixed') or as free choices with cost 0 (carry='zero_cost');
+    either way their cost is only paid once. Groups of windows that share no plan are solved
+    in parallel on up to workers threads. time_limit applies to each window; a window left
+    without any solution is covered greedily instead (its status is 'greedy'). With
+    return_info=True a third value lists per-window statistics, including the solver
+    'status' of every window.
+
+    Returns:
+        tuple: (satellite_set, total_cost) or (satellite_set, total_cost, info)
+    """
+    if carry not in CARRY_MODES:
+        raise ValueError(f"Unknown carry mode: {carry}")
+    instance, tuple_ids = as_instance(G, tuple_nodes, satellite_nodes)
+    tuple_ids = [t for t in tuple_ids if instance.tuple_degrees[t] > 0]
+    timesteps = sorted(set(timestep_of(instance.tuple_labels[t]) for t in tuple_ids))
+    position = {timestep: i for i, timestep in enumerate(timesteps)}
+    windows = make_windows(len(timesteps), window, overlap)
+
+    window_tuples = []
+    commit_tuples = []
+    for start, end, commit_end in windows:
+        in_window = [t for t in tuple_ids if start <= position[timestep_of(instance.tuple_labels[t])] < end]
+        window_tuples.append(in_window)
+        commit_tuples.append([t for t in in_window if position[timestep_of(instance.tuple_labels[t])] < commit_end])
+
+    components = _components(instance, window_tuples)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda component: _solve_component(instance, component, window_tuples, commit_tuples,
+                                                                   carry, time_limit), components))
+
+    selected = set()
+    stats = []
+    for committed, component_stats in results:
+        selected.update(committed)
+        stats.extend(component_stats)
+    satellite_set = instance.labels(selected)
+    total_cost = instance.total_cost(selected)
+    if return_info:
+        info = {'windows': sorted(stats, key=lambda stat: stat['window']), 'components': components}
+        return satellite_set, total_cost, info
+    return satellite_set, total_cost
+
+
+def compare_with_full_solve(G, tuple_nodes, satellite_nodes, window, overlap=0, carry='zero_cost', time_limit=None, workers=1):
+    """
+    Runs the rolling-horizon planner and the flat ILP over all tuples on the same instance
+    (only sensible for instances small enough for the flat ILP).
+
+    Returns:
+        dict: 'rolling_cost', 'full_cost', 'gap' (relative excess of the rolling cost),
+              'rolling_time' and 'full_time'
+    """
+    from solver import weighted_set_cover_ilp
+    start = time.time()
+    _, rolling_cost = rolling_horizon_ilp(G, tuple_nodes, satellite_nodes, window, overlap=overlap, carry=carry,
+                                          time_limit=time_limit, workers=workers)
+    rolling_time = time.time() - start
+    start = time.time()
+    _, full_cost = weighted_set_cover_ilp(G, tuple_nodes, satellite_nodes, time_limit=time_limit, log_to_console=False)
+    full_time = time.time() - start
+    gap = None if not full_cost else (rolling_cost - full_cost) / full_cost
+    return {'rolling_cost': rolling_cost, 'full_cost': full_cost, 'gap': gap,
+            'rolling_time': rolling_time, 'full_time': full_time}
+
+
+if __name__ == '__main__':
+    import random
+    from util_v2 import create_satellite_bipartite_graph
+
+    parser = argparse.ArgumentParser(
+        prog='Rolling Horizon',
+        description='Compare the rolling-horizon planner with the full ILP on a long horizon'
+    )
+    parser.add_argument('--locations', type=int, default=5)
+    parser.add_argument('--timesteps', type=int, default=200)
+    parser.add_argument('--satellites', type=int, default=60)
+    parser.add_argument('--coverage-prob', type=float, default=0.1)
+    parser.add_argument('--window', type=int, help='Timesteps per window', default=40)
+    parser.add_argument('--overlaps', type=int, nargs='+', help='Overlaps to compare', default=[0, 10, 20])
+    parser.add_argument('--carry', choices=CARRY_MODES, default='zero_cost')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--time-limit', type=float, default=60)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    G, tuple_nodes, satellite_nodes = create_satellite_bipartite_graph(args.locations, args.timesteps, args.satellites,
+                                                                       args.coverage_prob)
+    feasible_tuple_nodes = [node for node in tuple_nodes if G.degree(node) > 0]
+    for overlap in args.overlaps:
+        result = compare_with_full_solve(G, feasible_tuple_nodes, satellite_nodes, args.window, overlap=overlap,
+                                         carry=args.carry, time_limit=args.time_limit, workers=args.workers)
+        gap = '-' if result['gap'] is None else f"{100 * result['gap']:.1f}%"
+        print(f"overlap {overlap}: rolling {result['rolling_cost']} ({result['rolling_time']:.2f} s), "
+              f"full {result['full_cost']} ({result['full_time']:.2f} s), gap {gap}")
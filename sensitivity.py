@@ -0,0 +1,156 @@
+from instance import as_instance
+
+# Sensitivity analysis from one LP solve: the dual prices, reduced costs and cost ranges
+# gurobi reports with the LP relaxation are read once and kept in arrays, so questions
+# like "which sites make us pay the most?" or "how much cheaper must S7 get before the LP
+# uses it?" are answered by lookups instead of a re-solve per question.
+
+
+class LPSensitivity:
+    """
+    Primal values, dual prices and cost ranging of the weighted set cover LP relaxation.
+
+    x[s]: LP value of plan s. duals[t]: marginal cost of covering tuple t (the dual price of
+    its covering constraint; NaN for tuples without one). reduced_costs[s]: how much
+    plan s's cost exceeds the value of the tuples it covers at the dual prices.
+    cost_lower[s] / cost_upper[s]: the range of plan s's cost in which the current LP
+    basis stays optimal (and the objective changes linearly with slope x[s]).
+    """
+
+    def __init__(self, instance, tuple_ids, objective, x, duals, reduced_costs, cost_lower, cost_upper):
+        self.instance = instance
+        self.tuple_ids = tuple_ids
+        self.objective = objective
+        self.x = x
+        self.duals = duals
+        self.reduced_costs = reduced_costs
+        self.cost_lower = cost_lower
+        self.cost_upper = cost_upper
+
+    @classmethod
+    def solve(cls, G, tuple_nodes=None, satellite_nodes=None, env=None):
+        """
+        Solves the LP relaxation once and reads off everything the queries need.
+
+        Returns:
+            LPSensitivity
+        """
+        from gurobipy import GRB
+        from solver import _build_model
+        instance, tuple_ids = as_instance(G, tuple_nodes, satellite_nodes)
+        m, x = _build_model(instance, tuple_ids, vtype=GRB.CONTINUOUS, name="weighted_set_cover_lp", env=env)
+        m.Params.LogToConsole = 0
+        m.optimize()
+        return cls.from_model(instance, tuple_ids, m, x)
+
+    @classmethod
+    def from_model(cls, instance, tuple_ids, m, x):
+        """
+        Reads the sensitivity information of an optimized LP built by solver._build_model
+        with the instance's own demands (its constraints are the rows of solver._model_rows).
+
+        Returns:
+            LPSensitivity
+        """
+        import numpy as np
+        from gurobipy import GRB
+        from solver import _model_rows
+        assert m.Status == GRB.OPTIMAL, "The LP relaxation has to be solved to optimality"
+        variables = [x[sat] for sat in instance.satellite_labels]
+        duals = np.full(instance.num_tuples, np.nan)
+        covered = _model_rows(instance, tuple_ids)
+        duals[covered] = m.getAttr('Pi', m.getConstrs())
+        return cls(instance, tuple_ids, m.ObjVal,
+                   np.array(m.getAttr('X', variables)),
+                   duals,
+                   np.array(m.getAttr('RC', variables)),
+                   np.array(m.getAttr('SAObjLow', variables)),
+                   np.array(m.getAttr('SAObjUp', variables)))
+
+    def tuple_prices(self):
+        """
+        Returns:
+            dict: Mapping of tuple -> dual price, for every tuple with a covering constraint
+        """
+        from solver import _model_rows
+        labels = self.instance.tuple_labels
+        return {labels[t]: self.duals[t] for t in _model_rows(self.instance, self.tuple_ids)}
+
+    def site_prices(self):
+        """
+        Dual prices summed over each location's timesteps: what covering the site costs at the margin.
+
+        Returns:
+            dict: Mapping of location -> price
+        """
+        prices = {}
+        for (location, timestep), price in self.tuple_prices().items():
+            prices[location] = prices.get(location, 0) + price
+        return prices
+
+    def most_expensive_sites(self, k=10):
+        """
+        Returns:
+            list: The k (location, price) pairs with the highest prices
+        """
+        return sorted(self.site_prices().items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def most_expensive_tuples(self, k=10):
+        """
+        Returns:
+            list: The k (tuple, dual price) pairs with the highest prices
+        """
+        return sorted(self.tuple_prices().items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def reduced_cost(self, sat):
+        return self.reduced_costs[self.instance.satellite_index[sat]]
+
+    def cost_range(self, sat):
+        """
+        Returns:
+            tuple: (low, up) costs of sat between which the LP basis stays optimal
+        """
+        s = self.instance.satellite_index[sat]
+        return self.cost_lower[s], self.cost_upper[s]
+
+    def entry_drop(self, sat, tol=1e-9):
+        """
+        How far sat's cost has to drop before the LP starts using it: 0 if it already has a
+        positive LP value, otherwise its reduced cost, where the current basis stops being
+        optimal. Set cover LPs are often degenerate (several optimal dual prices), then the
+        objective may only start to improve after a larger drop, so this is a lower bound.
+
+        Returns:
+            float: the required price drop
+        """
+        s = self.instance.satellite_index[sat]
+        if self.x[s] > tol:
+            return 0.0
+        return max(0.0, self.reduced_costs[s])
+
+    def entry_price(self, sat):
+        return self.instance.costs[self.instance.satellite_index[sat]] - self.entry_drop(sat)
+
+    def objective_after(self, costs):
+        """
+        LP objective after changing the costs in costs (a dict of satellite -> new cost),
+        without re-solving. Exact while the current basis stays optimal; by the 100% rule
+        that holds when the changes use at most 100% of their ranges in total. Returns None
+        otherwise, then the LP has to be solved again.
+
+        Returns:
+            float: the new objective, or None
+        """
+        objective = self.objective
+        used = 0.0
+        for sat, cost in costs.items():
+            s = self.instance.satellite_index[sat]
+            delta = cost - self.instance.costs[s]
+            if delta == 0:
+                continue
+            allowed = (self.cost_upper[s] if delta > 0 else self.cost_lower[s]) - self.instance.costs[s]
+            if allowed == 0:
+                return None
+            used += delta / allowed
+            objective += delta * self.x[s]
+        return objective if used <= 1 + 1e-9 else None
@@ -0,0 +1,317 @@
+import argparse
+import asyncio
+import functools
+import json
+import os
+import pickle
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import util_v2
+from evaluate import evaluate_solutions
+from instance import CoverageInstance
+from shared_instance import attach, detach, publish
+
+# Resident planning service: instances are loaded once, kept with their coverage index
+# (and, inside the worker processes, their gurobi models) and queried over a Unix socket
+# or localhost TCP with one JSON request per line, e.g.
+#   {"id": 1, "op": "load", "name": "a", "spec": {"locations": 5, "timesteps": 50, "satellites": 50, "coverage_prob": 0.5, "seed": 1}}
+#   {"id": 2, "op": "solve", "name": "a", "algorithm": "ilp", "options": {"time_limit": 1}}
+#   {"id": 3, "op": "what_if", "name": "a", "exclude": ["S3"], "costs": {"S5": 2}}
+#   {"id": 4, "op": "evaluate", "name": "a", "selections": {"mine": ["S1", "S2"]}}
+# Every response echoes the id: {"id": 1, "ok": true, "result": ..., "elapsed_ms": ...}
+# An instance is materialized once, in the service process, and published to the workers
+# as a shared_instance segment, so every worker solves the very instance that was loaded
+# (a spec without a seed would give each process its own random instance).
+
+GREEDY_ALGORITHMS = {
+    'degree': util_v2.greedy_degree_based_algorithm,
+    'cost': util_v2.greedy_cost_based_algorithm,
+    'ratio': util_v2.greedy_ratio_based_algorithm,
+}
+
+
+_generator_lock = threading.Lock()
+
+
+def load_instance(spec):
+    """
+    Materializes an instance from a load spec: either {"path": ...} pointing at a pickled
+    (G, tuple_nodes, satellite_nodes) triple, or generator arguments for
+    util_v2.create_satellite_bipartite_graph plus an optional "seed". The graph is
+    converted to a CoverageInstance once, which every algorithm below works on.
+
+    Returns:
+        tuple: (instance, tuple_nodes, feasible_tuple_nodes, satellite_nodes)
+    """
+    if 'path' in spec:
+        with open(spec['path'], 'rb') as f:
+            G, tuple_nodes, satellite_nodes = pickle.load(f)
+    else:
+        kwargs = dict(spec)
+        seed = kwargs.pop('seed', None)
+        # the generator draws from the global random state, loads run on executor threads
+        with _generator_lock:
+            if seed is not None:
+                random.seed(seed)
+                np.random.seed(seed)
+            G, tuple_nodes, satellite_nodes = util_v2.create_satellite_bipartite_graph(**kwargs)
+    return _unpack(CoverageInstance.from_graph(G, tuple_nodes, satellite_nodes))
+
+
+def _unpack(instance):
+    # the (instance, tuple_nodes, feasible_tuple_nodes, satellite_nodes) view of an instance
+    feasible_tuple_nodes = [instance.tuple_labels[t] for t in instance.coverable]
+    satellite_nodes = dict(zip(instance.satellite_labels, np.asarray(instance.costs).tolist()))
+    return instance, list(instance.tuple_labels), feasible_tuple_nodes, satellite_nodes
+
+
+# Worker-side state. Each pool process attaches to a published instance the first time it
+# sees its handle and keeps it, together with its built gurobi model, for later requests.
+_worker_instances = {}
+_worker_models = {}
+
+
+def _worker_instance(name, handle):
+    cached = _worker_instances.get(name)
+    if cached is None or cached[0] != handle:
+        if cached is not None:
+            # the name was reloaded, drop the old mapping
+            _worker_models.pop(name, None)
+            detach(cached[0])
+        _worker_instances[name] = (handle, _unpack(attach(handle)))
+    return _worker_instances[name][1]
+
+
+def _worker_model(name, handle):
+    G, tuple_nodes, feasible_tuple_nodes, satellite_nodes = _worker_instance(name, handle)
+    if name not in _worker_models:
+        from solver import build_weighted_set_cover_model
+        m, x = build_weighted_set_cover_model(G, None, None)
+        m.Params.LogToConsole = 0
+        _worker_models[name] = (m, x)
+    return _worker_models[name]
+
+
+def _solve_hot_ilp(name, handle, exclude=(), costs=None, time_limit=None, mip_gap=None):
+    # what-ifs temporarily change bounds / objective coefficients of the warm model and restore them after
+    from solver import solve_with_trajectory
+    G, tuple_nodes, feasible_tuple_nodes, satellite_nodes = _worker_instance(name, handle)
+    m, x = _worker_model(name, handle)
+    costs = costs or {}
+    for sat in exclude:
+        x[sat].UB = 0
+    for sat, cost in costs.items():
+        x[sat].Obj = cost
+    try:
+        info = solve_with_trajectory(m, time_limit=time_limit, mip_gap=mip_gap, log_to_console=False)
+        satellite_set = None
+        if m.SolCount > 0:
+            satellite_set = set(sat for sat in satellite_nodes if x[sat].X > 0.5)
+    finally:
+        for sat in exclude:
+            x[sat].UB = 1
+        for sat in costs:
+            x[sat].Obj = satellite_nodes[sat]
+    total_cost = None
+    if satellite_set is not None:
+        total_cost = sum(costs.get(sat, satellite_nodes[sat]) for sat in satellite_set)
+    del info['trajectory']
+    return {'satellite_set': satellite_set, 'cost': total_cost, 'info': info}
+
+
+def _worker_solve(name, handle, algorithm, options):
+    # instances already are CoverageInstances, so no tuple list is passed and nothing is rebuilt per call
+    G, tuple_nodes, feasible_tuple_nodes, satellite_nodes = _worker_instance(name, handle)
+    if algorithm in GREEDY_ALGORITHMS:
+        satellite_set, total_cost = GREEDY_ALGORITHMS[algorithm](G)
+        return {'satellite_set': satellite_set, 'cost': total_cost}
+    if algorithm == 'local_search':
+        satellite_set, _ = util_v2.greedy_ratio_based_algorithm(G)
+        satellite_set, total_cost = util_v2.local_search_algorithm(G, None, None, satellite_set)
+        return {'satellite_set': satellite_set, 'cost': total_cost}
+    if algorithm == 'ilp':
+        return _solve_hot_ilp(name, handle, time_limit=options.get('time_limit'), mip_gap=options.get('mip_gap'))
+    if algorithm == 'portfolio':
+        from portfolio import solve_with_deadline
+        satellite_set, total_cost, bound = solve_with_deadline(G, None, None,
+                                                               deadline=options.get('deadline', 0.2))
+        return {'satellite_set': satellite_set, 'cost': total_cost, 'bound': bound}
+    raise ValueError(f"Unknown algorithm: {algorithm}")
+
+
+def _worker_what_if(name, handle, exclude, costs, options):
+    return _solve_hot_ilp(name, handle, exclude=exclude, costs=costs,
+                          time_limit=options.get('time_limit'), mip_gap=options.get('mip_gap'))
+
+
+def _jsonable(value):
+    if isinstance(value, (set, frozenset)):
+        return sorted(_jsonable(v) for v in value)
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class PlanningService:
+    """
+    Keeps loaded instances resident and answers solve / what_if / evaluate requests.
+    The event loop only parses requests and evaluates selections against the coverage
+    index; solver work goes to a process pool whose workers keep instances and models warm.
+    Loaded instances are published as shared memory segments, released on unload, reload
+    under the same name or shutdown.
+    """
+
+    def __init__(self, workers=None):
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.instances = {}
+        self.shared = {}
+        self.stopped = asyncio.Event()
+
+    async def handle(self, request):
+        op = request.get('op')
+        loop = asyncio.get_running_loop()
+        if op == 'load':
+            name, spec = request['name'], request['spec']
+            instance = await loop.run_in_executor(None, load_instance, spec)
+            self.unload(name)
+            self.instances[name] = instance
+            self.shared[name] = publish(instance[0])
+            G, tuple_nodes, feasible_tuple_nodes, satellite_nodes = instance
+            return {'tuples': len(tuple_nodes), 'coverable_tuples': len(feasible_tuple_nodes),
+                    'satellites': len(satellite_nodes)}
+        if op == 'list':
+            return sorted(self.instances)
+        if op == 'unload':
+            if request['name'] not in self.instances:
+                raise KeyError(f"Instance {request['name']} is not loaded")
+            self.unload(request['name'])
+            return True
+        if op == 'shutdown':
+            self.stopped.set()
+            return True
+
+        if op not in ('solve', 'what_if', 'evaluate'):
+            raise ValueError(f"Unknown op: {op}")
+        name = request['name']
+        if name not in self.instances:
+            raise KeyError(f"Instance {name} is not loaded")
+        handle = self.shared[name].handle
+        if op == 'solve':
+            return await loop.run_in_executor(self.pool, _worker_solve, name, handle,
+                                              request.get('algorithm', 'ratio'), request.get('options', {}))
+        if op == 'what_if':
+            return await loop.run_in_executor(self.pool, _worker_what_if, name, handle,
+                                              request.get('exclude', []), request.get('costs', {}),
+                                              request.get('options', {}))
+        if op == 'evaluate':
+            G, tuple_nodes, feasible_tuple_nodes, satellite_nodes = self.instances[name]
+            return await loop.run_in_executor(None, evaluate_solutions, G, None, None,
+                                              request['selections'], request.get('reference'))
+
+    def unload(self, name):
+        # workers keep their mapping until they see a new handle for the name or exit
+        self.instances.pop(name, None)
+        shared = self.shared.pop(name, None)
+        if shared is not None:
+            shared.release()
+
+    async def _respond(self, request, writer, write_lock):
+        start = time.time()
+        try:
+            response = {'ok': True, 'result': _jsonable(await self.handle(request))}
+        except Exception as e:
+            response = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+        response['id'] = request.get('id')
+        response['elapsed_ms'] = 1000 * (time.time() - start)
+        async with write_lock:
+            writer.write((json.dumps(response) + '\n').encode())
+            await writer.drain()
+
+    async def serve_connection(self, reader, writer):
+        # requests on one connection are handled concurrently, responses carry the request id
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while not reader.at_eof():
+                line = await reader.readline()
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError:
+                    request = {'op': None}
+                task = asyncio.create_task(self._respond(request, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except (asyncio.CancelledError, ConnectionResetError):
+            # the service is shutting down or the client went away
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, socket_path=None, host='127.0.0.1', port=None):
+        if socket_path is not None:
+            server = await asyncio.start_unix_server(self.serve_connection, path=socket_path)
+        else:
+            server = await asyncio.start_server(self.serve_connection, host=host, port=port)
+        async with server:
+            await self.stopped.wait()
+        # waiting for running solves must not block the event loop
+        await asyncio.get_running_loop().run_in_executor(None, functools.partial(self.pool.shutdown,
+                                                                                 cancel_futures=True))
+        for name in list(self.shared):
+            self.unload(name)
+        if socket_path is not None and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+class ServiceClient:
+    """
+    Minimal blocking client: ServiceClient(socket_path='/tmp/satellite.sock').request('solve', name='a').
+    """
+
+    def __init__(self, socket_path=None, host='127.0.0.1', port=None):
+        if socket_path is not None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(socket_path)
+        else:
+            self.sock = socket.create_connection((host, port))
+        self.file = self.sock.makefile('rwb')
+        self.next_id = 0
+
+    def request(self, op, **kwargs):
+        self.next_id += 1
+        self.file.write((json.dumps({'id': self.next_id, 'op': op, **kwargs}) + '\n').encode())
+        self.file.flush()
+        response = json.loads(self.file.readline())
+        if not response['ok']:
+            raise RuntimeError(response['error'])
+        return response['result']
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='Satellite Planning Service',
+        description='Keep satellite plan instances and solver models warm and answer queries over a socket'
+    )
+    parser.add_argument('--socket', type=str, help='Unix socket path to listen on', default=None)
+    parser.add_argument('--port', type=int, help='Localhost TCP port to listen on (if no socket is given)', default=8765)
+    parser.add_argument('--workers', type=int, help='Number of solver worker processes', default=None)
+    args = parser.parse_args()
+
+    service = PlanningService(workers=args.workers)
+    asyncio.run(service.serve(socket_path=args.socket, port=args.port))
@@ -0,0 +1,174 @@
+import pickle
+import sys
+from collections import namedtuple
+import numpy as np
+from instance import CoverageInstance
+
+# Zero-copy sharing of a CoverageInstance between processes. publish() copies the CSR
+# arrays, costs and (pickled) labels and demands once into a multiprocessing.shared_memory
+# segment; the small handle is all that goes to the workers, which attach() to it and get
+# a CoverageInstance whose arrays are NumPy views of the shared pages. An attached
+# instance also pickles as its handle, so passing it to a pool task does not copy it.
+#
+# Cleanup is reference counted on both sides. The publisher unlinks the segment when its
+# last reference is released (acquire / release or the with block); mappings that are
+# already attached stay valid until they are detached. Every process closes its mapping
+# when its attach count drops to zero; instances attached by unpickling stay attached
+# until detach() or the end of the process, the usual lifetime of a pool worker.
+
+SharedInstanceHandle = namedtuple('SharedInstanceHandle',
+                                  ['name', 'num_plans', 'num_edges', 'cost_type', 'labels_size'])
+
+_COST_DTYPES = {'q': np.int64, 'd': np.float64}
+
+# shared memory name -> [instance, shared memory, attach count] in this process
+_attached = {}
+
+
+def _layout(handle):
+    # byte offsets of indptr (int64), indices (int32), costs (8 bytes each) and the labels
+    indices_offset = 8 * (handle.num_plans + 1)
+    costs_offset = indices_offset + 4 * handle.num_edges
+    costs_offset += -costs_offset % 8
+    labels_offset = costs_offset + 8 * handle.num_plans
+    return indices_offset, costs_offset, labels_offset, labels_offset + handle.labels_size
+
+
+def _open(name, create=False, size=0):
+    from multiprocessing import shared_memory
+    if create:
+        return shared_memory.SharedMemory(create=True, size=size)
+    if sys.version_info >= (3, 13):
+        # the publisher owns the segment, an attaching process must not unlink it at exit
+        return shared_memory.SharedMemory(name=name, track=False)
+    # before 3.13 attaching registers the segment with this process's resource tracker,
+    # which would unlink it when the process exits
+    from multiprocessing import resource_tracker
+    shm = shared_memory.SharedMemory(name=name)
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+class SharedInstance:
+    """
+    Publisher side of a shared instance: owns the segment and unlinks it once the
+    reference count (1 after publish) drops to zero.
+    """
+
+    def __init__(self, shm, handle):
+        self.shm = shm
+        self.handle = handle
+        self.references = 1
+
+    def acquire(self):
+        assert self.references > 0, "The shared instance was already released"
+        self.references += 1
+        return self
+
+    def release(self):
+        self.references -= 1
+        if self.references == 0:
+            self.shm.close()
+            if sys.version_info < (3, 13):
+                # pool workers share our resource tracker, so attaching there may have dropped
+                # the registration that unlink() removes
+                from multiprocessing import resource_tracker
+                resource_tracker.register(self.shm._name, 'shared_memory')
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+def publish(instance):
+    """
+    Copies a CoverageInstance into a new shared memory segment.
+
+    Returns:
+        SharedInstance: owner of the segment, with the handle to pass to workers in .handle
+    """
+    labels = pickle.dumps((instance.satellite_labels, instance.tuple_labels, instance.demands),
+                          protocol=pickle.HIGHEST_PROTOCOL)
+    # integer costs stay integers, like in CoverageInstance itself
+    cost_type = 'q' if np.asarray(instance.costs).dtype.kind in 'iu' else 'd'
+    handle = SharedInstanceHandle(None, instance.num_plans, len(instance.plan_indices), cost_type, len(labels))
+    indices_offset, costs_offset, labels_offset, size = _layout(handle)
+    shm = _open(None, create=True, size=size)
+    handle = handle._replace(name=shm.name)
+    buf = shm.buf
+    np.ndarray(handle.num_plans + 1, dtype=np.int64, buffer=buf)[:] = instance.plan_indptr
+    np.ndarray(handle.num_edges, dtype=np.int32, buffer=buf, offset=indices_offset)[:] = instance.plan_indices
+    np.ndarray(handle.num_plans, dtype=_COST_DTYPES[cost_type], buffer=buf, offset=costs_offset)[:] = instance.costs
+    buf[labels_offset:size] = labels
+    del buf
+    return SharedInstance(shm, handle)
+
+
+class AttachedInstance(CoverageInstance):
+    """
+    CoverageInstance over the arrays of a shared segment (NumPy views, no copy). Works
+    everywhere a CoverageInstance does; pickles as its handle.
+    """
+
+    __slots__ = ('handle',)
+
+    def __reduce__(self):
+        return _attach_unpickled, (self.handle,)
+
+
+def attach(handle):
+    """
+    Attaches to a published instance in this process (again returning the same instance
+    if it is attached already) and counts the reference.
+
+    Returns:
+        AttachedInstance
+    """
+    entry = _attached.get(handle.name)
+    if entry is None:
+        shm = _open(handle.name)
+        indices_offset, costs_offset, labels_offset, size = _layout(handle)
+        instance = AttachedInstance.__new__(AttachedInstance)
+        instance.handle = handle
+        instance.plan_indptr = np.ndarray(handle.num_plans + 1, dtype=np.int64, buffer=shm.buf)
+        instance.plan_indices = np.ndarray(handle.num_edges, dtype=np.int32, buffer=shm.buf, offset=indices_offset)
+        instance.costs = np.ndarray(handle.num_plans, dtype=_COST_DTYPES[handle.cost_type], buffer=shm.buf,
+                                    offset=costs_offset)
+        instance.satellite_labels, instance.tuple_labels, instance.demands = pickle.loads(shm.buf[labels_offset:size])
+        instance._cache = {}
+        entry = _attached[handle.name] = [instance, shm, 0]
+    entry[2] += 1
+    return entry[0]
+
+
+def _attach_unpickled(handle):
+    entry = _attached.get(handle.name)
+    if entry is not None:
+        return entry[0]
+    return attach(handle)
+
+
+def detach(handle):
+    """
+    Drops one reference taken by attach(); the last one closes this process's mapping.
+    Views into the instance's arrays must not be used after that.
+    """
+    entry = _attached.get(handle.name)
+    if entry is None:
+        return
+    entry[2] -= 1
+    if entry[2] > 0:
+        return
+    instance, shm, _ = _attached.pop(handle.name)
+    # the cache holds views too (e.g. the scipy incidence matrix)
+    instance._cache.clear()
+    del instance.plan_indptr, instance.plan_indices, instance.costs
+    del instance
+    try:
+        shm.close()
+    except BufferError:
+        # someone still holds a view, the mapping goes away with the process
+        pass
@@ -1,39 +1,73 @@
-from gurobipy import *
-from scipy.stats import bernoulli
+# gurobipy (and scipy for the LP rounding) are imported inside the functions, so the
+# module can be imported without a Gurobi install until a solver is actually called.
+# Every solver takes either the (G, tuple_nodes, satellite_nodes) graph triple or a
+# CoverageInstance in place of G (see instance.as_instance).
 
-def weighted_set_cover_lp_relaxation(G, tuple_nodes, satellite_nodes, k):
+from instance import as_instance
+
+def build_weighted_set_cover_model(G, tuple_nodes, satellite_nodes, vtype='B', name="weighted_set_cover_ilp", env=None):
     """
-    Solve the LP relaxation of the set cover problem, with k sampling iterations
-    
+    Builds the weighted set cover model: one variable per satellite and one covering
+    constraint per tuple that some satellite can cover. vtype is a gurobi variable type
+    ('B' = GRB.BINARY, 'C' = GRB.CONTINUOUS). Pass env to build it in a separate gurobi
+    environment (needed when solving from several threads). G can also be a
+    CoverageInstance, then the constraints come from its tuple -> plans adjacency.
+
     Returns:
-        tuple: (satellite_set, total_cost)
+        tuple: (model, x) where x maps each satellite to its variable
     """
-    m = Model("weighted_set_cover_ilp")
-    
-    # Create a mapping of each location-time tuple to all satellites that can cover it
-    coverage_map = {}
-    for sat in satellite_nodes:
-        coverage_map[sat] = set(G.neighbors(sat))
+    instance, tuple_ids = as_instance(G, tuple_nodes, satellite_nodes)
+    return _build_model(instance, tuple_ids, vtype=vtype, name=name, env=env)
+
+def _build_model(instance, tuple_ids, vtype='B', name="weighted_set_cover_ilp", env=None, plan_ids=None, demands=None):
+    # plan_ids restricts the variables to those plans (by default all of them), plans left
+    # out do not count in the constraints; demands (per tuple id, default the instance's
+    # demands or 1) is the right-hand side of every covering row, rows with demand 0 are left out
+    from gurobipy import Model, GRB, quicksum
+    m = Model(name, env=env)
+    if plan_ids is None:
+        plan_ids = range(instance.num_plans)
+    
+    # Create a variable for each satellite
+    variables = {s: m.addVar(vtype=vtype, lb=0, ub=1, name=f"x_{instance.satellite_labels[s]}") for s in plan_ids}
+    x = {instance.satellite_labels[s]: var for s, var in variables.items()}
     
-    # Initialize the set of all location-time tuples
-    U = set(tuple_nodes)
+    # Set objective function
+    m.setObjective(quicksum(instance.costs[s] * var for s, var in variables.items()), GRB.MINIMIZE)
     
-    # Initialize an empty set to store the selected satellites
-    satellite_set = set()
+    # Add constraints
+    if demands is None:
+        demands = instance.demands
+    for t in _model_rows(instance, tuple_ids, demands):
+        demand = 1 if demands is None else demands[t]
+        m.addConstr(quicksum(variables[s] for s in instance.tuple_plans(t) if s in variables) >= demand)
     
-    # Create a binary variable for each satellite
-    x = {}
-    for sat in satellite_nodes:
-        x[sat] = m.addVar(vtype=GRB.CONTINUOUS, ub=1, name=f"x_{sat}")
+    return m, x
+
+def _model_rows(instance, tuple_ids, demands=None):
+    # tuple ids that get a covering row in _build_model, in constraint order: the tuples some
+    # plan covers with a positive demand (demands default to the instance's)
+    if demands is None:
+        demands = instance.demands
+    return [t for t in tuple_ids if instance.tuple_degrees[t] > 0 and (demands is None or demands[t] > 0)]
+
+def weighted_set_cover_lp_relaxation(G, tuple_nodes, satellite_nodes, k, return_info=False):
+    """
+    Solve the LP relaxation of the set cover problem, with k sampling iterations.
+    With return_info=True a third value is returned: the LPSensitivity of the solved LP
+    (dual prices per tuple, reduced costs and cost ranges per satellite, see sensitivity.py).
     
-    # Set objective function
-    m.setObjective(quicksum(satellite_nodes[sat] * x[sat] for sat in satellite_nodes), GRB.MINIMIZE)
+    Returns:
+        tuple: (satellite_set, total_cost) or (satellite_set, total_cost, sensitivity)
+    """
+    from gurobipy import GRB
+    from scipy.stats import bernoulli
+    instance, tuple_ids = as_instance(G, tuple_nodes, satellite_nodes)
+    satellite_nodes = instance.cost_map
+    m, x = _build_model(instance, tuple_ids, vtype=GRB.CONTINUOUS)
     
-    # Add constraints
-    for tuple_node in tuple_nodes:
-        if G.degree(tuple_node) == 0:
-            continue
-        m.addConstr(quicksum(x[sat] for sat in coverage_map if tuple_node in coverage_map[sat]) >= 1)
+    # Initialize an empty set to store the selected satellites
+    satellite_set = set()
     
     m.optimize()
     
@@ -45,73 +79,120 @@ def weighted_set_cover_lp_relaxation(G, tuple_nodes, satellite_nodes, k):
     
     total_cost = sum(satellite_nodes[sat] for sat in satellite_set)
     
+    if return_info:
+        from sensitivity import LPSensitivity
+        return satellite_set, total_cost, LPSensitivity.from_model(instance, tuple_ids, m, x)
     return satellite_set, total_cost
 
 
-def weighted_set_cover_ilp(G, tuple_nodes, satellite_nodes):
+def _status_name(status):
+    from gurobipy import GRB
+    for name in dir(GRB.Status):
+        if name.isupper() and getattr(GRB.Status, name) == status:
+            return name
+    return str(status)
+
+def _attr_or_none(m, attr):
+    # attributes like ObjBound are not available for every status (e.g. infeasible models)
+    from gurobipy import GurobiError
+    try:
+        return getattr(m, attr)
+    except (GurobiError, AttributeError):
+        return None
+
+def solve_with_trajectory(m, time_limit=None, mip_gap=None, log_to_console=True):
     """
-    Solve the LP relaxation of the set cover problem, with k sampling iterations
-    
+    Optimizes a MIP model while recording a (time, incumbent cost, best bound, node count)
+    point every time the incumbent or the best bound changes.
+
     Returns:
-        tuple: (satellite_set, total_cost)
+        dict: 'status' (gurobi status name, e.g. 'OPTIMAL' or 'TIME_LIMIT'), 'runtime',
+              'obj_val' (None without a solution), 'obj_bound', 'mip_gap', 'node_count'
+              and 'trajectory'
     """
-    m = Model("weighted_set_cover_ilp")
-    
-    # Create a mapping of each location-time tuple to all satellites that can cover it
-    coverage_map = {}
-    for sat in satellite_nodes:
-        coverage_map[sat] = set(G.neighbors(sat))
-    
-    # Initialize the set of all location-time tuples
-    U = set(tuple_nodes)
-    
-    # Initialize an empty set to store the selected satellites
-    satellite_set = set()
-    
-    # Create a binary variable for each satellite
-    x = {}
-    for sat in satellite_nodes:
-        x[sat] = m.addVar(vtype=GRB.BINARY, name=f"x_{sat}")
-    
-    # Set objective function
-    m.setObjective(quicksum(satellite_nodes[sat] * x[sat] for sat in satellite_nodes), GRB.MINIMIZE)
-    
-    # Add constraints
-    for tuple_node in tuple_nodes:
-        if G.degree(tuple_node) == 0:
-            continue
-        m.addConstr(quicksum(x[sat] for sat in coverage_map if tuple_node in coverage_map[sat]) >= 1)
+    from gurobipy import GRB
+    if time_limit is not None:
+        m.Params.TimeLimit = time_limit
+    if mip_gap is not None:
+        m.Params.MIPGap = mip_gap
+    m.Params.LogToConsole = int(log_to_console)
+
+    trajectory = []
+
+    def record(runtime, incumbent, bound, node_count):
+        incumbent = None if incumbent >= GRB.INFINITY else incumbent
+        bound = None if bound <= -GRB.INFINITY else bound
+        if trajectory and trajectory[-1][1] == incumbent and trajectory[-1][2] == bound:
+            return
+        trajectory.append((runtime, incumbent, bound, node_count))
+
+    def callback(model, where):
+        if where == GRB.Callback.MIP:
+            record(model.cbGet(GRB.Callback.RUNTIME), model.cbGet(GRB.Callback.MIP_OBJBST),
+                   model.cbGet(GRB.Callback.MIP_OBJBND), model.cbGet(GRB.Callback.MIP_NODCNT))
+        elif where == GRB.Callback.MIPSOL:
+            # the new solution is not in MIPSOL_OBJBST yet if it did not improve, so take the min
+            incumbent = min(model.cbGet(GRB.Callback.MIPSOL_OBJ), model.cbGet(GRB.Callback.MIPSOL_OBJBST))
+            record(model.cbGet(GRB.Callback.RUNTIME), incumbent,
+                   model.cbGet(GRB.Callback.MIPSOL_OBJBND), model.cbGet(GRB.Callback.MIPSOL_NODCNT))
+
+    m.optimize(callback)
+
+    has_solution = m.SolCount > 0
+    info = {
+        'status': _status_name(m.Status),
+        'runtime': m.Runtime,
+        'obj_val': m.ObjVal if has_solution else None,
+        'obj_bound': _attr_or_none(m, 'ObjBound'),
+        'mip_gap': m.MIPGap if has_solution else None,
+        'node_count': m.NodeCount,
+        'trajectory': trajectory,
+    }
+    if has_solution:
+        record(m.Runtime, m.ObjVal, info['obj_bound'], m.NodeCount)
+    return info
+
+def weighted_set_cover_ilp(G, tuple_nodes, satellite_nodes, time_limit=None, mip_gap=None, log_to_console=True, return_info=False):
+    """
+    Solve the set cover problem exactly as an ILP, optionally within a time limit (seconds)
+    and relative MIP gap. An instance with demands is solved as a multicover (infeasible
+    if a demand exceeds the tuple's number of plans, multicover.multicover_ilp caps those).
+    With return_info=True a third value is returned with the solver
+    status and the incumbent/bound trajectory (see solve_with_trajectory).
+    If the solver stops without any solution, satellite_set and total_cost are None.
     
-    m.optimize()
+    Returns:
+        tuple: (satellite_set, total_cost) or (satellite_set, total_cost, info)
+    """
+    from gurobipy import GRB
+    instance, tuple_ids = as_instance(G, tuple_nodes, satellite_nodes)
+    satellite_nodes = instance.cost_map
+    m, x = _build_model(instance, tuple_ids, vtype=GRB.BINARY)
     
-    for sat in satellite_nodes:
-        if x[sat].x == 1:
-            satellite_set.add(sat)
+    info = solve_with_trajectory(m, time_limit=time_limit, mip_gap=mip_gap, log_to_console=log_to_console)
     
-    total_cost = sum(satellite_nodes[sat] for sat in satellite_set)
+    satellite_set, total_cost = None, None
+    if m.SolCount > 0:
+        satellite_set = set(sat for sat in satellite_nodes if x[sat].x > 0.5)
+        total_cost = sum(satellite_nodes[sat] for sat in satellite_set)
     
+    if return_info:
+        return satellite_set, total_cost, info
     return satellite_set, total_cost
 
-def weighted_set_cover_ilp_tradeoff(G, tuple_nodes, satellite_nodes, l):
+def weighted_set_cover_ilp_tradeoff(G, tuple_nodes, satellite_nodes, l, time_limit=None, mip_gap=None, log_to_console=True, return_info=False):
     """
-    Solve the LP relaxation of the set cover problem, with k sampling iterations
+    Solve the coverage/cost tradeoff ILP: satellite cost plus l for every coverable tuple
+    left uncovered. Time limit, gap and return_info work as in weighted_set_cover_ilp.
     
     Returns:
-        tuple: (satellite_set, total_cost)
+        tuple: (satellite_set, total_cost) or (satellite_set, total_cost, info)
     """
+    from gurobipy import Model, GRB, quicksum
+    instance, tuple_ids = as_instance(G, tuple_nodes, satellite_nodes)
+    satellite_nodes = instance.cost_map
     m = Model("weighted_set_cover_ilp")
     
-    # Create a mapping of each location-time tuple to all satellites that can cover it
-    coverage_map = {}
-    for sat in satellite_nodes:
-        coverage_map[sat] = set(G.neighbors(sat))
-    
-    # Initialize the set of all location-time tuples
-    U = set(tuple_nodes)
-    
-    # Initialize an empty set to store the selected satellites
-    satellite_set = set()
-    
     # Create a binary variable for each satellite
     x = {}
     for sat in satellite_nodes:
@@ -120,11 +201,12 @@ def weighted_set_cover_ilp_tradeoff(G, tuple_nodes, satellite_nodes, l):
     y = {}
     q = {}
     M = len(satellite_nodes)
-    for tuple_node in tuple_nodes:
-        if G.degree(tuple_node) == 0:
+    for t in tuple_ids:
+        if instance.tuple_degrees[t] == 0:
             continue
+        tuple_node = instance.tuple_labels[t]
         y[tuple_node] = m.addVar(vtype=GRB.INTEGER, name=f"y_{tuple_node}")
-        m.addConstr(y[tuple_node] == quicksum(x[sat] for sat in coverage_map if tuple_node in coverage_map[sat]))
+        m.addConstr(y[tuple_node] == quicksum(x[instance.satellite_labels[s]] for s in instance.tuple_plans(t)))
         q[tuple_node] = m.addVar(vtype=GRB.BINARY, name=f"q_{tuple_node}")
         # m.addConstr(y[tuple_node] >= q[tuple_node])
         # m.addConstr(y[tuple_node] <= M * q[tuple_node])
@@ -134,14 +216,99 @@ def weighted_set_cover_ilp_tradeoff(G, tuple_nodes, satellite_nodes, l):
     # Set objective function
     m.setObjective(quicksum(satellite_nodes[sat] * x[sat] for sat in satellite_nodes) + l * quicksum(q[tuple_node] for tuple_node in q), GRB.MINIMIZE)
 
-    m.optimize()
+    info = solve_with_trajectory(m, time_limit=time_limit, mip_gap=mip_gap, log_to_console=log_to_console)
     
-    for sat in satellite_nodes:
-        if x[sat].x == 1:
-            satellite_set.add(sat)
+    satellite_set, total_cost = None, None
+    if m.SolCount > 0:
+        satellite_set = set(sat for sat in satellite_nodes if x[sat].x > 0.5)
+        total_cost = sum(satellite_nodes[sat] for sat in satellite_set)
     
-    total_cost = sum(satellite_nodes[sat] for sat in satellite_set)
+    if return_info:
+        return satellite_set, total_cost, info
+    return satellite_set, total_cost
 
-    assert total_cost >= 0
-    
-    return satellite_set, total_cost
\ No newline at end of file
+
+def weighted_set_cover_alternatives(G, tuple_nodes, satellite_nodes, k, min_distance=1, exclude=(), time_limit=None, log_to_console=False, return_info=False):
+    """
+    Finds the k cheapest satellite sets (the optimum and its runners-up) on one warm model.
+    Satellites in exclude are fixed to 0, e.g. every plan of a provider class to avoid.
+    With min_distance=1 the alternatives are just distinct and come from a single solve
+    with gurobi's solution pool. With min_distance > 1 every pair of returned sets differs
+    in at least min_distance satellites (Hamming distance): after each solve a no-good cut
+    sum_{s in S} (1 - x_s) + sum_{s not in S} x_s >= min_distance is added and the same
+    model is re-solved; the best earlier pool solution that still satisfies every cut is
+    passed in as a MIP start, so each re-solve starts from a good incumbent.
+    time_limit applies to each solve. Fewer than k sets are returned if no more exist.
+    A solve cut short by the time limit is not proven to give the k best sets: with
+    return_info=True a second value holds the solver 'status' of the solve behind every
+    alternative and whether it was 'optimal' (lists in the order of the alternatives).
+
+    Returns:
+        list: List of (satellite_set, total_cost) tuples, sorted by total cost, or
+        (alternatives, info) with return_info=True
+    """
+    from gurobipy import GRB
+    instance, tuple_ids = as_instance(G, tuple_nodes, satellite_nodes)
+    satellite_nodes = instance.cost_map
+    m, x = _build_model(instance, tuple_ids, vtype=GRB.BINARY)
+    m.Params.LogToConsole = int(log_to_console)
+    if time_limit is not None:
+        m.Params.TimeLimit = time_limit
+    for sat in exclude:
+        x[sat].UB = 0
+
+    alternatives = []
+    if min_distance <= 1:
+        # PoolSearchMode 2 systematically searches for the k best solutions
+        m.Params.PoolSearchMode = 2
+        m.Params.PoolSolutions = k
+        m.optimize()
+        for i in range(m.SolCount):
+            m.Params.SolutionNumber = i
+            satellite_set = set(sat for sat in satellite_nodes if x[sat].Xn > 0.5)
+            alternatives.append((satellite_set, sum(satellite_nodes[sat] for sat in satellite_set)))
+        alternatives.sort(key=lambda alternative: alternative[1])
+        statuses = [m.Status] * len(alternatives)
+    else:
+        statuses = _distant_alternatives(m, x, satellite_nodes, k, min_distance, alternatives)
+    if return_info:
+        info = {'status': [_status_name(status) for status in statuses],
+                'optimal': [status == GRB.OPTIMAL for status in statuses]}
+        return alternatives, info
+    return alternatives
+
+
+def _distant_alternatives(m, x, satellite_nodes, k, min_distance, alternatives):
+    # no-good cut loop of weighted_set_cover_alternatives, appends to alternatives and
+    # returns the solver status of every solve that produced one
+    from gurobipy import GRB, quicksum
+    statuses = []
+
+    # solutions found along the way seed the next solve (as a MIP start) if they satisfy every cut so far
+    m.Params.PoolSolutions = k
+    candidates = []
+    for _ in range(k):
+        for satellite_set, _ in candidates:
+            if all(len(satellite_set ^ chosen) >= min_distance for chosen, _ in alternatives):
+                for sat in satellite_nodes:
+                    x[sat].Start = 1 if sat in satellite_set else 0
+                break
+        else:
+            # no candidate satisfies the cuts, drop the start of the previous solve
+            for sat in satellite_nodes:
+                x[sat].Start = GRB.UNDEFINED
+        m.optimize()
+        if m.SolCount == 0:
+            break
+        statuses.append(m.Status)
+        for i in range(m.SolCount):
+            m.Params.SolutionNumber = i
+            satellite_set = set(sat for sat in satellite_nodes if x[sat].Xn > 0.5)
+            candidates.append((satellite_set, sum(satellite_nodes[sat] for sat in satellite_set)))
+        candidates.sort(key=lambda candidate: candidate[1])
+        satellite_set = set(sat for sat in satellite_nodes if x[sat].X > 0.5)
+        alternatives.append((satellite_set, sum(satellite_nodes[sat] for sat in satellite_set)))
+        # the next set has to differ from this one in at least min_distance satellites
+        m.addConstr(quicksum(1 - x[sat] for sat in satellite_set)
+                    + quicksum(x[sat] for sat in satellite_nodes if sat not in satellite_set) >= min_distance)
+    return statuses
@@ -0,0 +1,131 @@
+import json
+import os
+import pickle
+import re
+import shutil
+import tempfile
+import time
+
+# Checkpointing for long experiment sweeps: every finished (sweep point, algorithm)
+# result is written to its own file as soon as it completes, and the generated instance
+# of every point is kept too, so a restarted sweep skips finished work and runs the
+# remaining algorithms on the same instance.
+
+
+def atomic_write(path, data):
+    """
+    Writes bytes to path so that readers see either the old file or the complete new
+    one, never a partial write: temp file in the same directory, fsync, then rename.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    # make the rename itself durable
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def _file_key(key):
+    return re.sub(r'[^A-Za-z0-9_.=-]+', '_', str(key))
+
+
+def _jsonable(value):
+    if isinstance(value, (set, frozenset)):
+        return sorted(_jsonable(v) for v in value)
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if hasattr(value, 'item'):
+        # numpy scalars
+        return value.item()
+    return value
+
+
+class SweepCheckpoint:
+    """
+    Directory of completed sweep results: <point>/<algorithm>.json per result and
+    <point>/instance.pkl per generated instance. Pass fresh=True to delete whatever an
+    earlier run left behind, so that a restart after a crashed fresh run never mixes in
+    results computed on an earlier run's instances.
+    """
+
+    def __init__(self, directory, fresh=False):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        if fresh:
+            for entry in os.listdir(directory):
+                path = os.path.join(directory, entry)
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+
+    def _point_dir(self, point):
+        path = os.path.join(self.directory, _file_key(point))
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def instance(self, point, make):
+        """
+        Returns the instance stored for point, or calls make() and stores its result.
+
+        Returns:
+            object: whatever make() returns, e.g. (G, tuple_nodes, satellite_nodes)
+        """
+        path = os.path.join(self._point_dir(point), 'instance.pkl')
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        instance = make()
+        atomic_write(path, pickle.dumps(instance))
+        return instance
+
+    def completed(self, point, algorithm):
+        return os.path.exists(self._result_path(point, algorithm))
+
+    def _result_path(self, point, algorithm):
+        return os.path.join(self._point_dir(point), f"{_file_key(algorithm)}.json")
+
+    def run(self, point, algorithm, fn):
+        """
+        Runs fn() unless the result for (point, algorithm) is already stored. fn returns a
+        dict; sets and numpy scalars are stored as JSON lists / numbers.
+
+        Returns:
+            dict: the stored or freshly computed result
+        """
+        path = self._result_path(point, algorithm)
+        if self.completed(point, algorithm):
+            with open(path) as f:
+                return json.load(f)
+        result = _jsonable(fn())
+        atomic_write(path, json.dumps(result, indent=1).encode())
+        return result
+
+    def run_timed(self, point, algorithm, solve):
+        """
+        Checkpointed version of the 'time one solver call' pattern of the experiment
+        scripts: solve() returns (satellite_set, total_cost, ...).
+
+        Returns:
+            tuple: (satellite_set, total_cost, seconds)
+        """
+        def timed():
+            start = time.time()
+            satellite_set, total_cost = solve()[:2]
+            return {'satellite_set': satellite_set, 'cost': total_cost, 'time': time.time() - start}
+
+        result = self.run(point, algorithm, timed)
+        satellite_set = None if result['satellite_set'] is None else set(result['satellite_set'])
+        return satellite_set, result['cost'], result['time']
@@ -0,0 +1,279 @@
+import argparse
+import heapq
+import time
+import numpy as np
+from instance import as_instance
+from kernels import csr_arrays, _required_mask
+
+# Heuristics for the coverage/cost tradeoff objective of weighted_set_cover_ilp_tradeoff:
+# satellite cost plus l for every coverable tuple left uncovered. A plan is worth taking
+# exactly when its cost is below l times the tuples it newly covers, so the penalty
+# greedy is the usual cost per newly covered tuple greedy stopped at the first ratio of
+# at least l. Greedy ratios never go down, which makes the selection for a larger l an
+# extension of the one for a smaller l: a sweep over increasing l resumes the same heap
+# instead of starting over, and warm-starts the local search from the previous result.
+
+
+def _required_csr(instance, tuple_ids):
+    # plan -> required tuples only
+    indptr, indices = csr_arrays(instance)
+    required = _required_mask(instance, tuple_ids)
+    keep = required[indices]
+    plan_of_edge = np.repeat(np.arange(instance.num_plans, dtype=np.int64), np.diff(indptr))[keep]
+    indices = indices[keep].astype(np.int64)
+    plan_indptr = np.zeros(instance.num_plans + 1, dtype=np.int64)
+    plan_indptr[1:] = np.cumsum(np.bincount(plan_of_edge, minlength=instance.num_plans))
+    return plan_indptr, indices
+
+
+class _PenaltyGreedy:
+    """
+    Lazy-heap greedy whose threshold l can only be raised: advance(l) keeps adding the
+    plan with the lowest cost per newly covered tuple while that ratio is below l.
+    """
+
+    def __init__(self, plan_indptr, plan_indices, costs, num_tuples):
+        self.plan_indptr = plan_indptr
+        self.plan_indices = plan_indices
+        self.costs = costs
+        self.uncovered = np.zeros(num_tuples, dtype=bool)
+        self.uncovered[plan_indices] = True
+        lengths = np.diff(plan_indptr)
+        self.heap = [(costs[s] / lengths[s], s) for s in np.flatnonzero(lengths).tolist()]
+        heapq.heapify(self.heap)
+        self.l = 0
+
+    def advance(self, l):
+        assert l >= self.l, "The penalty can only be raised"
+        self.l = l
+        added = []
+        heap = self.heap
+        # heap entries are lower bounds of the current ratios, so none below l means done
+        while heap and heap[0][0] < l:
+            ratio, s = heapq.heappop(heap)
+            tuples = self.plan_indices[self.plan_indptr[s]:self.plan_indptr[s + 1]]
+            new = tuples[self.uncovered[tuples]]
+            if len(new) == 0:
+                continue
+            ratio = self.costs[s] / len(new)
+            if (heap and ratio > heap[0][0]) or ratio >= l:
+                heapq.heappush(heap, (ratio, s))
+                continue
+            self.uncovered[new] = False
+            added.append(s)
+        return added
+
+
+class _PenaltyLocalSearch:
+    """
+    Drop and swap moves for cost + l * uncovered over a selection that is kept between
+    calls (with the per-tuple cover counts and the number of tuples only each selected
+    plan covers), so it can be re-run for the next l.
+    """
+
+    def __init__(self, plan_indptr, plan_indices, costs, num_tuples):
+        self.plan_indptr = plan_indptr
+        self.plan_indices = plan_indices
+        self.costs = costs
+        self.counts = np.zeros(num_tuples, dtype=np.int64)
+        self.chosen = np.zeros(len(costs), dtype=bool)
+        self.unique = np.zeros(len(costs), dtype=np.int64)
+        # sum of the ids of the selected plans covering every tuple: the one covering plan
+        # of a tuple covered exactly once, without scanning its plans
+        self.plan_sum = np.zeros(num_tuples, dtype=np.int64)
+
+    def _tuples(self, s):
+        return self.plan_indices[self.plan_indptr[s]:self.plan_indptr[s + 1]]
+
+    def _owners(self, tuples):
+        # the selected plan covering each of these tuples (all covered exactly once)
+        return self.plan_sum[tuples]
+
+    def add(self, s):
+        tuples = self._tuples(s)
+        counts = self.counts[tuples]
+        np.subtract.at(self.unique, self._owners(tuples[counts == 1]), 1)
+        self.unique[s] = np.count_nonzero(counts == 0)
+        self.counts[tuples] += 1
+        self.plan_sum[tuples] += s
+        self.chosen[s] = True
+
+    def remove(self, s):
+        tuples = self._tuples(s)
+        self.chosen[s] = False
+        self.unique[s] = 0
+        self.counts[tuples] -= 1
+        self.plan_sum[tuples] -= s
+        np.add.at(self.unique, self._owners(tuples[self.counts[tuples] == 1]), 1)
+
+    def _drop_worthless(self, candidates, l):
+        # drop plans costing more than the penalty of the tuples only they cover, priciest first
+        dropped = []
+        for s in sorted(candidates, key=lambda s: self.costs[s], reverse=True):
+            unique = self.unique[s]
+            if self.costs[s] > l * unique:
+                self.remove(s)
+                dropped.append((s, unique))
+        return dropped
+
+    def run(self, l, start=(), should_stop=None):
+        for s in start:
+            if not self.chosen[s]:
+                self.add(s)
+        self._drop_worthless(np.flatnonzero(self.chosen).tolist(), l)
+
+        lengths = np.diff(self.plan_indptr)
+        edge_plans = np.repeat(np.arange(len(lengths)), lengths)
+        outside_order = np.argsort(self.costs / np.maximum(lengths, 1), kind='stable')
+        improved = True
+        while improved:
+            improved = False
+            # the bound below for every plan at once, as of the start of the pass; a plan it
+            # skips after some move was made gets another look in the next pass
+            counts = self.counts[self.plan_indices]
+            reach = np.bincount(edge_plans, weights=counts <= 1, minlength=len(lengths))
+            promising = outside_order[self.costs[outside_order] < l * reach[outside_order]]
+            for s in promising.tolist():
+                if should_stop is not None and should_stop():
+                    return
+                if self.chosen[s]:
+                    continue
+                tuples = self._tuples(s)
+                counts = self.counts[tuples]
+                gain = l * np.count_nonzero(counts == 0)
+                # only plans that are the single cover of some tuple of s get cheaper to drop, by
+                # at most l per such tuple (selected plans are never worthless between moves);
+                # skip the move unless dropping all that could become worthless would pay off
+                shared = tuples[counts == 1]
+                if self.costs[s] - gain - l * len(shared) >= 0:
+                    continue
+                candidates, lost = np.unique(self._owners(shared), return_counts=True)
+                savings = self.costs[candidates] - l * (self.unique[candidates] - lost)
+                candidates, savings = candidates[savings > 0], savings[savings > 0]
+                if self.costs[s] - gain - savings.sum() >= 0:
+                    continue
+                self.add(s)
+                dropped = self._drop_worthless(candidates.tolist(), l)
+                delta = self.costs[s] - gain + sum(l * unique - self.costs[other] for other, unique in dropped)
+                if delta < 0:
+                    improved = True
+                    continue
+                # not an improvement, undo the swap
+                for other, unique in dropped:
+                    self.add(other)
+                self.remove(s)
+
+
+def tradeoff_objective(G, feasible_tuple_nodes, satellites, satellite_set, l):
+    """
+    Scores a satellite set on the tradeoff objective (coverable tuples only, like the ILP).
+
+    Returns:
+        tuple: (total_cost, uncovered, objective)
+    """
+    instance, tuple_ids = as_instance(G, feasible_tuple_nodes, satellites)
+    plans = instance.plan_ids(satellite_set)
+    covered = set(t for s in plans for t in instance.plan_tuples(s))
+    uncovered = sum(1 for t in tuple_ids if instance.tuple_degrees[t] > 0 and t not in covered)
+    total_cost = instance.total_cost(plans)
+    return total_cost, uncovered, total_cost + l * uncovered
+
+
+def penalty_greedy(G, feasible_tuple_nodes, satellites, l, local_search=True, should_stop=None, return_info=False):
+    """
+    Heuristic for the coverage/cost tradeoff objective (see weighted_set_cover_ilp_tradeoff):
+    greedily adds the plan with the lowest cost per newly covered tuple while that cost is
+    below l times the tuples it covers, then (if local_search) drops plans that cost more
+    than the penalty they save and tries swaps that add a plan and drop every plan that
+    becomes worthless. With return_info=True a third value holds 'uncovered' and
+    'objective'.
+
+    Returns:
+        tuple: (satellite_set, total_cost) or (satellite_set, total_cost, info)
+    """
+    results = penalty_sweep(G, feasible_tuple_nodes, satellites, [l], local_search=local_search,
+                            should_stop=should_stop)
+    result = results[0]
+    if return_info:
+        return result['satellite_set'], result['total_cost'], {'uncovered': result['uncovered'],
+                                                                'objective': result['objective']}
+    return result['satellite_set'], result['total_cost']
+
+
+def penalty_sweep(G, feasible_tuple_nodes, satellites, lambdas, local_search=True, should_stop=None):
+    """
+    Penalty greedy (plus local search) for every l in lambdas, sharing the work between
+    them: the lambdas are processed in increasing order, the greedy resumes its heap where
+    the previous l stopped and the local search starts from the previous result plus the
+    plans the greedy added. should_stop is polled between local search moves.
+
+    Returns:
+        list: one dict per l, in the order of lambdas, with 'lambda', 'satellite_set',
+        'total_cost', 'uncovered', 'objective', 'coverage' (fraction of the coverable tuples)
+        and 'time' (seconds spent on this l)
+    """
+    instance, tuple_ids = as_instance(G, feasible_tuple_nodes, satellites)
+    costs = np.asarray(instance.costs, dtype=float)
+    plan_indptr, plan_indices = _required_csr(instance, tuple_ids)
+    coverable = np.zeros(instance.num_tuples, dtype=bool)
+    coverable[plan_indices] = True
+    num_coverable = int(coverable.sum())
+
+    greedy = _PenaltyGreedy(plan_indptr, plan_indices, costs, instance.num_tuples)
+    search = _PenaltyLocalSearch(plan_indptr, plan_indices, costs, instance.num_tuples)
+    greedy_selection = []
+    results = {}
+    for l in sorted(set(lambdas)):
+        start = time.time()
+        added = greedy.advance(l)
+        greedy_selection.extend(added)
+        if local_search:
+            search.run(l, added, should_stop=should_stop)
+            plans = np.flatnonzero(search.chosen).tolist()
+            uncovered = int(np.count_nonzero(search.counts[coverable] == 0))
+        else:
+            plans = list(greedy_selection)
+            uncovered = int(greedy.uncovered.sum())
+        total_cost = instance.total_cost(plans)
+        results[l] = {'lambda': l, 'satellite_set': instance.labels(plans), 'total_cost': total_cost,
+                      'uncovered': uncovered, 'objective': total_cost + l * uncovered,
+                      'coverage': 1 - uncovered / num_coverable if num_coverable else 1.0,
+                      'time': time.time() - start}
+    return [results[l] for l in lambdas]
+
+
+if __name__ == '__main__':
+    import random
+    from util_v2 import create_satellite_bipartite_graph
+
+    parser = argparse.ArgumentParser(
+        prog='Tradeoff',
+        description='Compare the penalty greedy with the tradeoff ILP over a range of lambdas'
+    )
+    parser.add_argument('--locations', type=int, default=5)
+    parser.add_argument('--timesteps', type=int, default=50)
+    parser.add_argument('--satellites', type=int, default=50)
+    parser.add_argument('--coverage-prob', type=float, default=0.4)
+    parser.add_argument('--lambdas', type=float, nargs='+', default=[0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 1, 5, 10])
+    parser.add_argument('--compare', action='store_true', help='Also run the tradeoff ILP for every lambda')
+    parser.add_argument('--time-limit', type=float, default=60)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    G, tuple_nodes, satellite_nodes = create_satellite_bipartite_graph(args.locations, args.timesteps, args.satellites,
+                                                                       args.coverage_prob)
+    feasible_tuple_nodes = [node for node in tuple_nodes if G.degree(node) > 0]
+    start = time.time()
+    results = penalty_sweep(G, feasible_tuple_nodes, satellite_nodes, args.lambdas)
+    print(f"penalty sweep over {len(args.lambdas)} lambdas: {time.time() - start:.2f} s")
+    for result in results:
+        line = (f"lambda {result['lambda']}: cost {result['total_cost']}, {result['uncovered']} uncovered, "
+                f"objective {result['objective']:.2f}")
+        if args.compare:
+            from solver import weighted_set_cover_ilp_tradeoff
+            satellite_set, _ = weighted_set_cover_ilp_tradeoff(G, feasible_tuple_nodes, satellite_nodes, result['lambda'],
+                                                               time_limit=args.time_limit, log_to_console=False)
+            line += f", ILP objective {tradeoff_objective(G, feasible_tuple_nodes, satellite_nodes, satellite_set, result['lambda'])[2]:.2f}"
+        print(line)
@@ -1,16 +1,14 @@
-import networkx as nx
-import matplotlib.pyplot as plt
 import random
 from itertools import combinations
 from collections import defaultdict
-import numpy as np
-import math
-from scipy.stats import bernoulli
-from scipy.stats import powerlaw
-from scipy.stats import lognorm
+
+# networkx, numpy, scipy.stats and matplotlib are imported inside the functions that need
+# them, so importing this module (e.g. for the greedies) stays cheap
 
 def create_satellite_bipartite_graph(locations, timesteps, satellites, coverage_prob, min_cost=1, max_cost=10, prob_type = 'bernoulli'):
     """Previous function with increased coverage probability"""
+    import networkx as nx
+    import numpy as np
     assert coverage_prob >= 0 and coverage_prob <= 1, "Coverage probability must be between 0 and 1"
     G = nx.Graph()
     
@@ -32,29 +30,32 @@ def create_satellite_bipartite_graph(locations, timesteps, satellites, coverage_
         satellite_nodes[f'S{s}'] = cost
         G.add_node(f'S{s}', bipartite=1, cost=cost)
     
-    for s in satellite_nodes:
-        # Each satellite covers more location-time pairs
-        
-        if prob_type == 'power_law':
-            covered_tuples = (powerlaw.rvs(a=2.0, size=len(tuple_nodes)) < coverage_prob).astype(int)
-            # print(covered_tuples)
-            # very few satellite plans with very good coverage, and majority with bad coverage
-        elif prob_type == 'lognormal':
-            covered_tuples = (lognorm.rvs(coverage_prob, size=len(tuple_nodes)) < coverage_prob).astype(int)
-            # print(covered_tuples)
-            # More moderate inequality, still skewed but not as bad
-        else:
-            covered_tuples = bernoulli.rvs(coverage_prob, size=len(tuple_nodes)) # default
-            # print(covered_tuples)
-        
-        # exit()
-
-        for tuple_node, covered in zip(tuple_nodes, covered_tuples):
-            if covered == 1:
-                G.add_edge(tuple_node, s)
+    # one (satellites x tuples) draw instead of one rvs call per satellite; the row-major
+    # fill consumes the random stream in the same order as the old per-satellite draws
+    covered = sample_coverage_matrix(satellites, len(tuple_nodes), coverage_prob, prob_type)
+    satellite_ids, tuple_ids = np.nonzero(covered)
+    G.add_edges_from((tuple_nodes[t], f'S{s}') for s, t in zip(satellite_ids.tolist(), tuple_ids.tolist()))
     
     return G, tuple_nodes, satellite_nodes
 
+def sample_coverage_matrix(satellites, num_tuples, coverage_prob, prob_type='bernoulli'):
+    """
+    Draws which tuples every satellite covers, for all satellites in one call to the
+    distribution. 'power_law': very few satellite plans with very good coverage and a
+    majority with bad coverage; 'lognormal': more moderate inequality, still skewed;
+    anything else: independent Bernoulli(coverage_prob) coverage.
+
+    Returns:
+        numpy.ndarray: boolean (satellites x num_tuples) matrix, True if the satellite covers the tuple
+    """
+    from scipy.stats import bernoulli, powerlaw, lognorm
+    size = (satellites, num_tuples)
+    if prob_type == 'power_law':
+        return powerlaw.rvs(a=2.0, size=size) < coverage_prob
+    if prob_type == 'lognormal':
+        return lognorm.rvs(coverage_prob, size=size) < coverage_prob
+    return bernoulli.rvs(coverage_prob, size=size).astype(bool)
+
 def get_coverage_map(G, tuple_nodes, satellites):
     """
     Creates a mapping of each location-time tuple to all satellites that can cover it.
@@ -155,58 +156,39 @@ def greedy_cost_based_algorithm(G, feasible_tuple_nodes, satellites):
     
     return satellite_set, total_cost
 
-def find_all_valid_coverages(G, tuple_nodes, satellites):
+def find_all_valid_coverages(G, tuple_nodes, satellites, k=None):
     """
-    Find all valid combinations of satellites that provide full coverage.
+    Find the k cheapest (all if k is None) combinations of satellites that provide full coverage.
     Each location-time tuple can be covered by multiple satellites.
+    Uses the lazy best-first enumeration from util_v2.iter_valid_coverages.
     
     Returns:
-        list: List of (satellite_set, total_cost, coverage_details) tuples
+        list: List of (satellite_set, total_cost, coverage_details) tuples, sorted by total cost
     """
-    valid_solutions = []
-    # Check if each location-time tuple has at least one satellite covering it
-    for tuple_node in tuple_nodes:
-        if G.degree(tuple_node) == 0:
-            print(f"Warning: {tuple_node} has no satellite coverage!")
-            return []
-
-    # Try all possible combinations of satellites
-    for r in range(1, len(satellites) + 1):
-        for satellite_subset in combinations(satellites, r):
-            satellite_set = set(satellite_subset)
-            
-            # Check if this combination provides full coverage
-            coverage_details = defaultdict(set)
-            is_valid = True
-            
-            # Check each location-time tuple
-            for tuple_node in tuple_nodes:
-                # Get all satellites from our subset that can cover this tuple
-                covering_satellites = set()
-                for sat in G.neighbors(tuple_node):
-                    if sat in satellite_set:
-                        covering_satellites.add(sat)
-                
-                if not covering_satellites:
-                    is_valid = False
-                    break
-                    
-                coverage_details[tuple_node] = covering_satellites
-            
-            if is_valid:
-                # Calculate total cost (sum of minimum costs for each location-time tuple)
-                all_sats = set()
-                for sats in coverage_details.values():
-                    all_sats.update(sats)
-                total_cost = sum(satellites[sat] for sat in all_sats)
-                valid_solutions.append((satellite_set, total_cost, dict(coverage_details)))
-    
-    return sorted(valid_solutions, key=lambda x: x[1])  # Sort by total cost
+    from util_v2 import find_all_valid_coverages as find_k_valid_coverages
+    return find_k_valid_coverages(G, tuple_nodes, satellites, k=k)
     
-def visualize_coverage(G, tuple_nodes, satellite_nodes):
+def visualize_coverage(G, tuple_nodes, satellite_nodes, mode='auto', selected=None, max_graph_nodes=200):
     """
     Visualizes the complete coverage graph showing all possible coverages.
+
+    Large graphs (more than max_graph_nodes nodes with mode='auto', or mode='heatmap')
+    are drawn as a rasterized coverage image by util_v2.visualize_coverage_heatmap.
     """
+    if mode == 'auto':
+        mode = 'graph' if len(tuple_nodes) + len(satellite_nodes) <= max_graph_nodes else 'heatmap'
+    if mode == 'heatmap':
+        from util_v2 import visualize_coverage_heatmap
+        return visualize_coverage_heatmap(G, tuple_nodes, satellite_nodes, selected=selected)
+    if mode != 'graph':
+        raise ValueError(f"Unknown visualization mode: {mode}")
+
+    import networkx as nx
+    import numpy as np
+    import matplotlib.pyplot as plt
+
+    selected = set(selected or [])
+
     plt.figure(figsize=(12, 8))
     pos = nx.bipartite_layout(G, tuple_nodes)
     
@@ -214,15 +196,27 @@ def visualize_coverage(G, tuple_nodes, satellite_nodes):
     nx.draw_networkx_nodes(G, pos, nodelist=tuple_nodes, 
                           node_color='lightblue', node_size=500,
                           label='Location-Time Pairs')
-    nx.draw_networkx_nodes(G, pos, nodelist=satellite_nodes,
+    nx.draw_networkx_nodes(G, pos, nodelist=[sat for sat in satellite_nodes if sat not in selected],
                           node_color='lightgreen', node_size=500,
                           label='Satellites')
-    
+    if selected:
+        nx.draw_networkx_nodes(G, pos, nodelist=[sat for sat in satellite_nodes if sat in selected],
+                              node_color='orange', node_size=500,
+                              label='Selected Satellites')
+    
+    # Group edges by satellite in one pass instead of rescanning all edges per satellite
+    satellite_lookup = set(satellite_nodes)
+    edges_by_satellite = defaultdict(list)
+    for (u, v) in G.edges():
+        if u in satellite_lookup:
+            edges_by_satellite[u].append((u, v))
+        elif v in satellite_lookup:
+            edges_by_satellite[v].append((u, v))
+
     # Draw edges with different colors for different satellites
     colors = plt.cm.tab10(np.linspace(0, 1, len(satellite_nodes)))
     for idx, satellite in enumerate(satellite_nodes):
-        edges = [(u, v) for (u, v) in G.edges() if satellite in (u, v)]
-        nx.draw_networkx_edges(G, pos, edgelist=edges, 
+        nx.draw_networkx_edges(G, pos, edgelist=edges_by_satellite[satellite], 
                              edge_color=[colors[idx]], alpha=0.5)
     
     # Labels
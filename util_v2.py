@@ -1,17 +1,34 @@
-import networkx as nx
-import matplotlib
-matplotlib.use('Agg')  # Linux didn't like something you can remove this for mac
-import matplotlib.pyplot as plt
 import random
-from itertools import combinations
+from itertools import combinations, islice
 from collections import defaultdict
-import numpy as np
 import math
-from scipy.stats import bernoulli
+import heapq
+from bisect import bisect_left
+from instance import CoverageInstance, as_instance
 
-def create_satellite_bipartite_graph(locations, timesteps, satellites, coverage_prob, min_cost=1, max_cost=10, class_ratios=[0.2, 0.3, 0.5], class_coverages=[0.8, 0.4, 0.1]):
-    """Previous function with increased coverage probability"""
+# networkx, numpy, scipy and matplotlib are imported inside the functions that need them,
+# so importing this module (e.g. for the greedies) stays cheap
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use('Agg')  # Linux didn't like something you can remove this for mac
+    import matplotlib.pyplot as plt
+    return plt
+
+def create_satellite_bipartite_graph(locations, timesteps, satellites, coverage_prob, min_cost=1, max_cost=10, class_ratios=[0.2, 0.3, 0.5], class_coverages=[0.8, 0.4, 0.1],
+                                     min_coverable_fraction=None, min_tuple_degree=0):
+    """
+    Previous function with increased coverage probability.
+
+    min_coverable_fraction / min_tuple_degree make the instance meet a coverage target by
+    construction (see _top_up_coverage) instead of regenerating it until it does: at least
+    that fraction of the tuples is coverable, and every tuple is covered by at least
+    min_tuple_degree satellites. Plan costs are computed after the top-up.
+    """
+    import networkx as nx
+    import numpy as np
     assert coverage_prob >= 0 and coverage_prob <= 1, "Coverage probability must be between 0 and 1"
+    assert min_coverable_fraction is None or 0 <= min_coverable_fraction <= 1, "Coverable fraction must be between 0 and 1"
     G = nx.Graph()
     
 
@@ -51,6 +68,7 @@ def create_satellite_bipartite_graph(locations, timesteps, satellites, coverage_
             current_satellite += 1
 
     # Adding edges based on class coverage probabilities
+    final_coverages = {}
     for s in satellite_nodes:
         base_coverage = satellite_nodes[s]['base_coverage']
 
@@ -60,6 +78,7 @@ def create_satellite_bipartite_graph(locations, timesteps, satellites, coverage_
 
         # scaling by overall coverage probability
         final_coverage = actual_coverage * coverage_prob
+        final_coverages[s] = final_coverage
 
         # coverage mask (number of location-time pairs covered by this satellite)
         coverage = np.random.random(len(tuple_nodes)) < final_coverage
@@ -68,6 +87,9 @@ def create_satellite_bipartite_graph(locations, timesteps, satellites, coverage_
             if covered:
                 G.add_edge(tuple_node, s)
     
+    if min_coverable_fraction is not None or min_tuple_degree > 0:
+        _top_up_coverage(G, tuple_nodes, final_coverages, min_coverable_fraction, min_tuple_degree)
+
     # calculate cost for each satellite based on the number of location-time pairs it covers
 
     max_possible_degree = locations * timesteps
@@ -90,6 +112,41 @@ def create_satellite_bipartite_graph(locations, timesteps, satellites, coverage_
     
     return G, tuple_nodes, simpler_satellite_nodes#satellite_nodes
 
+def _top_up_coverage(G, tuple_nodes, satellite_coverages, min_coverable_fraction=None, min_tuple_degree=0):
+    """
+    Adds the fewest edges needed to meet the coverage targets, instead of rejecting the
+    whole graph. Every missing edge goes to a satellite drawn with probability
+    proportional to its coverage probability (so big providers pick up most of them,
+    like they would have in a redrawn graph):
+    tuples below min_tuple_degree get the missing number of distinct new satellites, and if
+    fewer than ceil(min_coverable_fraction * #tuples) tuples are coverable, uniformly chosen
+    uncovered tuples get one satellite each until the target is met.
+    """
+    import numpy as np
+    satellites = list(satellite_coverages)
+    assert min_tuple_degree <= len(satellites), "Minimum tuple degree cannot exceed the number of satellites"
+    # tiny floor so satellites with zero coverage probability can still be drawn if needed
+    weights = np.maximum(np.array([satellite_coverages[sat] for sat in satellites], dtype=float), 1e-9)
+
+    if min_tuple_degree > 0:
+        for tuple_node in tuple_nodes:
+            missing = min_tuple_degree - G.degree(tuple_node)
+            if missing <= 0:
+                continue
+            candidates = [i for i, sat in enumerate(satellites) if not G.has_edge(tuple_node, sat)]
+            p = weights[candidates] / weights[candidates].sum()
+            for i in np.random.choice(candidates, missing, replace=False, p=p):
+                G.add_edge(tuple_node, satellites[i])
+
+    if min_coverable_fraction is not None:
+        uncovered = [tuple_node for tuple_node in tuple_nodes if G.degree(tuple_node) == 0]
+        missing = math.ceil(min_coverable_fraction * len(tuple_nodes)) - (len(tuple_nodes) - len(uncovered))
+        if missing > 0:
+            chosen = np.random.choice(len(uncovered), missing, replace=False)
+            owners = np.random.choice(len(satellites), missing, p=weights / weights.sum())
+            for t, i in zip(chosen, owners):
+                G.add_edge(uncovered[t], satellites[i])
+
 def get_coverage_map(G, tuple_nodes, satellites):
     """
     Creates a mapping of each location-time tuple to all satellites that can cover it.
@@ -104,6 +161,34 @@ def get_coverage_map(G, tuple_nodes, satellites):
             coverage_map[tuple_node].append((satellite, cost))
     return coverage_map
 
+def get_incidence_matrix(G, tuple_nodes, satellites):
+    """
+    Builds the sparse satellite x tuple incidence matrix in a single pass over the edges.
+    Tuples outside tuple_nodes and satellites outside satellites are ignored.
+    For a CoverageInstance its cached matrix is returned (columns follow its tuple_labels).
+
+    Returns:
+        tuple: (A, satellite_list) where A[s, t] = 1 if satellite_list[s] covers tuple_nodes[t]
+    """
+    if isinstance(G, CoverageInstance):
+        return G.incidence_matrix(), G.satellite_labels
+    import numpy as np
+    from scipy.sparse import csr_matrix
+    satellite_list = list(satellites)
+    satellite_index = {sat: s for s, sat in enumerate(satellite_list)}
+    tuple_index = {tuple_node: t for t, tuple_node in enumerate(tuple_nodes)}
+    rows = []
+    cols = []
+    for u, v in G.edges():
+        if u in satellite_index:
+            u, v = v, u
+        if v in satellite_index and u in tuple_index:
+            rows.append(satellite_index[v])
+            cols.append(tuple_index[u])
+    A = csr_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)),
+                   shape=(len(satellite_list), len(tuple_index)))
+    return A, satellite_list
+
 def brute_force_algorithm(G, feasible_tuple_nodes, satellites):
     best_solution = None 
     best_cost = float('inf')
@@ -121,111 +206,54 @@ def brute_force_algorithm(G, feasible_tuple_nodes, satellites):
                     best_cost = total_cost
     return best_solution, best_cost
 
-def greedy_degree_based_algorithm(G, feasible_tuple_nodes, satellites):
-    """
-    Find the optimal combination of satellites that provides full coverage.
-    Each location-time tuple can be covered by multiple satellites.
-    
-    Returns:
-        tuple: (satellite_set, total_cost, coverage_details)
-    """
-    # Create a mapping of each location-time tuple to all satellites that can cover it
-    coverage_map = {}
-    for sat in satellites:
-        covered_nodes = set(G.neighbors(sat))
-        if len(covered_nodes) == 0:
-            continue
-        coverage_map[sat] = covered_nodes
-    
-    coverage_map_sorted = {k: v for k, v in sorted(coverage_map.items(), key=lambda item: len(item[1]), reverse=True)}
-    
-    # Initialize the set of all location-time tuples
-    U = set(feasible_tuple_nodes)
-    
-    # Initialize an empty set to store the selected satellites
-    satellite_set = set()
+def _static_greedy(G, feasible_tuple_nodes, satellites, strategy):
+    # walk the plans in the instance's cached order and take every plan that covers something new
+    instance, tuple_ids = as_instance(G, feasible_tuple_nodes, satellites)
+    U = set(tuple_ids)
 
-    for sat, tuples in coverage_map_sorted.items():
+    selected = []
+    for s in instance.order(strategy):
         if len(U) == 0:
             break
-        covered = U.intersection(tuples)
+        covered = U.intersection(instance.plan_tuples(s))
         if len(covered) > 0:
-            satellite_set.add(sat)
+            selected.append(s)
             U -= covered
-    
-    # Calculate the total cost
-    total_cost = sum(satellites[satellite] for satellite in satellite_set)
-    
-    return satellite_set, total_cost
 
-def greedy_cost_based_algorithm(G, feasible_tuple_nodes, satellites):
+    return instance.labels(selected), instance.total_cost(selected)
+
+def greedy_degree_based_algorithm(G, feasible_tuple_nodes=None, satellites=None):
     """
-    Find the optimal combination of satellites that provides full coverage.
-    Each location-time tuple can be covered by multiple satellites.
+    Greedy cover that visits the satellites by number of covered tuples (most first) and
+    takes every satellite that covers a tuple not covered yet.
+    G can be the coverage graph or a CoverageInstance (then the other arguments are optional).
     
     Returns:
-        tuple: (satellite_set, total_cost, coverage_details)
+        tuple: (satellite_set, total_cost)
     """
-    # Create a mapping of each location-time tuple to all satellites that can cover it
-    coverage_map = {}
-    for sat in satellites:
-        covered_nodes = set(G.neighbors(sat))
-        if len(covered_nodes) == 0:
-            continue
-        coverage_map[sat] = covered_nodes
-    
-    # sort coverage_map by the value of the satellite in satellites dict
-    coverage_map_sorted = {k: v for k, v in sorted(coverage_map.items(), key=lambda item: satellites[item[0]])}
-    
-    # Initialize the set of all location-time tuples
-    U = set(feasible_tuple_nodes)
-    
-    # Initialize an empty set to store the selected satellites
-    satellite_set = set()
+    return _static_greedy(G, feasible_tuple_nodes, satellites, 'degree')
 
-    for sat, tuples in coverage_map_sorted.items():
-        if len(U) == 0:
-            break
-        covered = U.intersection(tuples)
-        if len(covered) > 0:
-            satellite_set.add(sat)
-            U -= covered
-    
-    # Calculate the total cost
-    total_cost = sum(satellites[satellite] for satellite in satellite_set)
-    
-    return satellite_set, total_cost
-
-def greedy_ratio_based_algorithm(G, feasible_tuple_nodes, satellites):
-    # Create a mapping of each location-time tuple to all satellites that can cover it
-    coverage_map = {}
-    for sat in satellites:
-        covered_nodes = set(G.neighbors(sat))
-        if len(covered_nodes) == 0:
-            continue
-        coverage_map[sat] = covered_nodes
-    
-    # sort coverage_map by the value of the satellite in satellites dict
-    coverage_map_sorted = {k: v for k, v in sorted(coverage_map.items(), key=lambda item: satellites[item[0]] / len(item[1]))}
-    
-    # Initialize the set of all location-time tuples
-    U = set(feasible_tuple_nodes)
+def greedy_cost_based_algorithm(G, feasible_tuple_nodes=None, satellites=None):
+    """
+    Greedy cover that visits the satellites by cost (cheapest first) and takes every
+    satellite that covers a tuple not covered yet.
+    G can be the coverage graph or a CoverageInstance (then the other arguments are optional).
     
-    # Initialize an empty set to store the selected satellites
-    satellite_set = set()
+    Returns:
+        tuple: (satellite_set, total_cost)
+    """
+    return _static_greedy(G, feasible_tuple_nodes, satellites, 'cost')
 
-    for sat, tuples in coverage_map_sorted.items():
-        if len(U) == 0:
-            break
-        covered = U.intersection(tuples)
-        if len(covered) > 0:
-            satellite_set.add(sat)
-            U -= covered
-    
-    # Calculate the total cost
-    total_cost = sum(satellites[satellite] for satellite in satellite_set)
+def greedy_ratio_based_algorithm(G, feasible_tuple_nodes=None, satellites=None):
+    """
+    Greedy cover that visits the satellites by cost per covered tuple (lowest first) and
+    takes every satellite that covers a tuple not covered yet.
+    G can be the coverage graph or a CoverageInstance (then the other arguments are optional).
     
-    return satellite_set, total_cost
+    Returns:
+        tuple: (satellite_set, total_cost)
+    """
+    return _static_greedy(G, feasible_tuple_nodes, satellites, 'ratio')
 
 def online_greedy_ratio_based_algorithm(G, feasible_tuple_nodes, satellites):
     # Create a mapping of each location-time tuple to all satellites that can cover it
@@ -273,58 +301,257 @@ def online_greedy_ratio_based_algorithm(G, feasible_tuple_nodes, satellites):
     
     return satellite_set, total_cost
     
-def find_all_valid_coverages(G, tuple_nodes, satellites):
+def repair_coverage(G, feasible_tuple_nodes, satellites, satellite_set):
     """
-    Find all valid combinations of satellites that provide full coverage.
-    Each location-time tuple can be covered by multiple satellites.
-    
+    Extends satellite_set to a full cover of feasible_tuple_nodes by repeatedly adding the
+    satellite with the lowest cost per newly covered tuple (lazy heap evaluation).
+    Tuples no satellite can cover are left uncovered. G can also be a CoverageInstance.
+
     Returns:
-        list: List of (satellite_set, total_cost, coverage_details) tuples
+        tuple: (satellite_set, total_cost)
     """
-    valid_solutions = []
+    instance, tuple_ids = as_instance(G, feasible_tuple_nodes, satellites)
+    costs = instance.costs
+    chosen = set(instance.plan_ids(satellite_set))
+    uncovered = bytearray(instance.num_tuples)
+    for t in tuple_ids:
+        uncovered[t] = 1
+    for s in chosen:
+        for t in instance.plan_tuples(s):
+            uncovered[t] = 0
+    remaining = sum(uncovered)
+
+    heap = []
+    for s in range(instance.num_plans):
+        if s in chosen:
+            continue
+        new_coverage = sum(uncovered[t] for t in instance.plan_tuples(s))
+        if new_coverage > 0:
+            heap.append((costs[s] / new_coverage, s))
+    heapq.heapify(heap)
+
+    while remaining and heap:
+        ratio, s = heapq.heappop(heap)
+        covered = [t for t in instance.plan_tuples(s) if uncovered[t]]
+        if len(covered) == 0:
+            continue
+        new_ratio = costs[s] / len(covered)
+        # stale entry: push it back with its current ratio unless it is still the best
+        if heap and new_ratio > heap[0][0]:
+            heapq.heappush(heap, (new_ratio, s))
+            continue
+        chosen.add(s)
+        for t in covered:
+            uncovered[t] = 0
+        remaining -= len(covered)
+
+    return instance.labels(chosen), instance.total_cost(chosen)
+
+def local_search_algorithm(G, feasible_tuple_nodes, satellites, satellite_set, should_stop=None):
+    """
+    Improves a feasible satellite set by dropping redundant satellites and by swap moves
+    that add one satellite and drop every satellite it makes redundant, as long as the
+    total cost goes down. should_stop is polled between moves so a deadline can cut it off.
+    G can also be a CoverageInstance.
+
+    Returns:
+        tuple: (satellite_set, total_cost)
+    """
+    instance, tuple_ids = as_instance(G, feasible_tuple_nodes, satellites)
+    costs = instance.costs
+    required = bytearray(instance.num_tuples)
+    for t in tuple_ids:
+        required[t] = 1
+    coverage_map = [[t for t in instance.plan_tuples(s) if required[t]] for s in range(instance.num_plans)]
+    chosen = set(instance.plan_ids(satellite_set))
+
+    # number of selected satellites covering each tuple
+    counts = [0] * instance.num_tuples
+    for s in chosen:
+        for t in coverage_map[s]:
+            counts[t] += 1
+
+    def add(s):
+        chosen.add(s)
+        for t in coverage_map[s]:
+            counts[t] += 1
+
+    def remove(s):
+        chosen.remove(s)
+        for t in coverage_map[s]:
+            counts[t] -= 1
+
+    def drop_redundant(candidates):
+        dropped = []
+        for s in sorted(candidates, key=lambda s: costs[s], reverse=True):
+            if all(counts[t] > 1 for t in coverage_map[s]):
+                remove(s)
+                dropped.append(s)
+        return dropped
+
+    drop_redundant(list(chosen))
+
+    improved = True
+    while improved:
+        improved = False
+        outside = [s for s in range(instance.num_plans) if s not in chosen and len(coverage_map[s]) > 0]
+        for s in sorted(outside, key=lambda s: costs[s] / len(coverage_map[s])):
+            if should_stop is not None and should_stop():
+                break
+            if s in chosen:
+                continue
+            add(s)
+            candidates = {other for t in coverage_map[s] for other in instance.tuple_plans(t)
+                          if other in chosen and other != s}
+            dropped = drop_redundant(candidates)
+            if sum(costs[other] for other in dropped) > costs[s]:
+                improved = True
+                continue
+            # not an improvement, undo the swap
+            for other in dropped:
+                add(other)
+            remove(s)
+
+    return instance.labels(chosen), instance.total_cost(chosen)
+    
+def iter_valid_coverages(G, tuple_nodes=None, satellites=None):
+    """
+    Lazily yields every satellite set that covers all of tuple_nodes, in nondecreasing
+    cost order, so callers can stop after the first k.
+
+    Best-first branch and bound over the satellites sorted by cost: a branch node decides
+    whether satellite i is in or out and is keyed by a lower bound on any cover below it
+    (its cost plus the cheapest remaining satellite for the hardest uncovered tuple).
+    Once a partial selection covers everything it is yielded when popped, and its
+    supersets (adding later satellites only) are enumerated in cost order after it.
+    Coverage is tracked as integer bitmasks over tuple_nodes. G can also be a CoverageInstance.
+
+    Yields:
+        tuple: (satellite_set, total_cost)
+    """
+    instance, tuple_ids = as_instance(G, tuple_nodes, satellites)
     # Check if each location-time tuple has at least one satellite covering it
-    for tuple_node in tuple_nodes:
-        if G.degree(tuple_node) == 0:
-            print(f"Warning: {tuple_node} has no satellite coverage!")
-            return []
+    for t in tuple_ids:
+        if instance.tuple_degrees[t] == 0:
+            print(f"Warning: {instance.tuple_labels[t]} has no satellite coverage!")
+            return
 
-    # Try all possible combinations of satellites
-    for r in range(1, len(satellites) + 1):
-        for satellite_subset in combinations(satellites, r):
-            satellite_set = set(satellite_subset)
-            
-            # Check if this combination provides full coverage
-            coverage_details = defaultdict(set)
-            is_valid = True
-            
-            # Check each location-time tuple
-            for tuple_node in tuple_nodes:
-                # Get all satellites from our subset that can cover this tuple
-                covering_satellites = set()
-                for sat in G.neighbors(tuple_node):
-                    if sat in satellite_set:
-                        covering_satellites.add(sat)
-                
-                if not covering_satellites:
-                    is_valid = False
-                    break
-                    
-                coverage_details[tuple_node] = covering_satellites
-            
-            if is_valid:
-                # Calculate total cost (sum of minimum costs for each location-time tuple)
-                all_sats = set()
-                for sats in coverage_details.values():
-                    all_sats.update(sats)
-                total_cost = sum(satellites[sat] for sat in all_sats)
-                valid_solutions.append((satellite_set, total_cost, dict(coverage_details)))
+    bit = {t: b for b, t in enumerate(tuple_ids)}
+    full = (1 << len(bit)) - 1
+    order = sorted(range(instance.num_plans), key=lambda s: instance.costs[s])
+    num_sats = len(order)
+    costs = [instance.costs[s] for s in order]
+    masks = [0] * num_sats
+    covering = [[] for _ in bit]  # ascending satellite (= cost) order per tuple
+    for i, s in enumerate(order):
+        for t in instance.plan_tuples(s):
+            if t in bit:
+                masks[i] |= 1 << bit[t]
+                covering[bit[t]].append(i)
+
+    def lower_bound(i, mask):
+        # cost still needed when only satellites i, i+1, ... may be added, None if impossible
+        uncovered = full & ~mask
+        bound = 0
+        while uncovered:
+            low = uncovered & -uncovered
+            uncovered ^= low
+            plans = covering[low.bit_length() - 1]
+            p = bisect_left(plans, i)
+            if p == len(plans):
+                return None
+            bound = max(bound, costs[plans[p]])
+        return bound
+
+    # heap entries: (key, tie breaker, is_cover, i, chosen, extra)
+    # branch node (is_cover False): chosen is decided up to satellite i - 1, i is next, extra is its mask
+    # cover node (is_cover True): chosen covers everything, i is the last satellite added and
+    #   extra counts the satellites added on top of the covering base
+    heap = []
+    counter = 0
+
+    def push_branch(i, chosen, cost, mask):
+        nonlocal counter
+        if mask == full:
+            counter += 1
+            heapq.heappush(heap, (cost, counter, True, i - 1, chosen, 0))
+            return
+        if i == num_sats:
+            return
+        bound = lower_bound(i, mask)
+        if bound is not None:
+            counter += 1
+            heapq.heappush(heap, (cost + bound, counter, False, i, chosen, mask))
+
+    push_branch(0, (), 0, 0)
+    while heap:
+        key, _, is_cover, i, chosen, extra = heapq.heappop(heap)
+        if is_cover:
+            yield instance.labels(order[s] for s in chosen), key
+            j = i + 1
+            if j < num_sats:
+                # supersets in cost order: add j, or replace the last added extra satellite by j
+                counter += 1
+                heapq.heappush(heap, (key + costs[j], counter, True, j, chosen + (j,), extra + 1))
+                if extra > 0:
+                    counter += 1
+                    heapq.heappush(heap, (key - costs[i] + costs[j], counter, True, j, chosen[:-1] + (j,), extra))
+            continue
+        cost = sum(costs[s] for s in chosen)
+        push_branch(i + 1, chosen + (i,), cost + costs[i], extra | masks[i])
+        push_branch(i + 1, chosen, cost, extra)
+
+def get_coverage_details(G, tuple_nodes, satellite_set):
+    """
+    Computes which satellites of satellite_set cover each location-time tuple.
+
+    Returns:
+        dict: Mapping of tuple -> set of covering satellites
+    """
+    if isinstance(G, CoverageInstance):
+        tuple_nodes = G.tuple_labels if tuple_nodes is None else tuple_nodes
+        return {tuple_node: set(G.satellite_labels[s] for s in G.tuple_plans(G.tuple_index[tuple_node])
+                                if G.satellite_labels[s] in satellite_set)
+                for tuple_node in tuple_nodes}
+    return {tuple_node: set(sat for sat in G.neighbors(tuple_node) if sat in satellite_set)
+            for tuple_node in tuple_nodes}
+
+def find_all_valid_coverages(G, tuple_nodes=None, satellites=None, k=None):
+    """
+    Find the k cheapest (all if k is None) combinations of satellites that provide full coverage.
+    Each location-time tuple can be covered by multiple satellites.
+    Solutions come from iter_valid_coverages, so only the k requested ones are ever built.
     
-    return sorted(valid_solutions, key=lambda x: x[1])  # Sort by total cost
+    Returns:
+        list: List of (satellite_set, total_cost, coverage_details) tuples, sorted by total cost
+    """
+    valid_solutions = []
+    for satellite_set, total_cost in islice(iter_valid_coverages(G, tuple_nodes, satellites), k):
+        valid_solutions.append((satellite_set, total_cost, get_coverage_details(G, tuple_nodes, satellite_set)))
+    return valid_solutions
     
-def visualize_coverage(G, tuple_nodes, satellite_nodes):
+def visualize_coverage(G, tuple_nodes, satellite_nodes, mode='auto', selected=None, max_graph_nodes=200):
     """
     Visualizes the complete coverage graph showing all possible coverages.
+
+    mode='graph' draws the bipartite graph, mode='heatmap' draws a rasterized
+    satellite x (location, time) coverage image (see visualize_coverage_heatmap),
+    and mode='auto' picks the heatmap once the graph has more than max_graph_nodes nodes.
+    Satellites in selected are highlighted in both modes.
     """
+    if mode == 'auto':
+        mode = 'graph' if len(tuple_nodes) + len(satellite_nodes) <= max_graph_nodes else 'heatmap'
+    if mode == 'heatmap':
+        return visualize_coverage_heatmap(G, tuple_nodes, satellite_nodes, selected=selected)
+    if mode != 'graph':
+        raise ValueError(f"Unknown visualization mode: {mode}")
+
+    import networkx as nx
+    import numpy as np
+    plt = _pyplot()
+
+    selected = set(selected or [])
+
     # plt.figure(figsize=(12, 8))
     plt.figure()
     
@@ -341,15 +568,27 @@ def visualize_coverage(G, tuple_nodes, satellite_nodes):
                           label='Location-Time Pairs')
  
     
-    nx.draw_networkx_nodes(G, pos, nodelist=satellite_nodes,
+    nx.draw_networkx_nodes(G, pos, nodelist=[sat for sat in satellite_nodes if sat not in selected],
                           node_color='lightgreen', node_size=250,
                           label='Satellites')
-    
+    if selected:
+        nx.draw_networkx_nodes(G, pos, nodelist=[sat for sat in satellite_nodes if sat in selected],
+                              node_color='orange', node_size=250,
+                              label='Selected Satellites')
+    
+    # Group edges by satellite in one pass instead of rescanning all edges per satellite
+    satellite_lookup = set(satellite_nodes)
+    edges_by_satellite = defaultdict(list)
+    for (u, v) in G.edges():
+        if u in satellite_lookup:
+            edges_by_satellite[u].append((u, v))
+        elif v in satellite_lookup:
+            edges_by_satellite[v].append((u, v))
+
     # Draw edges with different colors for different satellites
     colors = plt.cm.tab10(np.linspace(0, 1, len(satellite_nodes)))
     for idx, satellite in enumerate(satellite_nodes):
-        edges = [(u, v) for (u, v) in G.edges() if satellite in (u, v)]
-        nx.draw_networkx_edges(G, pos, edgelist=edges, 
+        nx.draw_networkx_edges(G, pos, edgelist=edges_by_satellite[satellite], 
                              edge_color=[colors[idx]], alpha=0.5)
     
     # Labels
@@ -363,4 +602,72 @@ def visualize_coverage(G, tuple_nodes, satellite_nodes):
     plt.axis('off')
     #tight
     plt.tight_layout()
-    return plt
\ No newline at end of file
+    return plt
+
+def _binned_density(A, num_row_bins, num_col_bins):
+    """
+    Bins a sparse 0/1 matrix into a (num_row_bins, num_col_bins) image where each pixel
+    is the fraction of ones in its block. Bins are never larger than the matrix itself.
+    """
+    import numpy as np
+    num_rows, num_cols = A.shape
+    num_row_bins = max(1, min(num_row_bins, num_rows))
+    num_col_bins = max(1, min(num_col_bins, num_cols))
+    A = A.tocoo()
+    row_bins = A.row.astype(np.int64) * num_row_bins // num_rows
+    col_bins = A.col.astype(np.int64) * num_col_bins // num_cols
+    counts = np.bincount(row_bins * num_col_bins + col_bins, minlength=num_row_bins * num_col_bins)
+    row_sizes = np.bincount(np.arange(num_rows) * num_row_bins // num_rows, minlength=num_row_bins)
+    col_sizes = np.bincount(np.arange(num_cols) * num_col_bins // num_cols, minlength=num_col_bins)
+    return counts.reshape(num_row_bins, num_col_bins) / np.outer(row_sizes, col_sizes)
+
+def visualize_coverage_heatmap(G, tuple_nodes, satellite_nodes, selected=None, max_rows=800, max_cols=1600):
+    """
+    Draws coverage as a satellite x (location, time) image straight from the incidence matrix.
+    Selected satellites are moved to the top band and outlined. Once there are more satellites
+    or tuples than max_rows / max_cols pixels, blocks are binned into a coverage density image.
+    """
+    import numpy as np
+    plt = _pyplot()
+
+    A, satellite_list = get_incidence_matrix(G, tuple_nodes, satellite_nodes)
+    selected = set(selected or [])
+    selected_rows = [s for s, sat in enumerate(satellite_list) if sat in selected]
+    other_rows = [s for s, sat in enumerate(satellite_list) if sat not in selected]
+
+    # split the row budget between the selected band and the rest, in proportion to their sizes;
+    # each band is drawn over its own satellite range, so its height matches its satellite count
+    num_sats, num_tuples = A.shape
+    selected_bins = 0
+    if selected_rows:
+        selected_bins = max(1, max_rows * len(selected_rows) // len(satellite_list))
+    bands = []
+    if selected_rows:
+        bands.append((_binned_density(A[selected_rows], selected_bins, max_cols), 0, len(selected_rows)))
+    if other_rows:
+        bands.append((_binned_density(A[other_rows], max_rows - selected_bins, max_cols), len(selected_rows), num_sats))
+
+    # axes stay in satellite / tuple units even when pixels are binned
+    plt.figure()
+    for image, top, bottom in bands:
+        shown = plt.imshow(image, aspect='auto', interpolation='nearest', cmap='Greys', vmin=0, vmax=1,
+                           extent=(0, num_tuples, bottom, top))
+    plt.xlim(0, num_tuples)
+    plt.ylim(num_sats, 0)
+    plt.colorbar(shown, label='Coverage density')
+    if selected_rows:
+        plt.gca().add_patch(plt.Rectangle((0, 0), num_tuples, len(selected_rows),
+                                          fill=False, edgecolor='orange', lw=2, label='Selected Satellites'))
+        plt.legend(loc='upper right')
+
+    # mark where each location's block of timesteps starts (tuple_nodes are location-major)
+    location_starts = [t for t, node in enumerate(tuple_nodes) if t == 0 or node[0] != tuple_nodes[t - 1][0]]
+    if 1 < len(location_starts) <= 50:
+        for t in location_starts[1:]:
+            plt.axvline(t, color='lightblue', lw=0.5)
+
+    plt.xlabel("(Location, Time) Pairs")
+    plt.ylabel("Satellites")
+    plt.title("Satellite Plan Coverage")
+    plt.tight_layout()
+    return plt